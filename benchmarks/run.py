@@ -0,0 +1,241 @@
+"""
+Benchmarks of remote execution against in-process SSH server.
+
+Run from top directory of repository:
+    python -m benchmarks.run
+    python -m benchmarks.run --size 64 --count 200 connect commands
+
+Each benchmark is repeated and the best result is reported, numbers are
+comparable only between runs on the same machine.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from rrmngmnt import Host, User
+from rrmngmnt.common import CommandReader
+from rrmngmnt.ssh import RemoteExecutorFactory
+
+from benchmarks.server import SSHServer
+
+
+MB = 1024 * 1024
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def best_of(repeat, func):
+    """
+    Returns:
+        float: shortest duration of func in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.monotonic()
+        func()
+        durations.append(time.monotonic() - start)
+    return min(durations)
+
+
+class Context(object):
+    def __init__(self, port, args, tmpdir):
+        self.port = port
+        self.count = args.count
+        self.size = args.size * MB
+        self.repeat = args.repeat
+        self.tmpdir = tmpdir
+
+    def host(self, **kwargs):
+        host = Host('127.0.0.1')
+        host.users.append(User('root', 'password'))
+        host.executor_factory = RemoteExecutorFactory(
+            port=self.port, **kwargs
+        )
+        return host
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+
+@benchmark
+def connect(ctx):
+    """
+    Sessions opened per second, with and without connection pool
+    """
+    for use_pool in (False, True):
+        executor = ctx.host(use_pool=use_pool).executor()
+
+        def sessions():
+            for _ in range(ctx.count // 10 or 1):
+                with executor.session() as ss:
+                    ss.run_cmd(['true'])
+
+        duration = best_of(ctx.repeat, sessions)
+        yield (
+            'connect (pool=%s)' % use_pool,
+            (ctx.count // 10 or 1) / duration, 'sessions/s',
+        )
+
+
+@benchmark
+def commands(ctx):
+    """
+    Commands per second over single session
+    """
+    executor = ctx.host().executor()
+    cmds = [['echo', str(i)] for i in range(ctx.count)]
+    with executor.session() as ss:
+        duration = best_of(
+            ctx.repeat, lambda: [ss.run_cmd(cmd) for cmd in cmds]
+        )
+        yield 'run_cmd', ctx.count / duration, 'commands/s'
+        duration = best_of(ctx.repeat, lambda: ss.run_many(cmds))
+        yield 'run_many', ctx.count / duration, 'commands/s'
+        duration = best_of(ctx.repeat, lambda: ss.run_batch(cmds))
+        yield 'run_batch', ctx.count / duration, 'commands/s'
+
+
+@benchmark
+def output(ctx):
+    """
+    Throughput of command output
+    """
+    executor = ctx.host().executor()
+    cmd = ['head', '-c', str(ctx.size), '/dev/zero']
+    duration = best_of(ctx.repeat, lambda: executor.run_cmd(cmd))
+    yield 'output', ctx.size / MB / duration, 'MB/s'
+    duration = best_of(
+        ctx.repeat, lambda: executor.run_cmd(cmd, max_memory=MB)
+    )
+    yield 'output (spooled)', ctx.size / MB / duration, 'MB/s'
+
+
+@benchmark
+def files(ctx):
+    """
+    Throughput of FileSystem put, get and transfer, and small files
+    written over single session
+    """
+    host = ctx.host()
+    local = ctx.path('local')
+    with open(local, 'wb') as fh:
+        fh.write(os.urandom(ctx.size))
+    remote = ctx.path('remote')
+    duration = best_of(ctx.repeat, lambda: host.fs.put(local, remote))
+    yield 'fs.put', ctx.size / MB / duration, 'MB/s'
+    duration = best_of(
+        ctx.repeat, lambda: host.fs.get(remote, ctx.path('fetched'))
+    )
+    yield 'fs.get', ctx.size / MB / duration, 'MB/s'
+    for method in ('put', 'get'):
+        duration = best_of(ctx.repeat, lambda: getattr(host.fs, method)(
+            local if method == 'put' else remote,
+            ctx.path('streams'), streams=4,
+        ))
+        yield 'fs.%s (streams=4)' % method, ctx.size / MB / duration, 'MB/s'
+    duration = best_of(
+        ctx.repeat,
+        lambda: host.fs.transfer(remote, host, ctx.path('transferred')),
+    )
+    yield 'fs.transfer', ctx.size / MB / duration, 'MB/s'
+
+    paths = [ctx.path('small%d' % i) for i in range(ctx.count)]
+
+    def small_files():
+        with host.executor().session() as ss:
+            for path in paths:
+                with ss.open_file(path, 'wb') as fh:
+                    fh.write(b'data')
+
+    duration = best_of(ctx.repeat, small_files)
+    yield 'open_file (small)', ctx.count / duration, 'files/s'
+
+
+@benchmark
+def tree(ctx):
+    """
+    Small files per second copied by put_tree and get_tree
+    """
+    host = ctx.host()
+    src = ctx.path('tree')
+    files = ctx.count * 10
+    for i in range(files):
+        directory = os.path.join(src, 'dir%d' % (i % 10))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, 'file%d' % i), 'wb') as fh:
+            fh.write(b'x' * 100)
+    for compression in (None, 'gzip'):
+        duration = best_of(ctx.repeat, lambda: host.fs.put_tree(
+            src, ctx.path('tree-put'), compression,
+        ))
+        yield 'put_tree (%s)' % compression, files / duration, 'files/s'
+        duration = best_of(ctx.repeat, lambda: host.fs.get_tree(
+            src, ctx.path('tree-get'), compression,
+        ))
+        yield 'get_tree (%s)' % compression, files / duration, 'files/s'
+
+
+@benchmark
+def reader(ctx):
+    """
+    Lines per second read by CommandReader
+    """
+    executor = ctx.host().executor()
+    lines = ctx.count * 1000
+
+    def read():
+        reader = CommandReader(
+            executor, ['seq', '1', str(lines)], retain=False,
+        )
+        for _ in reader.read_lines():
+            pass
+
+    duration = best_of(ctx.repeat, read)
+    yield 'CommandReader', lines / duration, 'lines/s'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        'names', nargs='*', help='benchmarks to run, all by default: %s' % (
+            ', '.join(b.__name__ for b in BENCHMARKS)
+        ),
+    )
+    parser.add_argument(
+        '--size', type=int, default=32, help='MB of data to transfer',
+    )
+    parser.add_argument(
+        '--count', type=int, default=100, help='number of commands',
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='repetitions of benchmark',
+    )
+    args = parser.parse_args(argv)
+    # server side of closed connections is not interesting
+    logging.getLogger('paramiko').addHandler(logging.NullHandler())
+    selected = [
+        b for b in BENCHMARKS if not args.names or b.__name__ in args.names
+    ]
+    tmpdir = tempfile.mkdtemp(prefix='rrmngmnt-bench-')
+    try:
+        with SSHServer() as server:
+            ctx = Context(server.port, args, tmpdir)
+            for bench in selected:
+                for name, value, unit in bench(ctx):
+                    sys.stdout.write("%-24s %12.1f %s\n" % (name, value, unit))
+                    sys.stdout.flush()
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
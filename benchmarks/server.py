@@ -0,0 +1,270 @@
+"""
+In-process SSH and SFTP server for benchmarks.
+
+It listens on loopback, accepts any credentials, executes commands by
+local shell and serves local filesystem over SFTP, so whole paramiko stack
+of RemoteExecutor is exercised without remote machine.
+
+Example:
+    with SSHServer() as server:
+        host.executor_factory = RemoteExecutorFactory(port=server.port)
+"""
+import os
+import selectors
+import socket
+import subprocess
+import threading
+
+import paramiko
+from paramiko.common import MSG_CHANNEL_REQUEST
+from paramiko.sftp_attr import SFTPAttributes
+from paramiko.sftp_handle import SFTPHandle
+from paramiko.sftp_server import SFTPServer
+from paramiko.sftp_si import SFTPServerInterface
+
+
+CHUNK_SIZE = 65536
+
+
+class FileHandle(SFTPHandle):
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+
+class LocalSFTPInterface(SFTPServerInterface):
+    """
+    Serves local filesystem, paths are taken as they are.
+    """
+    def list_folder(self, path):
+        try:
+            result = []
+            for name in os.listdir(path):
+                attr = SFTPAttributes.from_stat(
+                    os.stat(os.path.join(path, name))
+                )
+                attr.filename = name
+                result.append(attr)
+            return result
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(path))
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+
+    def lstat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.lstat(path))
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+
+    def open(self, path, flags, attr):
+        try:
+            fd = os.open(path, flags, 0o644)
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+        if flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+        elif flags & os.O_RDWR:
+            mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+        else:
+            mode = 'rb'
+        handle = FileHandle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+        return paramiko.SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        try:
+            os.rename(oldpath, newpath)
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+        return paramiko.SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        return self.rename(oldpath, newpath)
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(path)
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+        return paramiko.SFTP_OK
+
+    def rmdir(self, path):
+        try:
+            os.rmdir(path)
+        except OSError as ex:
+            return SFTPServer.convert_errno(ex.errno)
+        return paramiko.SFTP_OK
+
+    def chattr(self, path, attr):
+        return paramiko.SFTP_OK
+
+
+class ServerInterface(paramiko.ServerInterface):
+    """
+    Accepts everybody, runs exec requests by local shell.
+    """
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return 'password,publickey'
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        # started by ServerTransport once the request is acknowledged
+        channel.pending_command = command
+        return True
+
+
+class ServerTransport(paramiko.Transport):
+    """
+    Starts command after reply to exec request is sent, otherwise fast
+    command could close the channel before the client sees the reply.
+    """
+    _channel_handler_table = dict(paramiko.Transport._channel_handler_table)
+
+    def _handle_channel_request(chan, m):
+        paramiko.Channel._handle_request(chan, m)
+        command = getattr(chan, 'pending_command', None)
+        if command is not None:
+            chan.pending_command = None
+            thread = threading.Thread(target=execute, args=(chan, command))
+            thread.daemon = True
+            thread.start()
+
+    _channel_handler_table[MSG_CHANNEL_REQUEST] = _handle_channel_request
+
+
+def _feed(channel, stdin):
+    try:
+        while True:
+            data = channel.recv(CHUNK_SIZE)
+            if not data:
+                break
+            stdin.write(data)
+            stdin.flush()
+    except (IOError, OSError, EOFError):
+        pass
+    finally:
+        try:
+            stdin.close()
+        except (IOError, OSError):
+            pass
+
+
+def execute(channel, command):
+    """
+    Run command and pipe its streams to channel
+    """
+    process = subprocess.Popen(
+        command, shell=True, stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    feeder = threading.Thread(target=_feed, args=(channel, process.stdin))
+    feeder.daemon = True
+    feeder.start()
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ, channel.sendall)
+    selector.register(
+        process.stderr, selectors.EVENT_READ, channel.sendall_stderr,
+    )
+    try:
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, CHUNK_SIZE)
+                if data:
+                    key.data(data)
+                else:
+                    selector.unregister(key.fileobj)
+        channel.send_exit_status(process.wait())
+        channel.shutdown_write()
+    except (socket.error, EOFError):
+        process.kill()
+    finally:
+        selector.close()
+        try:
+            channel.close()
+        except EOFError:
+            # client already closed the connection
+            pass
+
+
+class SSHServer(object):
+    """
+    SSH server running in threads of this process.
+    """
+    def __init__(self, address='127.0.0.1'):
+        super(SSHServer, self).__init__()
+        self.address = address
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self._sock = None
+
+    @property
+    def port(self):
+        return self._sock.getsockname()[1]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self._sock = socket.socket()
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.address, 0))
+        self._sock.listen(128)
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self._sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except (socket.error, OSError):
+                return
+            thread = threading.Thread(target=self._handle, args=(conn,))
+            thread.daemon = True
+            thread.start()
+
+    def _handle(self, conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = ServerTransport(conn)
+        transport.add_server_key(self.host_key)
+        transport.set_subsystem_handler(
+            'sftp', SFTPServer, LocalSFTPInterface,
+        )
+        try:
+            transport.start_server(server=ServerInterface())
+        except (paramiko.SSHException, EOFError, socket.error):
+            return
+        while transport.is_active():
+            transport.join(1)
@@ -1,4 +1,6 @@
+from rrmngmnt.deadline import Deadline
 from rrmngmnt.host import Host
+from rrmngmnt.host_group import HostGroup
 from rrmngmnt.user import (
     User,
     RootUser,
@@ -10,7 +12,9 @@ from rrmngmnt.db import Database
 
 
 __all__ = [
+    'Deadline',
     'Host',
+    'HostGroup',
     'User',
     'RootUser',
     'Domain',
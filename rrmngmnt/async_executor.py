@@ -0,0 +1,305 @@
+"""
+This module provides asyncio interface for executors.
+
+The blocking ssh I/O is done by paramiko in a bounded pool of worker
+threads shared by all async executors, so single event loop can drive
+whole lab of hosts while number of threads stays constant. Only
+AsyncCommandReader, which can wait for output indefinitely, runs in its
+own thread.
+
+The async executor wraps the sync one given by Host.executor_factory, so
+services keep working with the sync executor, while new code can await
+host.async_executor().
+
+Example:
+    async def uptime(host):
+        rc, out, err = await host.async_executor().run_cmd(['uptime'])
+        return out
+
+    async def tail(host):
+        reader = AsyncCommandReader(
+            host.async_executor(), ['journalctl', '-f'],
+        )
+        async for line in reader.read_lines():
+            print(line)
+"""
+import asyncio
+import threading
+from concurrent import futures
+
+from rrmngmnt.common import CommandReader
+from rrmngmnt.resource import Resource
+from rrmngmnt.ssh import RemoteExecutor
+
+
+ASYNC_IO_WORKERS = 32
+# Max number of lines AsyncCommandReader reads ahead of its consumer
+READER_MAX_PENDING = 1024
+
+
+class AsyncExecutor(Resource):
+    """
+    Wraps any executor and exposes its operations as coroutines.
+    """
+    # Shared by all async executors, it bounds number of blocking
+    # operations running at once.
+    workers = futures.ThreadPoolExecutor(max_workers=ASYNC_IO_WORKERS)
+
+    class Session(object):
+        """
+        Async context manager around session of wrapped executor.
+
+        async with executor.session() as ss:
+            rc, out, err = await ss.run_cmd(['true'])
+        """
+        def __init__(self, executor, session):
+            super(AsyncExecutor.Session, self).__init__()
+            self._executor = executor
+            self._ss = session
+
+        async def __aenter__(self):
+            await self._executor._run(self._ss.__enter__)
+            return self
+
+        async def __aexit__(self, type_, value, tb):
+            return await self._executor._run(
+                self._ss.__exit__, type_, value, tb
+            )
+
+        async def run_cmd(self, cmd, input_=None, timeout=None):
+            """
+            Args:
+                cmd (list): command
+                input_ (str): input data
+                timeout (float): Timeout for data operation (read/write)
+
+            Returns:
+                tuple (int, str, str): rc, out, err
+            """
+            return await self._executor._run(
+                self._ss.run_cmd, cmd, input_, timeout
+            )
+
+        async def run_many(self, cmds, max_channels=None):
+            return await self._executor._run(
+                self._ss.run_many, cmds, max_channels
+            )
+
+        def open_file(self, path, mode='r', *args):
+            """
+            async with ss.open_file('/etc/hosts') as fh:
+                data = await fh.read()
+            """
+            return AsyncExecutor.File(
+                self._executor, self._ss.open_file, path, mode, *args
+            )
+
+    class File(object):
+        """
+        Async context manager around file opened by session.
+        """
+        def __init__(self, executor, open_file, *args):
+            super(AsyncExecutor.File, self).__init__()
+            self._executor = executor
+            self._open = open_file
+            self._args = args
+            self._cm = None
+            self._fh = None
+
+        async def __aenter__(self):
+            def _open():
+                self._cm = self._open(*self._args)
+                self._fh = self._cm.__enter__()
+            await self._executor._run(_open)
+            return self
+
+        async def __aexit__(self, type_, value, tb):
+            return await self._executor._run(
+                self._cm.__exit__, type_, value, tb
+            )
+
+        async def read(self, size=-1):
+            return await self._executor._run(self._fh.read, size)
+
+        async def readline(self):
+            return await self._executor._run(self._fh.readline)
+
+        async def write(self, data):
+            return await self._executor._run(self._fh.write, data)
+
+    def __init__(self, executor):
+        """
+        Args:
+            executor (Executor): executor doing the blocking work
+        """
+        super(AsyncExecutor, self).__init__()
+        self.executor = executor
+        self.set_logger(executor.logger)
+
+    @property
+    def user(self):
+        return self.executor.user
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.workers, func, *args)
+
+    def session(self, *args, **kwargs):
+        """
+        Returns:
+            instance of AsyncExecutor.Session: The session
+        """
+        return AsyncExecutor.Session(
+            self, self.executor.session(*args, **kwargs)
+        )
+
+    async def run_cmd(self, cmd, input_=None, **kwargs):
+        """
+        Args:
+            cmd (list): Command
+            input_ (str): Input data
+            kwargs (dict): Passed to run_cmd of wrapped executor, like
+                tcp_timeout or io_timeout
+
+        Returns:
+            tuple (int, str, str): Rc, out, err
+        """
+        return await self._run(
+            lambda: self.executor.run_cmd(cmd, input_, **kwargs)
+        )
+
+    async def run(self, cmd, input_=None, **kwargs):
+        """
+        Args:
+            cmd (list): Command
+            input_ (str): Input data
+            kwargs (dict): Passed to run of wrapped executor, like binary
+
+        Returns:
+            CommandResult: Result of command
+        """
+        return await self._run(
+            lambda: self.executor.run(cmd, input_, **kwargs)
+        )
+
+
+class AsyncRemoteExecutor(AsyncExecutor):
+    """
+    Async counterpart of RemoteExecutor.
+    """
+    def __init__(self, user, address, use_pkey=False, port=22, use_pool=False):
+        """
+        Args:
+            use_pkey (bool): Use ssh private key in the connection
+            user (instance of User): User
+            address (str): Ip / hostname
+            port (int): Port to connect
+            use_pool (bool): Reuse authenticated connections
+        """
+        super(AsyncRemoteExecutor, self).__init__(
+            RemoteExecutor(
+                user, address, use_pkey=use_pkey, port=port,
+                use_pool=use_pool,
+            )
+        )
+
+    @property
+    def address(self):
+        return self.executor.address
+
+    @property
+    def port(self):
+        return self.executor.port
+
+    async def is_connective(self, tcp_timeout=20.0):
+        return await self._run(self.executor.is_connective, tcp_timeout)
+
+
+class AsyncCommandReader(object):
+    """
+    Async counterpart of CommandReader.
+
+    cr = AsyncCommandReader(async_executor, ['ansible-playbook', 'x.yml'])
+    async for line in cr.read_lines():
+        print(line)
+    """
+    def __init__(
+        self, executor, cmd, cmd_input=None, retain=True, timeout=None,
+    ):
+        """
+        Args:
+            executor (AsyncExecutor): executor that executes command
+            cmd (list): Command to be executed
+            cmd_input (str): Input for the command
+            retain (bool): Collect output into out and err attributes
+            timeout (float): Max time to wait for next output of command
+        """
+        self.executor = executor
+        self._reader = CommandReader(
+            executor.executor, cmd, cmd_input, retain=retain,
+            timeout=timeout,
+        )
+
+    @property
+    def rc(self):
+        return self._reader.rc
+
+    @property
+    def out(self):
+        return self._reader.out
+
+    @property
+    def err(self):
+        return self._reader.err
+
+    async def read_lines(self):
+        """
+        Async generator that yields lines of command output as they come.
+        Each reader waits for output in its own thread, so long running
+        commands like 'journalctl -f' do not hold AsyncExecutor.workers.
+
+        Yields:
+            str: Line of command's output stripped of newline character
+        """
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+        # bounds lines read ahead of the consumer
+        slots = threading.Semaphore(READER_MAX_PENDING)
+        stopped = threading.Event()
+        end = object()
+
+        def put(item):
+            if not stopped.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        def pump():
+            result = (end, None)
+            lines = self._reader.read_lines()
+            try:
+                for line in lines:
+                    slots.acquire()
+                    if stopped.is_set():
+                        return
+                    put((line, None))
+            except Exception as ex:
+                result = (end, ex)
+            finally:
+                lines.close()
+            put(result)
+
+        thread = threading.Thread(target=pump, name='AsyncCommandReader')
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                line, error = await queue.get()
+                if error is not None:
+                    raise error
+                if line is end:
+                    break
+                slots.release()
+                yield line
+        finally:
+            stopped.set()
+            # wake up the thread waiting for slot
+            slots.release()
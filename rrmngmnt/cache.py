@@ -0,0 +1,368 @@
+"""
+This module provides opt-in cache of results of read-only commands.
+
+Helpers like OperatingSystem.get_release_info or PackageManager.is_available
+run the same commands over and over, with cache enabled they are executed
+once per TTL. Any other command executed through the same host drops whole
+cache of that host, as it could change what the cached commands report.
+
+Example:
+    host.executor_factory = CachingExecutorFactory(host.executor_factory)
+    host.os.get_release_info()
+    host.os.get_release_info()  # served from cache
+    print(host.executor_factory.stats())
+"""
+import collections
+import threading
+import time
+
+import six
+
+from rrmngmnt.executor import Executor, ExecutorFactory
+
+
+CACHE_TTL = 60
+CACHE_MAX_SIZE = 256
+
+# Commands given by argv prefix, which do not change state of host; sort,
+# uniq and awk are left out, they can write files by their arguments.
+# Arguments of some of them are further checked by ARGUMENT_CHECKS.
+READ_ONLY_COMMANDS = frozenset([
+    ('[',), ('test',), ('cat',), ('ls',), ('stat',), ('readlink',),
+    ('which',), ('uname',), ('hostname',), ('id',), ('getent',),
+    ('head',), ('tail',), ('grep',), ('cut',), ('wc',), ('tr',),
+    ('ip',),
+    ('systemctl', 'list-unit-files'), ('systemctl', 'list-units'),
+    ('systemctl', 'is-active'), ('systemctl', 'is-enabled'),
+    ('systemctl', 'show'),
+])
+# Words which make any command above mutating, like 'ip route add'
+MUTATING_WORDS = frozenset([
+    'add', 'del', 'delete', 'set', 'flush', 'change', 'replace',
+    'append', 'prepend',
+])
+SHELL_OPERATORS = frozenset([';', '|', '&&', '||', '&'])
+HOSTNAME_READ_OPTIONS = frozenset(['-f', '-s', '--fqdn', '--short'])
+IP_READ_OBJECTS = frozenset(['route', 'addr', 'address', 'link'])
+IP_READ_VERBS = frozenset(['show', 'list'])
+
+
+def _hostname_read_only(args):
+    # any other argument sets the hostname
+    return all(arg in HOSTNAME_READ_OPTIONS for arg in args)
+
+
+def _ip_read_only(args):
+    # verbs can be abbreviated, like 'ip addr a', only full show and list
+    # are accepted
+    args = [arg for arg in args if not arg.startswith('-')]
+    if not args or args[0] not in IP_READ_OBJECTS:
+        return False
+    return len(args) == 1 or args[1] in IP_READ_VERBS
+
+
+def _tail_read_only(args):
+    # follow mode never finishes, its output changes meanwhile
+    for arg in args:
+        if arg.startswith('--follow'):
+            return False
+        if arg.startswith('-') and not arg.startswith('--') and (
+            'f' in arg or 'F' in arg
+        ):
+            return False
+    return True
+
+
+# Checks of arguments of commands, which are read-only only in some forms
+ARGUMENT_CHECKS = {
+    'hostname': _hostname_read_only,
+    'ip': _ip_read_only,
+    'tail': _tail_read_only,
+}
+
+
+def is_read_only(cmd):
+    """
+    Check whether command only reads state of host
+
+    Args:
+        cmd (list): command, it can be pipeline split by shell operators
+
+    Returns:
+        bool: True if each part of pipeline is known read-only command
+    """
+    if isinstance(cmd, six.string_types):
+        return False
+    segments = [[]]
+    for word in cmd:
+        if word in SHELL_OPERATORS:
+            segments.append([])
+        elif '>' in word or '<' in word or '`' in word or '$(' in word:
+            return False
+        else:
+            segments[-1].append(word)
+    for segment in segments:
+        if not segment or MUTATING_WORDS.intersection(segment):
+            return False
+        if not any(
+            tuple(segment[:len(prefix)]) == prefix
+            for prefix in READ_ONLY_COMMANDS
+        ):
+            return False
+        check = ARGUMENT_CHECKS.get(segment[0])
+        if check is not None and not check(segment[1:]):
+            return False
+    return True
+
+
+class CommandCache(object):
+    """
+    Results of commands of one host, bounded by TTL and max number of
+    entries, least recently used entries are evicted first.
+    """
+    def __init__(self, ttl=CACHE_TTL, max_size=CACHE_MAX_SIZE):
+        """
+        Args:
+            ttl (float): Seconds for which result is valid
+            max_size (int): Max number of cached results
+        """
+        super(CommandCache, self).__init__()
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Args:
+            key (tuple): key of command
+
+        Returns:
+            tuple: cached (rc, out, err), or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """
+        Drop all cached results
+        """
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, invalidations and size of cache
+        """
+        with self._lock:
+            return dict(
+                hits=self.hits, misses=self.misses,
+                invalidations=self.invalidations, size=len(self._entries),
+            )
+
+
+class CachingExecutor(Executor):
+    """
+    Wraps executor and serves results of read-only commands from cache.
+    """
+
+    class Session(Executor.Session):
+        """
+        Wraps session of underlying executor.
+        """
+        def __init__(self, executor, session):
+            super(CachingExecutor.Session, self).__init__(executor)
+            self._ss = session
+
+        def __enter__(self):
+            self._ss.__enter__()
+            return self
+
+        def __exit__(self, type_, value, tb):
+            self._shutdown_workers()
+            return self._ss.__exit__(type_, value, tb)
+
+        def command(self, cmd):
+            # caller works with streams directly, it can do anything
+            self._executor.cache.invalidate()
+            return self._ss.command(cmd)
+
+        def run_cmd(self, cmd, input_=None, *args, **kwargs):
+            return self._executor._cached(
+                cmd, input_, kwargs,
+                lambda: self._ss.run_cmd(cmd, input_, *args, **kwargs),
+            )
+
+        def run_batch(self, cmds):
+            cmds = list(cmds)
+            try:
+                return self._ss.run_batch(cmds)
+            finally:
+                if not all(is_read_only(cmd) for cmd in cmds):
+                    self._executor.cache.invalidate()
+
+        def open_file(self, path, mode='r', *args):
+            if not mode.startswith('r') or '+' in mode:
+                self._executor.cache.invalidate()
+            return self._ss.open_file(path, mode, *args)
+
+        def stat(self, path):
+            return self._ss.stat(path)
+
+        def listdir(self, path='.'):
+            return self._ss.listdir(path)
+
+        def rename(self, src, dst):
+            self._executor.cache.invalidate()
+            return self._ss.rename(src, dst)
+
+        def remove(self, path):
+            self._executor.cache.invalidate()
+            return self._ss.remove(path)
+
+    def __init__(self, executor, cache):
+        """
+        Args:
+            executor (Executor): executor doing the real work
+            cache (CommandCache): cache of the host
+        """
+        super(CachingExecutor, self).__init__(executor.user)
+        self.executor = executor
+        self.cache = cache
+        self.set_logger(executor.logger)
+
+    def __getattr__(self, name):
+        # address, port, is_connective, ... of wrapped executor
+        if name == 'executor':
+            raise AttributeError(name)
+        return getattr(self.executor, name)
+
+    def _cached(self, cmd, input_, kwargs, run):
+        if input_ is not None or kwargs.get('max_memory') is not None or (
+            not is_read_only(cmd)
+        ):
+            try:
+                return run()
+            finally:
+                self.cache.invalidate()
+        key = (tuple(cmd), self.user.name)
+        result = self.cache.get(key)
+        if result is None:
+            result = tuple(run())
+            self.cache.put(key, result)
+        else:
+            self.logger.debug("Cached result of: %s", cmd)
+        return result
+
+    def session(self, *args, **kwargs):
+        """
+        Returns:
+            instance of CachingExecutor.Session: The session
+        """
+        return CachingExecutor.Session(
+            self, self.executor.session(*args, **kwargs)
+        )
+
+    def run_cmd(self, cmd, input_=None, **kwargs):
+        """
+        Args:
+            cmd (list): Command
+            input_ (str): Input data
+            kwargs (dict): Passed to run_cmd of wrapped executor
+
+        Returns:
+            tuple (int, str, str): Rc, out, err
+        """
+        return self._cached(
+            cmd, input_, kwargs,
+            lambda: self.executor.run_cmd(cmd, input_, **kwargs),
+        )
+
+
+class CachingExecutorFactory(ExecutorFactory):
+    """
+    Wraps executors built by another factory into CachingExecutor, each
+    host has its own cache shared by all its users.
+    """
+    def __init__(self, factory, ttl=CACHE_TTL, max_size=CACHE_MAX_SIZE):
+        """
+        Args:
+            factory (ExecutorFactory): Factory of wrapped executors
+            ttl (float): Seconds for which result is valid
+            max_size (int): Max number of cached results per host
+        """
+        self.factory = factory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.caches = dict()
+        self._lock = threading.Lock()
+
+    def get_cache(self, host):
+        """
+        Returns:
+            CommandCache: cache of host
+        """
+        with self._lock:
+            cache = self.caches.get(host.ip)
+            if cache is None:
+                cache = self.caches[host.ip] = CommandCache(
+                    self.ttl, self.max_size,
+                )
+            return cache
+
+    def build(self, host, user):
+        return CachingExecutor(
+            self.factory.build(host, user), self.get_cache(host),
+        )
+
+    def invalidate(self, host=None):
+        """
+        Drop cached results of host, or of all hosts
+
+        Args:
+            host (Host): host, None means all hosts
+        """
+        with self._lock:
+            if host is None:
+                caches = list(self.caches.values())
+            else:
+                caches = [c for ip, c in self.caches.items() if ip == host.ip]
+        for cache in caches:
+            cache.invalidate()
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, invalidations and size summed over hosts
+        """
+        total = collections.Counter(
+            hits=0, misses=0, invalidations=0, size=0,
+        )
+        with self._lock:
+            caches = list(self.caches.values())
+        for cache in caches:
+            total.update(cache.stats())
+        return dict(total)
@@ -0,0 +1,502 @@
+"""
+This module records commands and file transfers executed against real
+hosts into cassette, and serves them back without any host.
+
+Cassette is a file with one JSON object per line, gzip compressed when
+its name ends with '.gz'. Commands are stored with argv, input, rc, stdout
+and stderr, files with path, mode and content which was read or written.
+
+Replay serves recorded results of the same command in recorded order,
+the last one is repeated once they run out, so replayed code can be
+called in loop, for example by benchmark.
+
+Example:
+    host.executor_factory = RecordingExecutorFactory(
+        host.executor_factory, 'network.jsonl.gz',
+    )
+    host.network.get_info()
+
+    host.executor_factory = ReplayExecutorFactory('network.jsonl.gz')
+    host.network.get_info()  # no host involved
+"""
+import base64
+import collections
+import contextlib
+import gzip
+import io
+import json
+import threading
+
+import six
+
+from rrmngmnt import errors
+from rrmngmnt.common import SpooledOutput, normalize_string
+from rrmngmnt.executor import Executor, ExecutorFactory, STDERR, STDOUT
+
+
+CASSETTE_VERSION = 1
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return io.open(path, mode)
+
+
+def _encode(data):
+    """
+    Returns:
+        tuple: (text, encoding), encoding is None for text data
+    """
+    if isinstance(data, six.binary_type):
+        try:
+            return data.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            return base64.b64encode(data).decode('ascii'), 'base64'
+    return data, None
+
+
+def _decode(data, encoding):
+    if encoding == 'utf-8':
+        return data.encode('utf-8')
+    if encoding == 'base64':
+        return base64.b64decode(data)
+    return data
+
+
+def _command_key(cmd, input_):
+    if input_ is not None:
+        input_ = normalize_string(input_)
+    return 'command', json.dumps(cmd), input_
+
+
+def _file_key(path):
+    return 'file', path
+
+
+class Cassette(object):
+    """
+    Recorded entries of all hosts, keyed by host address and user name.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path to cassette file
+        """
+        super(Cassette, self).__init__()
+        self.path = path
+        self._entries = collections.defaultdict(list)
+        self._positions = collections.Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    @staticmethod
+    def _key(entry):
+        if entry['type'] == 'command':
+            key = _command_key(entry['cmd'], entry['input'])
+        else:
+            key = _file_key(entry['path'])
+        return (entry['host'], entry['user']) + key
+
+    def create(self):
+        """
+        Start new empty cassette file
+        """
+        with self._lock:
+            with _open(self.path, 'wt') as fh:
+                fh.write(u"%s\n" % json.dumps({'version': CASSETTE_VERSION}))
+            self._entries.clear()
+            self._positions.clear()
+
+    def load(self):
+        """
+        Read entries of cassette file
+        """
+        with self._lock:
+            with _open(self.path, 'rt') as fh:
+                header = json.loads(fh.readline())
+                if header.get('version') != CASSETTE_VERSION:
+                    raise ValueError(
+                        "Unsupported version of cassette %s: %s" % (
+                            self.path, header.get('version'),
+                        )
+                    )
+                for line in fh:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[self._key(entry)].append(entry)
+
+    def record(self, entry):
+        """
+        Append entry to cassette file
+        """
+        line = u"%s\n" % json.dumps(entry, sort_keys=True)
+        with self._lock:
+            self._entries[self._key(entry)].append(entry)
+            with _open(self.path, 'at') as fh:
+                fh.write(line)
+
+    def play(self, host, user, key):
+        """
+        Args:
+            host (str): Address of host
+            user (str): Name of user
+            key (tuple): Key of command or file
+
+        Returns:
+            dict: Next recorded entry, None if there is no such entry
+        """
+        key = (host, user) + key
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            position = self._positions[key]
+            self._positions[key] = min(position + 1, len(entries) - 1)
+            return entries[position]
+
+
+class _RecordingFile(object):
+    """
+    Proxy of file object collecting data which passed through it.
+    """
+    def __init__(self, fh):
+        super(_RecordingFile, self).__init__()
+        self._fh = fh
+        self.chunks = list()
+
+    def __getattr__(self, name):
+        return getattr(self._fh, name)
+
+    def __iter__(self):
+        return iter(self.readline, self._fh.read(0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def _collect(self, data):
+        self.chunks.append(data)
+        return data
+
+    def read(self, *args):
+        return self._collect(self._fh.read(*args))
+
+    def readline(self, *args):
+        return self._collect(self._fh.readline(*args))
+
+    def readlines(self, *args):
+        return [self._collect(line) for line in self._fh.readlines(*args)]
+
+    def write(self, data):
+        self._collect(data)
+        return self._fh.write(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    @property
+    def data(self):
+        if not self.chunks:
+            return u''
+        return self.chunks[0][:0].join(self.chunks)
+
+
+class RecordingExecutor(Executor):
+    """
+    Wraps executor and records what passes through it into cassette.
+    """
+
+    class Session(Executor.Session):
+        """
+        Wraps session of underlying executor.
+        """
+        def __init__(self, executor, session):
+            super(RecordingExecutor.Session, self).__init__(executor)
+            self._ss = session
+
+        def __enter__(self):
+            self._ss.__enter__()
+            return self
+
+        def __exit__(self, type_, value, tb):
+            self._shutdown_workers()
+            return self._ss.__exit__(type_, value, tb)
+
+        def command(self, cmd):
+            return RecordingExecutor.Command(cmd, self)
+
+        def run_cmd(self, cmd, input_=None, *args, **kwargs):
+            rc, out, err = self._ss.run_cmd(cmd, input_, *args, **kwargs)
+            self._executor.record_command(cmd, input_, rc, out, err)
+            return rc, out, err
+
+        def run_batch(self, cmds):
+            cmds = list(cmds)
+            results = self._ss.run_batch(cmds)
+            for cmd, (rc, out, err) in zip(cmds, results):
+                self._executor.record_command(cmd, None, rc, out, err)
+            return results
+
+        @contextlib.contextmanager
+        def open_file(self, path, mode='r', *args):
+            with self._ss.open_file(path, mode, *args) as fh:
+                recording = _RecordingFile(fh)
+                yield recording
+            self._executor.record_file(path, mode, recording.data)
+
+    class Command(Executor.Command):
+        """
+        Wraps command of underlying session, output of run and stream is
+        recorded, execute gives raw streams and it is not recorded.
+        """
+        def __init__(self, cmd, session):
+            super(RecordingExecutor.Command, self).__init__(cmd, session)
+            self._cmd = session._ss.command(cmd)
+
+        def get_rc(self, wait=False):
+            if wait:
+                return self._cmd.get_rc(wait)
+            return self._cmd.rc
+
+        def execute(self, *args, **kwargs):
+            return self._cmd.execute(*args, **kwargs)
+
+        def run(self, input_, *args, **kwargs):
+            rc, out, err = self._cmd.run(input_, *args, **kwargs)
+            self.out, self.err = out, err
+            self._ss._executor.record_command(self.cmd, input_, rc, out, err)
+            return rc, out, err
+
+        def stream(self, input_=None, *args, **kwargs):
+            chunks = {STDOUT: [], STDERR: []}
+            for source, chunk in self._cmd.stream(input_, *args, **kwargs):
+                chunks[source].append(normalize_string(chunk))
+                yield source, chunk
+            self.out = ''.join(chunks[STDOUT])
+            self.err = ''.join(chunks[STDERR])
+            self._ss._executor.record_command(
+                self.cmd, input_, self._cmd.rc, self.out, self.err,
+            )
+
+    def __init__(self, executor, cassette, address):
+        """
+        Args:
+            executor (Executor): executor doing the real work
+            cassette (Cassette): cassette to record into
+            address (str): address of host, key of recorded entries
+        """
+        super(RecordingExecutor, self).__init__(executor.user)
+        self.executor = executor
+        self.cassette = cassette
+        self.address = address
+        self.set_logger(executor.logger)
+
+    def __getattr__(self, name):
+        # port, is_connective, ... of wrapped executor
+        if name == 'executor':
+            raise AttributeError(name)
+        return getattr(self.executor, name)
+
+    def record_command(self, cmd, input_, rc, out, err):
+        if input_ is not None:
+            input_ = normalize_string(input_)
+        self.cassette.record({
+            'type': 'command', 'host': self.address, 'user': self.user.name,
+            'cmd': cmd, 'input': input_, 'rc': rc,
+            'out': normalize_string(six.text_type(out)),
+            'err': normalize_string(six.text_type(err)),
+        })
+
+    def record_file(self, path, mode, data):
+        data, encoding = _encode(data)
+        self.cassette.record({
+            'type': 'file', 'host': self.address, 'user': self.user.name,
+            'path': path, 'mode': mode, 'data': data, 'encoding': encoding,
+        })
+
+    def session(self, *args, **kwargs):
+        """
+        Returns:
+            instance of RecordingExecutor.Session: The session
+        """
+        return RecordingExecutor.Session(
+            self, self.executor.session(*args, **kwargs)
+        )
+
+    def run_cmd(self, cmd, input_=None, **kwargs):
+        """
+        Args:
+            cmd (list): Command
+            input_ (str): Input data
+            kwargs (dict): Passed to run_cmd of wrapped executor
+
+        Returns:
+            tuple (int, str, str): Rc, out, err
+        """
+        rc, out, err = self.executor.run_cmd(cmd, input_, **kwargs)
+        self.record_command(cmd, input_, rc, out, err)
+        return rc, out, err
+
+
+class ReplayExecutor(Executor):
+    """
+    Serves commands and files recorded in cassette.
+    """
+
+    class Session(Executor.Session):
+        def __init__(self, executor, *args, **kwargs):
+            super(ReplayExecutor.Session, self).__init__(executor)
+
+        def open(self):
+            pass
+
+        def command(self, cmd):
+            return ReplayExecutor.Command(cmd, self)
+
+        def run_cmd(self, cmd, input_=None, *args, **kwargs):
+            return self.command(cmd).run(
+                input_, max_memory=kwargs.get('max_memory'),
+            )
+
+        @contextlib.contextmanager
+        def open_file(self, path, mode='r', *args):
+            binary = 'b' in mode
+            if mode.startswith('r'):
+                entry = self._executor.play(_file_key(path))
+                data = _decode(entry['data'], entry['encoding'])
+                if binary and isinstance(data, six.text_type):
+                    data = data.encode('utf-8')
+                elif not binary and isinstance(data, six.binary_type):
+                    data = data.decode('utf-8')
+            else:
+                data = b'' if binary else u''
+            fh = io.BytesIO(data) if binary else io.StringIO(data)
+            with self.file_hooks(path, mode):
+                yield fh
+
+    class Command(Executor.Command):
+        def get_rc(self, wait=False):
+            return self._rc
+
+        def _play(self, input_):
+            entry = self._ss._executor.play(_command_key(self.cmd, input_))
+            self._rc, self.out, self.err = (
+                entry['rc'], entry['out'], entry['err'],
+            )
+
+        @contextlib.contextmanager
+        def execute(self, bufsize=-1, timeout=None):
+            self._command_started()
+            try:
+                self._play(None)
+                yield (
+                    io.StringIO(), io.StringIO(self.out),
+                    io.StringIO(self.err),
+                )
+            finally:
+                self._command_finished()
+
+        def run(self, input_, *args, **kwargs):
+            self._command_started()
+            try:
+                self._play(input_)
+            finally:
+                self._command_finished()
+            max_memory = kwargs.get('max_memory')
+            if max_memory is not None:
+                return self._rc, SpooledOutput.of(self.out, max_memory), (
+                    SpooledOutput.of(self.err, max_memory)
+                )
+            return self._rc, self.out, self.err
+
+        def stream(self, input_=None, *args, **kwargs):
+            self.run(input_)
+            for source, data in ((STDOUT, self.out), (STDERR, self.err)):
+                if data:
+                    yield source, data
+
+    def __init__(self, user, address, cassette):
+        """
+        Args:
+            user (User): User, its name is key of recorded entries
+            address (str): Address of host, key of recorded entries
+            cassette (Cassette): Loaded cassette
+        """
+        super(ReplayExecutor, self).__init__(user)
+        self.address = address
+        self.cassette = cassette
+
+    def play(self, key):
+        """
+        Returns:
+            dict: Recorded entry
+
+        Raises:
+            ReplayFailure: There is no such entry in cassette
+        """
+        entry = self.cassette.play(self.address, self.user.name, key)
+        if entry is None:
+            raise errors.ReplayFailure(self, key[1])
+        return entry
+
+    def session(self, *args, **kwargs):
+        """
+        Returns:
+            instance of ReplayExecutor.Session: The session
+        """
+        return ReplayExecutor.Session(self)
+
+    def run_cmd(self, cmd, input_=None, **kwargs):
+        with self.session() as session:
+            return session.run_cmd(
+                cmd, input_, max_memory=kwargs.get('max_memory'),
+            )
+
+    def is_connective(self, tcp_timeout=20.0):
+        return True
+
+    def wait_for_connectivity_state(self, positive, *args, **kwargs):
+        return positive
+
+
+class RecordingExecutorFactory(ExecutorFactory):
+    """
+    Wraps executors built by another factory into RecordingExecutor, all
+    hosts are recorded into the same cassette.
+    """
+    def __init__(self, factory, path):
+        """
+        Args:
+            factory (ExecutorFactory): Factory of wrapped executors
+            path (str): Path of cassette, existing file is overwritten
+        """
+        self.factory = factory
+        self.cassette = Cassette(path)
+        self.cassette.create()
+
+    def build(self, host, user):
+        return RecordingExecutor(
+            self.factory.build(host, user), self.cassette, host.ip,
+        )
+
+
+class ReplayExecutorFactory(ExecutorFactory):
+    """
+    Builds ReplayExecutor instances serving recorded cassette.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of recorded cassette
+        """
+        self.cassette = Cassette(path)
+        self.cassette.load()
+
+    def build(self, host, user):
+        return ReplayExecutor(user, host.ip, self.cassette)
@@ -1,5 +1,21 @@
+import codecs
+import collections
+import mmap
+import os
 import six
 import socket
+import tempfile
+import threading
+import time
+
+from rrmngmnt.executor import STDERR, STDOUT
+
+# Max size of single SFTP read or write request
+COPY_CHUNK_SIZE = 32768
+# Number of read requests in flight, it bounds memory of prefetched data
+COPY_PREFETCH = 32
+# Min interval between two calls of progress handler in seconds
+PROGRESS_INTERVAL = 1.0
 
 
 def fqdn2ip(fqdn):
@@ -37,6 +53,352 @@ def normalize_string(data):
     return data
 
 
+class OutputBuffer(object):
+    """
+    Collects chunks of command output. When max_size is set, only the last
+    max_size bytes are retained, so memory stays bounded however much
+    output the command produces.
+    """
+    def __init__(self, max_size=None):
+        """
+        Args:
+            max_size (int): Max number of retained bytes, None means no limit
+        """
+        self.max_size = max_size
+        self.total = 0
+        self._chunks = collections.deque()
+        self._size = 0
+
+    def write(self, chunk):
+        self.total += len(chunk)
+        if self.max_size == 0 or not chunk:
+            return
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+        if self.max_size is None:
+            return
+        while self._size - len(self._chunks[0]) >= self.max_size:
+            self._size -= len(self._chunks.popleft())
+        if self._size > self.max_size:
+            excess = self._size - self.max_size
+            self._chunks[0] = self._chunks[0][excess:]
+            self._size = self.max_size
+
+    @property
+    def truncated(self):
+        return self.total > self._size
+
+    def getvalue(self):
+        """
+        Returns:
+            bytes: retained data
+        """
+        return six.b('').join(self._chunks)
+
+
+class SpooledOutput(object):
+    """
+    Command output which is kept in memory until it exceeds max_memory
+    bytes, then it is spooled to local temporary file. The data are
+    decoded lazily, when lines are iterated or text is accessed.
+
+    Example:
+        rc, out, err = executor.run_cmd(['journalctl'], max_memory=2 ** 20)
+        if 'Out of memory' in out:
+            for line in out:
+                ...
+    """
+    def __init__(self, max_memory=0):
+        """
+        Args:
+            max_memory (int): Max number of bytes kept in memory, 0 means
+                the output goes to file right away
+        """
+        self.max_memory = max_memory
+        self._fh = six.BytesIO()
+        self._size = 0
+        self.spooled = False
+
+    @classmethod
+    def of(cls, data, max_memory=0):
+        """
+        Wrap output which is already in memory, for executors which do not
+        spool by themselves.
+
+        Args:
+            data (str): output, text or bytes
+            max_memory (int): Max number of bytes kept in memory
+
+        Returns:
+            SpooledOutput: output with data written
+        """
+        output = cls(max_memory)
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        output.write(data)
+        return output
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """
+        Yields:
+            str: Lines of output stripped of newline character
+        """
+        self._fh.seek(0)
+        for line in self._fh:
+            yield normalize_string(line).rstrip('\n')
+        self._fh.seek(0, 2)
+
+    def __contains__(self, sub):
+        return self.find(sub) != -1
+
+    def __str__(self):
+        return self.text
+
+    def write(self, chunk):
+        if not self.spooled and self._size + len(chunk) > self.max_memory:
+            fh = tempfile.TemporaryFile(prefix='rrmngmnt-')
+            fh.write(self._fh.getvalue())
+            self._fh = fh
+            self.spooled = True
+        self._fh.write(chunk)
+        self._size += len(chunk)
+
+    def read(self):
+        """
+        Returns:
+            bytes: whole output
+        """
+        self._fh.seek(0)
+        try:
+            return self._fh.read()
+        finally:
+            self._fh.seek(0, 2)
+
+    @property
+    def text(self):
+        return normalize_string(self.read())
+
+    def mmap(self):
+        """
+        Map spooled output into memory
+
+        Returns:
+            mmap.mmap: read-only map of file with output
+        """
+        if not self.spooled:
+            raise ValueError("Output is not spooled to file")
+        self._fh.flush()
+        return mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def find(self, sub, start=0):
+        """
+        Search output for substring without loading it into memory
+
+        Args:
+            sub (str): substring to find
+            start (int): offset where to start the search
+
+        Returns:
+            int: byte offset of first occurrence, -1 when not found
+        """
+        if isinstance(sub, six.text_type):
+            sub = sub.encode('utf-8')
+        if not self.spooled:
+            return self._fh.getvalue().find(sub, start)
+        if not self._size:
+            return -1
+        data = self.mmap()
+        try:
+            return data.find(sub, start)
+        finally:
+            data.close()
+
+    def close(self):
+        self._fh.close()
+
+
+class TransferProgress(object):
+    """
+    State of file transfer passed to progress handler, it is shared by all
+    streams of multi-stream transfer.
+    """
+    def __init__(self, total=None, progress_handler=None):
+        """
+        Args:
+            total (int): Size of transferred file, None if unknown
+            progress_handler (func): Called with this object at most once
+                per PROGRESS_INTERVAL, and once the transfer is done
+        """
+        self.total = total
+        self.transferred = 0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self._handler = progress_handler
+        self._reported = self.started
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        """
+        Returns:
+            float: bytes per second
+        """
+        return self.transferred / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return "TransferProgress(%s/%s bytes, %.0f B/s)" % (
+            self.transferred, self.total, self.rate,
+        )
+
+    def update(self, size):
+        with self._lock:
+            self.transferred += size
+            now = time.monotonic()
+            self.elapsed = now - self.started
+            if self._handler and now - self._reported >= PROGRESS_INTERVAL:
+                self._reported = now
+                self._handler(self)
+
+    def done(self):
+        if self._handler:
+            with self._lock:
+                self._handler(self)
+
+
+def _file_size(fh):
+    try:
+        if hasattr(fh, 'stat'):
+            # sftp file
+            return fh.stat().st_size
+        return os.fstat(fh.fileno()).st_size
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
+def _read_range(fh, start, end, chunk_size, prefetch):
+    if hasattr(fh, 'readv'):
+        # sftp file, keep prefetch requests in flight instead of waiting
+        # for each chunk, one window of them at a time
+        window = chunk_size * prefetch
+        for offset in six.moves.range(start, end, window):
+            for chunk in fh.readv([
+                (o, min(chunk_size, end - o)) for o in six.moves.range(
+                    offset, min(offset + window, end), chunk_size,
+                )
+            ]):
+                yield chunk
+        return
+    if start:
+        fh.seek(start)
+    position = start
+    while position < end:
+        chunk = fh.read(min(chunk_size, end - position))
+        if not chunk:
+            return
+        position += len(chunk)
+        yield chunk
+
+
+def _read_chunks(fh, size, chunk_size, prefetch):
+    if size and hasattr(fh, 'readv'):
+        for chunk in _read_range(fh, 0, size, chunk_size, prefetch):
+            yield chunk
+    # rest of file, or whole file when size is unknown
+    while True:
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _pipeline(wh):
+    if hasattr(wh, 'set_pipelined'):
+        # do not wait for ack of each write, errors come on close
+        wh.set_pipelined(True)
+
+
+def copy_file(
+    rh, wh, chunk_size=COPY_CHUNK_SIZE, progress_handler=None,
+    prefetch=COPY_PREFETCH,
+):
+    """
+    Copy content of file by chunks, so memory stays constant however big
+    the file is. SFTP files are read ahead and written pipelined.
+
+    Args:
+        rh (file): Source file opened for reading
+        wh (file): Destination file opened for writing
+        chunk_size (int): Size of single read and write
+        progress_handler (func): Called with TransferProgress at most once
+            per PROGRESS_INTERVAL, and once the copy is done
+        prefetch (int): Number of chunks read ahead from SFTP file
+
+    Returns:
+        int: Number of copied bytes
+    """
+    size = _file_size(rh)
+    _pipeline(wh)
+    progress = TransferProgress(size, progress_handler)
+    for chunk in _read_chunks(rh, size, chunk_size, prefetch):
+        wh.write(chunk)
+        progress.update(len(chunk))
+    progress.done()
+    return progress.transferred
+
+
+def copy_range(
+    rh, wh, start, end, chunk_size=COPY_CHUNK_SIZE, progress=None,
+    prefetch=COPY_PREFETCH,
+):
+    """
+    Copy byte range of file to the same position of destination file
+
+    Args:
+        rh (file): Source file opened for reading
+        wh (file): Destination file opened for writing without truncation
+        start (int): Offset of first byte
+        end (int): Offset after last byte
+        chunk_size (int): Size of single read and write
+        progress (TransferProgress): Progress of whole transfer
+        prefetch (int): Number of chunks read ahead from SFTP file
+
+    Returns:
+        int: Number of copied bytes
+    """
+    _pipeline(wh)
+    wh.seek(start)
+    copied = 0
+    for chunk in _read_range(rh, start, end, chunk_size, prefetch):
+        wh.write(chunk)
+        copied += len(chunk)
+        if progress is not None:
+            progress.update(len(chunk))
+    return copied
+
+
+def split_ranges(size, parts, alignment=COPY_CHUNK_SIZE):
+    """
+    Split file into byte ranges of about the same size
+
+    Args:
+        size (int): Size of file
+        parts (int): Max number of ranges
+        alignment (int): Ranges start at multiples of alignment
+
+    Returns:
+        list: (start, end) tuples covering whole file
+    """
+    part = -(-size // max(parts, 1))
+    part = max(-(-part // alignment) * alignment, alignment)
+    return [
+        (start, min(start + part, size))
+        for start in six.moves.range(0, size, part)
+    ]
+
+
 class CommandReader(object):
     """
     This class is for gradual reading of commands output lines as they come in.
@@ -45,6 +407,9 @@ class CommandReader(object):
     After the execution of command finishes, CommandReader object may be
     queried for return code, stdout and stderr of the command.
 
+    Stdout and stderr are read concurrently, the reader waits for data
+    without polling, so long running commands don't consume CPU.
+
     Example usage:
         my_host = Host("1.2.3.4")
         my_host.users.append(RootUser("1234"))
@@ -54,20 +419,71 @@ class CommandReader(object):
             print(line)
     """
 
-    def __init__(self, executor, cmd, cmd_input=None):
+    def __init__(
+        self, executor, cmd, cmd_input=None, retain=True, timeout=None,
+    ):
         """
         Args:
             executor (rrmngmnt.Executor): instance of rrmngmnt.Executor class
                 or one of its subclasses that executes provided command
             cmd (list): Command to be executed
             cmd_input(str): Input for the command
+            retain (bool): Collect output, so it is available in out and err
+                attributes when command finishes
+            timeout (float): Max time to wait for next output of command
         """
         self.executor = executor
         self.cmd = cmd
         self.cmd_input = cmd_input
+        self.retain = retain
+        self.timeout = timeout
         self.rc = None
-        self.out = ''
-        self.err = ''
+        self._out = list()
+        self._err = list()
+
+    @property
+    def out(self):
+        return ''.join(self._out)
+
+    @property
+    def err(self):
+        return ''.join(self._err)
+
+    def read_tagged_lines(self):
+        """
+        Generator that yields lines of both stdout and stderr as they come.
+
+        Yields:
+            tuple (str, str): Source of line (executor.STDOUT or
+                executor.STDERR), and the line stripped of newline character
+        """
+        buffers = {STDOUT: self._out, STDERR: self._err}
+        partial = {STDOUT: [], STDERR: []}
+        decoders = dict(
+            (source, codecs.getincrementaldecoder('utf-8')('replace'))
+            for source in buffers
+        )
+        with self.executor.session() as ss:
+            command = ss.command(self.cmd)
+            for source, chunk in command.stream(self.cmd_input, self.timeout):
+                if isinstance(chunk, six.binary_type):
+                    chunk = decoders[source].decode(chunk)
+                if self.retain:
+                    buffers[source].append(chunk)
+                partial[source].append(chunk)
+                if '\n' in chunk:
+                    lines = ''.join(partial[source]).split('\n')
+                    partial[source] = [lines.pop()]
+                    for line in lines:
+                        yield source, line
+            for source in (STDOUT, STDERR):
+                tail = decoders[source].decode(six.b(''), final=True)
+                if self.retain and tail:
+                    buffers[source].append(tail)
+                rest = ''.join(partial[source]) + tail
+                if rest:
+                    yield source, rest
+            self.rc = command.rc
 
     def read_lines(self):
         """
@@ -77,19 +493,6 @@ class CommandReader(object):
         Yields:
             str: Line of command's output stripped of newline character
         """
-        with self.executor.session() as ss:
-            command = ss.command(self.cmd)
-            with command.execute() as (in_, out, err):
-                if self.cmd_input:
-                    in_.write(self.cmd_input)
-                    in_.close()
-                while True:
-                    line = out.readline()
-                    self.out += line
-                    if line:
-                        yield line.strip('\n')
-                        continue
-                    if command.rc is not None:
-                        break
-                self.rc = command.rc
-                self.err = err.read()
+        for source, line in self.read_tagged_lines():
+            if source == STDOUT:
+                yield line
@@ -0,0 +1,189 @@
+"""
+This module provides process-wide pool of authenticated ssh connections.
+RemoteExecutor sessions borrow connections from the pool, so that only
+the first command sent to a host pays for TCP connect, ssh handshake and
+authentication.
+"""
+import atexit
+import collections
+import threading
+import time
+
+
+CONNECTION_MAX_IDLE = 300
+CONNECTION_MAX_PER_HOST = 4
+CONNECTION_KEEPALIVE = 30
+# Min seconds between two runs of the thread closing idle connections
+REAPER_MIN_INTERVAL = 0.05
+
+
+def is_alive(client):
+    """
+    Check whether the connection is still usable
+
+    Args:
+        client (paramiko.SSHClient): connection
+
+    Returns:
+        bool: True if underlying transport is active, False otherwise
+    """
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+class ConnectionPool(object):
+    """
+    Keeps idle connections keyed by (address, port, user, auth method).
+
+    Connection is borrowed exclusively by one session, and returned back
+    to the pool once the session is closed. Connections which are idle
+    longer than max_idle seconds are closed by background thread, which
+    runs only while there are idle connections; dead connections are
+    replaced by new ones transparently.
+
+    Example:
+        pool = ConnectionPool(max_idle=60)
+        client = pool.acquire(key, connect)
+        try:
+            client.exec_command('true')
+        finally:
+            pool.release(key, client)
+    """
+    def __init__(
+        self, max_idle=CONNECTION_MAX_IDLE,
+        max_per_host=CONNECTION_MAX_PER_HOST,
+        keepalive=CONNECTION_KEEPALIVE,
+    ):
+        """
+        Args:
+            max_idle (float): Close connections idle longer than this
+            max_per_host (int): Max number of idle connections kept for
+                each key, connections above this limit are closed on release
+            keepalive (int): Interval of ssh keepalive packets sent over
+                pooled transports, 0 disables it
+        """
+        super(ConnectionPool, self).__init__()
+        self.max_idle = max_idle
+        self.max_per_host = max_per_host
+        self.keepalive = keepalive
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._idle.values())
+
+    def _evict(self):
+        """
+        Pops expired connections, has to be called under lock.
+
+        Returns:
+            list: connections to close
+        """
+        expired = list()
+        limit = time.monotonic() - self.max_idle
+        for key in list(self._idle):
+            entries = self._idle[key]
+            expired.extend(c for last_used, c in entries if last_used < limit)
+            entries[:] = [e for e in entries if e[0] >= limit]
+            if not entries:
+                del self._idle[key]
+        return expired
+
+    def _reap(self):
+        """
+        Closes expired connections until there is no idle connection left
+        """
+        while True:
+            with self._lock:
+                expired = self._evict()
+                if self._idle:
+                    oldest = min(
+                        last_used for entries in self._idle.values()
+                        for last_used, _ in entries
+                    )
+                    wait = oldest + self.max_idle - time.monotonic()
+                else:
+                    self._reaper = None
+                    wait = None
+            self._close(expired)
+            if wait is None:
+                return
+            time.sleep(max(wait, REAPER_MIN_INTERVAL))
+
+    @staticmethod
+    def _close(clients):
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def acquire(self, key, connect):
+        """
+        Borrow connection from the pool
+
+        Args:
+            key (tuple): Identification of connection
+            connect (callable): Creates new connected client, it is called
+                when there is no alive idle connection for the key
+
+        Returns:
+            paramiko.SSHClient: connected client
+        """
+        while True:
+            with self._lock:
+                expired = self._evict()
+                entries = self._idle.get(key)
+                client = entries.pop()[1] if entries else None
+            self._close(expired)
+            if client is None:
+                break
+            if is_alive(client):
+                return client
+            self._close([client])
+        client = connect()
+        if self.keepalive:
+            transport = client.get_transport()
+            if transport is not None:
+                transport.set_keepalive(self.keepalive)
+        return client
+
+    def release(self, key, client):
+        """
+        Return connection back to the pool
+
+        Args:
+            key (tuple): Identification of connection
+            client (paramiko.SSHClient): connection returned by acquire
+        """
+        to_close = [client]
+        if is_alive(client):
+            with self._lock:
+                to_close = self._evict()
+                entries = self._idle[key]
+                if len(entries) < self.max_per_host:
+                    entries.append((time.monotonic(), client))
+                    if self._reaper is None:
+                        self._reaper = threading.Thread(
+                            target=self._reap, name='ConnectionPoolReaper',
+                        )
+                        self._reaper.daemon = True
+                        self._reaper.start()
+                else:
+                    to_close.append(client)
+        self._close(to_close)
+
+    def clear(self):
+        """
+        Close all idle connections
+        """
+        with self._lock:
+            clients = [c for e in self._idle.values() for _, c in e]
+            self._idle.clear()
+        self._close(clients)
+
+
+CONNECTION_POOL = ConnectionPool()
+atexit.register(CONNECTION_POOL.clear)
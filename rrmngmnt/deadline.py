@@ -0,0 +1,122 @@
+"""
+This module provides Deadline, which bounds whole operation, like running
+command on host, by single point in monotonic time. Every blocking step
+(connect, ssh handshake, authentication, opening channel, reading output)
+waits at most for the time which remains until the deadline.
+
+Deadline can be passed explicitly to Host.run_command and RemoteExecutor
+methods, or it can be activated for the current thread, so that all
+helpers called inside (FileSystem, Service, PackageManager, ...) share it.
+
+Example:
+    with Deadline(30):
+        if host.fs.exists('/etc/motd'):
+            host.service('sshd').restart()
+"""
+import contextlib
+import socket
+import threading
+import time
+
+
+class Deadline(object):
+    """
+    Point in monotonic time until the operation has to finish.
+    """
+    _local = threading.local()
+
+    def __init__(self, timeout):
+        """
+        Args:
+            timeout (float): Number of seconds from now
+        """
+        super(Deadline, self).__init__()
+        self.timeout = timeout
+        self.expires = time.monotonic() + timeout
+
+    def __repr__(self):
+        return "Deadline(%s, remaining=%.3f)" % (
+            self.timeout, self.remaining(),
+        )
+
+    def remaining(self):
+        """
+        Returns:
+            float: Number of seconds left, never negative
+        """
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.expires
+
+    def check(self):
+        """
+        Raises:
+            socket.timeout: If the deadline already passed
+        """
+        if self.expired:
+            raise socket.timeout("deadline(%s) exceeded" % self.timeout)
+
+    def cap(self, timeout):
+        """
+        Shorten timeout of single blocking step to fit into the deadline
+
+        Args:
+            timeout (float): Timeout of the step, None means no timeout
+
+        Returns:
+            float: Timeout which does not exceed the deadline
+
+        Raises:
+            socket.timeout: If the deadline already passed
+        """
+        self.check()
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    @classmethod
+    def _stack(cls):
+        stack = getattr(cls._local, 'stack', None)
+        if stack is None:
+            stack = cls._local.stack = list()
+        return stack
+
+    @classmethod
+    def current(cls):
+        """
+        Returns:
+            Deadline: Deadline active in current thread, or None
+        """
+        stack = cls._stack()
+        return stack[-1] if stack else None
+
+    def __enter__(self):
+        stack = self._stack()
+        outer = stack[-1] if stack else None
+        # nested deadline can not extend the outer one
+        if outer is not None and outer.expires < self.expires:
+            stack.append(outer)
+        else:
+            stack.append(self)
+        return self
+
+    def __exit__(self, type_, value, tb):
+        self._stack().pop()
+
+    @classmethod
+    @contextlib.contextmanager
+    def use(cls, deadline):
+        """
+        Activate deadline for the current thread, None does nothing.
+
+        Args:
+            deadline (Deadline): deadline or None
+        """
+        if deadline is None:
+            yield cls.current()
+        else:
+            with deadline:
+                yield cls.current()
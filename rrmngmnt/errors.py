@@ -73,10 +73,60 @@ class UnsupportedOperation(GeneralResourceError):
         )
 
 
+class HostGroupFailure(GeneralResourceError):
+    """
+    Operation executed on group of hosts failed on some of them.
+    """
+    def __init__(self, errors):
+        """
+        Args:
+            errors (dict): exceptions keyed by host
+        """
+        super(HostGroupFailure, self).__init__(errors)
+
+    @property
+    def errors(self):
+        return self.args[0]
+
+    def __str__(self):
+        return "Operation failed on %d host(s): %s" % (
+            len(self.errors),
+            ', '.join(
+                "%s: %s" % (host, ex) for host, ex in self.errors.items()
+            ),
+        )
+
+
 class FileSystemError(GeneralResourceError):
     pass
 
 
+class FailToVerify(FileSystemError):
+    """
+    Transferred file differs from its source.
+    """
+    def __init__(self, path, reason):
+        """
+        Args:
+            path (str): path to destination file
+            reason (str): what differs
+        """
+        super(FailToVerify, self).__init__(path, reason)
+
+    @property
+    def path(self):
+        return self.args[0]
+
+    @property
+    def reason(self):
+        return self.args[1]
+
+    def __str__(self):
+        return "Transferred file %s is corrupted: %s" % (
+            self.path, self.reason,
+        )
+
+
 class MountError(FileSystemError):
     def __init__(self, mp):
         self.mp = mp
@@ -116,3 +166,30 @@ class FailToUmount(MountCommandError):
 
 class FailToRemount(MountCommandError):
     pass
+
+
+class ReplayFailure(GeneralResourceError):
+    """
+    Replayed cassette doesn't contain requested command or file.
+    """
+    def __init__(self, executor, what):
+        """
+        Args:
+            executor (ReplayExecutor): executor serving the cassette
+            what (str): command or path of file
+        """
+        super(ReplayFailure, self).__init__(executor, what)
+
+    @property
+    def executor(self):
+        return self.args[0]
+
+    @property
+    def what(self):
+        return self.args[1]
+
+    def __str__(self):
+        return "Cassette %s has no record of %s for %s@%s" % (
+            self.executor.cassette.path, self.what,
+            self.executor.user.name, self.executor.address,
+        )
@@ -2,9 +2,111 @@
 This module was created for easier testing of whole package.
 """
 import contextlib
+import threading
+import time
+from concurrent import futures
+
+import six
+
 from rrmngmnt.resource import Resource
 
 
+# Sources of chunks produced by Command.stream
+STDOUT = 'out'
+STDERR = 'err'
+
+# Events passed to hooks, see Executor.add_hook
+SESSION_OPEN = 'session_open'
+SESSION_CLOSE = 'session_close'
+COMMAND_START = 'command_start'
+COMMAND_FINISH = 'command_finish'
+FILE_OPEN = 'file_open'
+FILE_CLOSE = 'file_close'
+HOOK_EVENTS = (
+    SESSION_OPEN, SESSION_CLOSE, COMMAND_START, COMMAND_FINISH,
+    FILE_OPEN, FILE_CLOSE,
+)
+
+
+class CommandResult(object):
+    """
+    Result of command which keeps raw output and decodes it on first
+    access, so callers checking only rc do not pay for decoding.
+    It unpacks as (rc, out, err) tuple.
+
+    Example:
+        result = executor.run(['cat', '/etc/hosts'])
+        if not result.rc:
+            print(result.out)
+        rc, out, err = executor.run(['cat', '/bin/true'], binary=True)
+    """
+    def __init__(self, rc, out, err, binary=False):
+        """
+        Args:
+            rc (int): return code
+            out (bytes): standard output
+            err (bytes): standard error output
+            binary (bool): Expose out and err as bytes instead of str
+        """
+        super(CommandResult, self).__init__()
+        self.rc = rc
+        self.binary = binary
+        self._raw = {STDOUT: out, STDERR: err}
+        self._decoded = dict()
+
+    def _get(self, source):
+        data = self._raw[source]
+        if self.binary:
+            if isinstance(data, six.text_type):
+                data = data.encode('utf-8')
+            return data
+        if source not in self._decoded:
+            if isinstance(data, six.binary_type):
+                data = data.decode('utf-8', errors='replace')
+            self._decoded[source] = data
+        return self._decoded[source]
+
+    @property
+    def out(self):
+        return self._get(STDOUT)
+
+    @property
+    def err(self):
+        return self._get(STDERR)
+
+    def __iter__(self):
+        yield self.rc
+        yield self.out
+        yield self.err
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index):
+        return (
+            lambda: self.rc, lambda: self.out, lambda: self.err,
+        )[index]()
+
+    def __eq__(self, other):
+        if not isinstance(other, (CommandResult, tuple, list)):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return "CommandResult(rc=%s, out=%d bytes, err=%d bytes)" % (
+            self.rc, len(self._raw[STDOUT]), len(self._raw[STDERR]),
+        )
+
+
 class Executor(Resource):
 
     class LoggerAdapter(Resource.LoggerAdapter):
@@ -23,9 +125,14 @@ class Executor(Resource):
             )
 
     class Session(object):
+        # Keep it below MaxSessions of sshd, which is 10 by default
+        max_channels = 8
+
         def __init__(self, executor):
             super(Executor.Session, self).__init__()
             self._executor = executor
+            self._workers = None
+            self._opened = None
 
         @property
         def logger(self):
@@ -33,10 +140,23 @@ class Executor(Resource):
 
         def __enter__(self):
             self.open()
+            self._opened = time.monotonic()
+            self._executor.run_hooks(SESSION_OPEN)
             return self
 
         def __exit__(self, type_, value, tb):
-            self.close()
+            try:
+                self._shutdown_workers()
+                self.close()
+            finally:
+                self._session_closed()
+
+        def _session_closed(self):
+            if self._opened is not None:
+                self._executor.run_hooks(
+                    SESSION_CLOSE, duration=time.monotonic() - self._opened,
+                )
+                self._opened = None
 
         def open(self):
             raise NotImplementedError()
@@ -51,6 +171,97 @@ class Executor(Resource):
             cmd = self.command(cmd)
             return cmd.run(input_)
 
+        def run(self, cmd, input_=None, binary=False):
+            """
+            Args:
+                cmd (list): command
+                input_ (str): input data
+                binary (bool): Return output as bytes
+
+            Returns:
+                CommandResult: result of command
+            """
+            rc, out, err = self.run_cmd(cmd, input_)
+            return CommandResult(rc, out, err, binary=binary)
+
+        def submit(self, cmd, input_=None):
+            """
+            Run command in background, over new channel of this session.
+
+            Args:
+                cmd (list): command
+                input_ (str): input data
+
+            Returns:
+                concurrent.futures.Future: future of (rc, out, err) tuple
+            """
+            if self._workers is None:
+                self._workers = futures.ThreadPoolExecutor(
+                    max_workers=self.max_channels,
+                )
+            return self._workers.submit(self.run_cmd, cmd, input_)
+
+        def run_many(self, cmds, max_channels=None):
+            """
+            Run commands in parallel, each over its own channel of this
+            session.
+
+            Args:
+                cmds (list): list of commands
+                max_channels (int): max number of commands running at once
+
+            Returns:
+                list: list of (rc, out, err) tuples in order of cmds
+            """
+            cmds = list(cmds)
+            if max_channels is None:
+                max_channels = self.max_channels
+            max_channels = min(max_channels, len(cmds))
+            if max_channels <= 1:
+                return [self.run_cmd(cmd, None) for cmd in cmds]
+            with futures.ThreadPoolExecutor(max_channels) as workers:
+                return list(
+                    workers.map(lambda cmd: self.run_cmd(cmd, None), cmds)
+                )
+
+        def run_batch(self, cmds):
+            """
+            Run commands one after another, and collect their results.
+            Executors which are able to run all of them in single round
+            trip override this method.
+
+            Args:
+                cmds (list): list of commands
+
+            Returns:
+                list: list of (rc, out, err) tuples in order of cmds
+            """
+            return [self.run_cmd(cmd, None) for cmd in cmds]
+
+        @contextlib.contextmanager
+        def file_hooks(self, path, mode):
+            """
+            Runs FILE_OPEN and FILE_CLOSE hooks around the block
+            """
+            executor = self._executor
+            executor.run_hooks(FILE_OPEN, path=path, mode=mode)
+            start = time.monotonic()
+            try:
+                yield
+            finally:
+                executor.run_hooks(
+                    FILE_CLOSE, path=path, mode=mode,
+                    duration=time.monotonic() - start,
+                )
+
+        def _shutdown_workers(self):
+            """
+            Wait for commands started by submit
+            """
+            if self._workers is not None:
+                self._workers.shutdown(wait=True)
+                self._workers = None
+
     class Command(object):
         def __init__(self, cmd, session):
             super(Executor.Command, self).__init__()
@@ -59,11 +270,22 @@ class Executor(Resource):
             self.err = None
             self._ss = session
             self._rc = None
+            self._started = None
 
         @property
         def logger(self):
             return self._ss.logger
 
+        def _command_started(self):
+            self._started = time.monotonic()
+            self._ss._executor.run_hooks(COMMAND_START, cmd=self.cmd)
+
+        def _command_finished(self):
+            self._ss._executor.run_hooks(
+                COMMAND_FINISH, cmd=self.cmd, rc=self._rc,
+                duration=time.monotonic() - self._started,
+            )
+
         def run(self, input_):
             raise NotImplementedError()
 
@@ -71,6 +293,28 @@ class Executor(Resource):
         def execute(self, bufsize=-1):
             raise NotImplementedError()
 
+        def stream(self, input_=None, timeout=None):
+            """
+            Generator yielding chunks of command output as they come.
+            This generic implementation reads whole stdout first and then
+            whole stderr, executors override it to read both concurrently.
+
+            Args:
+                input_ (str): input data
+                timeout (float): Max time to wait for next chunk
+
+            Yields:
+                tuple: (STDOUT or STDERR, chunk of data)
+            """
+            with self.execute() as (in_, out, err):
+                if input_:
+                    in_.write(input_)
+                    in_.close()
+                for source, fh in ((STDOUT, out), (STDERR, err)):
+                    data = fh.read()
+                    if data:
+                        yield source, data
+
         def get_rc(self, wait=False):
             raise NotImplementedError()
 
@@ -79,6 +323,10 @@ class Executor(Resource):
             return self.get_rc()
         returncode = rc
 
+    # (class, event, callable) triples, see add_hook
+    hooks = ()
+    hooks_lock = threading.Lock()
+
     def __init__(self, user):
         """
         Args:
@@ -87,6 +335,59 @@ class Executor(Resource):
         super(Executor, self).__init__()
         self.user = user
 
+    @classmethod
+    def add_hook(cls, event, hook):
+        """
+        Register callable invoked on event of executors of this class,
+        including subclasses. Executor.add_hook applies to all executors.
+
+        The hook is called as hook(executor, event, info) where info is
+        dict with metadata of event:
+            session_open: {}
+            session_close: {'duration'}
+            command_start: {'cmd'}
+            command_finish: {'cmd', 'rc', 'duration'}
+            file_open: {'path', 'mode'}
+            file_close: {'path', 'mode', 'duration'}
+
+        Args:
+            event (str): one of HOOK_EVENTS
+            hook (callable): the hook
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError(
+                "Unknown event %s, use one of %s" % (event, HOOK_EVENTS)
+            )
+        with Executor.hooks_lock:
+            Executor.hooks += ((cls, event, hook),)
+
+    @classmethod
+    def remove_hook(cls, event, hook):
+        with Executor.hooks_lock:
+            Executor.hooks = tuple(
+                h for h in Executor.hooks if h != (cls, event, hook)
+            )
+
+    def run_hooks(self, event, **info):
+        """
+        Call hooks registered for event, exceptions raised by hooks are
+        logged and ignored.
+
+        Args:
+            event (str): one of HOOK_EVENTS
+            info (dict): metadata of event
+        """
+        hooks = Executor.hooks
+        if not hooks:
+            return
+        for cls, hook_event, hook in hooks:
+            if hook_event != event or not isinstance(self, cls):
+                continue
+            try:
+                hook(self, event, info)
+            except Exception as ex:
+                self.logger.warning("Hook %s failed: %s", hook, ex)
+
     def session(self):
         return Executor.Session(self)
 
@@ -99,6 +400,22 @@ class Executor(Resource):
         with self.session() as session:
             return session.run_cmd(cmd, input_)
 
+    def run(self, cmd, input_=None, binary=False, **kwargs):
+        """
+        Same as run_cmd, but output is decoded lazily
+
+        Args:
+            cmd (list): command
+            input_ (str): input data
+            binary (bool): Return output as bytes
+            kwargs (dict): Passed to run_cmd, like tcp_timeout or io_timeout
+
+        Returns:
+            CommandResult: result of command
+        """
+        rc, out, err = self.run_cmd(cmd, input_, **kwargs)
+        return CommandResult(rc, out, err, binary=binary)
+
 
 class ExecutorFactory(object):
     def build(self, host, user):
@@ -1,13 +1,125 @@
+import contextlib
+import fnmatch
+import hashlib
+import io
 import os
+import shutil
+import socket
+import subprocess
+import tarfile
+import threading
+import uuid
+from concurrent import futures
 
 import six
 import warnings
 
 from rrmngmnt import errors
+from rrmngmnt.common import (
+    COPY_CHUNK_SIZE,
+    OutputBuffer,
+    SpooledOutput,
+    TransferProgress,
+    copy_file,
+    copy_range,
+    normalize_string,
+    split_ranges,
+)
 from rrmngmnt.service import Service
 from rrmngmnt.resource import Resource
 
 
+# Seconds the source host waits for connection to target host
+DIRECT_CONNECT_TIMEOUT = 10
+DIRECT_SSH_OPTIONS = [
+    '-o', 'BatchMode=yes', '-o', 'IdentitiesOnly=yes',
+    '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
+    '-o', 'ConnectTimeout=%d' % DIRECT_CONNECT_TIMEOUT,
+]
+AUTHORIZED_KEYS = '~/.ssh/authorized_keys'
+# Max number of bytes of tar error output kept for CommandExecutionFailure
+TAR_MAX_ERR = 65536
+# compression: (mode of tarfile, flags of remote tar, local filter command)
+TREE_COMPRESSIONS = {
+    None: ('', [], None),
+    'gzip': ('gz', ['-z'], None),
+    'zstd': ('', ['-I', 'zstd'], ['zstd', '-q']),
+}
+
+
+def _matches(path, patterns):
+    return any(
+        fnmatch.fnmatch(path, p) or fnmatch.fnmatch(os.path.basename(path), p)
+        for p in patterns
+    )
+
+
+def _selected(path, is_dir, include, exclude):
+    """
+    Check whether relative path passes include and exclude glob patterns,
+    patterns match either whole path or file name; directories are not
+    subject of include patterns.
+    """
+    if exclude and _matches(path, exclude):
+        return False
+    if is_dir or not include:
+        return True
+    return _matches(path, include)
+
+
+def _copy_stream(rh, wh, close=False):
+    try:
+        for chunk in iter(lambda: rh.read(COPY_CHUNK_SIZE), b''):
+            wh.write(chunk)
+    finally:
+        if close:
+            wh.close()
+
+
+@contextlib.contextmanager
+def _local_filter(cmd, fh, write):
+    """
+    Pass stream through local command, like zstd.
+
+    Args:
+        cmd (list): command reading stdin and writing stdout
+        fh (file): file object the filtered data go to (write=True), or
+            come from (write=False)
+        write (bool): direction of data
+
+    Yields:
+        file: file object to write to or read from
+    """
+    process = subprocess.Popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+    )
+    if write:
+        copier = threading.Thread(
+            target=_copy_stream, args=(process.stdout, fh),
+        )
+    else:
+        copier = threading.Thread(
+            target=_copy_stream, args=(fh, process.stdin, True),
+        )
+    copier.daemon = True
+    copier.start()
+    try:
+        yield process.stdin if write else process.stdout
+        if write:
+            process.stdin.close()
+        copier.join()
+        if process.wait():
+            raise errors.FileSystemError(
+                "%s failed with rc %s" % (cmd[0], process.returncode)
+            )
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdin.close()
+        process.stdout.close()
+
+
 class FileSystem(Service):
     """
     Class for working with filesystem.
@@ -23,9 +135,9 @@ class FileSystem(Service):
         return out
 
     def _exec_file_test(self, op, path):
-        return self.host.executor().run_cmd(
+        return self.host.executor().run(
             ['[', '-%s' % op, path, ']']
-        )[0] == 0
+        ).rc == 0
 
     def exists(self, path):
         return self._exec_file_test('e', path)
@@ -106,19 +218,31 @@ class FileSystem(Service):
         cmd = ["truncate", "-s", "0", file_path]
         return self.host.run_command(cmd)[0] == 0
 
-    def read_file(self, path):
+    def read_file(self, path, max_memory=None):
         """
         Reads a content of a file in a given path
 
         Args:
             path (str): The path from where to take a content from
+            max_memory (int): Spool content larger than max_memory bytes to
+                local temporary file
 
         Returns:
-            str: Content of a file
+            str: Content of a file, or common.SpooledOutput when max_memory
+                is set
         """
-        cmd = ["cat", path]
-        rc, out, _ = self.host.run_command(cmd)
-        return out if not rc else ""
+        rc, out, _ = self.host.run_command(
+            ["cat", path], max_memory=max_memory,
+        )
+        if max_memory is None:
+            return out if not rc else ""
+        if not isinstance(out, SpooledOutput):
+            # executor which keeps whole output in memory
+            out = SpooledOutput.of(out, max_memory)
+        if rc:
+            out.close()
+            return ""
+        return out
 
     def move(self, source_path, destination_path):
         """
@@ -210,45 +334,165 @@ class FileSystem(Service):
         """
         self._exec_command(['chmod', mode, path])
 
-    def get(self, path_src, path_dst):
+    def _remote_file(self, path, mode):
+        """
+        Returns:
+            callable: opens file in its own session
+        """
+        executor = self.host.executor()
+
+        @contextlib.contextmanager
+        def open_file():
+            with executor.session() as ss:
+                with ss.open_file(path, mode) as fh:
+                    yield fh
+        return open_file
+
+    @staticmethod
+    def _copy_streams(
+        size, open_src, open_dst, streams, chunk_size, progress_handler,
+    ):
+        """
+        Copy byte ranges of file concurrently, each range has its own
+        source and destination file, so its own channel.
+        """
+        progress = TransferProgress(size, progress_handler)
+
+        def copy(range_):
+            with open_src() as rh:
+                with open_dst() as wh:
+                    copy_range(rh, wh, range_[0], range_[1], chunk_size,
+                               progress)
+
+        ranges = split_ranges(size, streams, chunk_size)
+        if ranges:
+            with futures.ThreadPoolExecutor(len(ranges)) as workers:
+                list(workers.map(copy, ranges))
+        progress.done()
+
+    @staticmethod
+    def _local_checksum(path):
+        checksum = hashlib.sha256()
+        with io.open(path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(COPY_CHUNK_SIZE * 32), b''):
+                checksum.update(chunk)
+        return checksum.hexdigest()
+
+    def _verify(self, remote_path, local_path, upload):
+        """
+        Compare size and sha256 of remote and local file
+
+        Raises:
+            FailToVerify: If they differ
+        """
+        cmds = [['stat', '-c', '%s', remote_path], ['sha256sum', remote_path]]
+        executor = self.host.executor()
+        with executor.session() as ss:
+            results = ss.run_batch(cmds)
+        for cmd, (rc, out, err) in zip(cmds, results):
+            if rc:
+                raise errors.CommandExecutionFailure(executor, cmd, rc, err)
+        # (destination, source)
+        sizes = [int(results[0][1]), os.path.getsize(local_path)]
+        path = remote_path
+        if not upload:
+            path = local_path
+            sizes.reverse()
+        if sizes[0] != sizes[1]:
+            raise errors.FailToVerify(
+                path, "size %s, source has %s" % tuple(sizes),
+            )
+        if results[1][1].split()[0] != self._local_checksum(local_path):
+            raise errors.FailToVerify(path, "sha256 differs")
+
+    def get(
+        self, path_src, path_dst, chunk_size=COPY_CHUNK_SIZE,
+        progress_handler=None, streams=1,
+    ):
         """
         Fetch file from Host and store on local system
 
         Args:
             path_src (str): path to file on remote system
             path_dst (str): path to file on local system or directory
+            chunk_size (int): size of single read and write
+            progress_handler (func): called with
+                rrmngmnt.common.TransferProgress as the file goes
+            streams (int): split file into that many byte ranges and fetch
+                them concurrently, each over its own connection; the file
+                is verified by size and sha256 afterwards
 
         Returns:
             str: Path to destination file
+
+        Raises:
+            FailToVerify: If multi-stream transfer corrupted the file
         """
         if os.path.isdir(path_dst):
             path_dst = os.path.join(path_dst, os.path.basename(path_src))
+        if streams > 1:
+            size = int(self._exec_command(['stat', '-c', '%s', path_src]))
+            with io.open(path_dst, 'wb') as fh:
+                fh.truncate(size)
+            self._copy_streams(
+                size, self._remote_file(path_src, 'rb'),
+                lambda: io.open(path_dst, 'r+b'), streams, chunk_size,
+                progress_handler,
+            )
+            self._verify(path_src, path_dst, upload=False)
+            return path_dst
         with self.host.executor().session() as ss:
             with ss.open_file(path_src, 'rb') as rh:
                 with open(path_dst, 'wb') as wh:
-                    wh.write(rh.read())
+                    copy_file(rh, wh, chunk_size, progress_handler)
         return path_dst
 
-    def put(self, path_src, path_dst):
+    def put(
+        self, path_src, path_dst, chunk_size=COPY_CHUNK_SIZE,
+        progress_handler=None, streams=1,
+    ):
         """
         Upload file from local system to Host
 
         Args:
             path_src (str): path to file on local system
             path_dst (str): path to file on remote system or directory
+            chunk_size (int): size of single read and write
+            progress_handler (func): called with
+                rrmngmnt.common.TransferProgress as the file goes
+            streams (int): split file into that many byte ranges and upload
+                them concurrently, each over its own connection; the file
+                is verified by size and sha256 afterwards
 
         Returns:
             str: path to destination file
+
+        Raises:
+            FailToVerify: If multi-stream transfer corrupted the file
         """
         if self.isdir(path_dst):
             path_dst = os.path.join(path_dst, os.path.basename(path_src))
+        if streams > 1:
+            size = os.path.getsize(path_src)
+            with self._remote_file(path_dst, 'wb')() as fh:
+                fh.truncate(size)
+            self._copy_streams(
+                size, lambda: io.open(path_src, 'rb'),
+                self._remote_file(path_dst, 'r+b'), streams, chunk_size,
+                progress_handler,
+            )
+            self._verify(path_dst, path_src, upload=True)
+            return path_dst
         with self.host.executor().session() as ss:
             with open(path_src, 'rb') as rh:
                 with ss.open_file(path_dst, 'wb') as wh:
-                    wh.write(rh.read())
+                    copy_file(rh, wh, chunk_size, progress_handler)
         return path_dst
 
-    def transfer(self, path_src, target_host, path_dst):
+    def transfer(
+        self, path_src, target_host, path_dst, chunk_size=COPY_CHUNK_SIZE,
+        progress_handler=None, direct=False,
+    ):
         """
         Transfer file from one remote system (self) to other
         remote system (target_host).
@@ -257,17 +501,313 @@ class FileSystem(Service):
             path_src (str): path to file on local system
             target_host (Host): target system
             path_dst (str): path to file on remote system or directory
+            chunk_size (int): size of single read and write
+            progress_handler (func): called with
+                rrmngmnt.common.TransferProgress as the file goes
+            direct (bool): source host sends the file to target host over
+                its own ssh connection, so data doesn't go through the
+                controller; when the target is not reachable from source
+                the file goes through the controller
 
         Returns:
             str: path to destination file
         """
         if target_host.fs.isdir(path_dst):
             path_dst = os.path.join(path_dst, os.path.basename(path_src))
+        if direct:
+            try:
+                self._transfer_direct(path_src, target_host, path_dst)
+                return path_dst
+            except (
+                errors.CommandExecutionFailure, errors.FileSystemError,
+                socket.error, EOFError,
+            ) as ex:
+                self.logger.warning(
+                    "Direct transfer of %s to %s failed, copying through "
+                    "controller: %s", path_src, target_host, ex,
+                )
         with self.host.executor().session() as h1s:
             with target_host.executor().session() as h2s:
                 with h1s.open_file(path_src, 'rb') as rh:
                     with h2s.open_file(path_dst, 'wb') as wh:
-                        wh.write(rh.read())
+                        copy_file(rh, wh, chunk_size, progress_handler)
+        return path_dst
+
+    def _transfer_direct(self, path_src, target_host, path_dst):
+        """
+        Send file from this host to target host by ssh client of this
+        host. It generates temporary key on this host, and authorizes it
+        on target host only for writing path_dst, both are removed once
+        the transfer is done.
+
+        Raises:
+            CommandExecutionFailure: If any step failed
+            socket.error: If connection to the target host failed
+        """
+        tag = 'rrmngmnt-transfer-%s' % uuid.uuid4().hex
+        tmpdir = self.mktemp(directory=True)
+        key = os.path.join(tmpdir, 'key')
+        target_executor = target_host.executor()
+        try:
+            self._exec_command([
+                'ssh-keygen', '-q', '-t', 'ed25519', '-N', '', '-C', tag,
+                '-f', key,
+            ])
+            public_key = self._exec_command(['cat', key + '.pub']).strip()
+            command = 'cat > %s' % six.moves.shlex_quote(path_dst)
+            # sshd unescapes only \" in options
+            entry = 'command="%s",restrict %s\n' % (
+                command.replace('"', '\\"'), public_key,
+            )
+            cmd = [
+                'sh', '-c',
+                'umask 077; mkdir -p ~/.ssh && cat >> %s' % AUTHORIZED_KEYS,
+            ]
+            rc, _, err = target_executor.run_cmd(cmd, input_=entry)
+            if rc:
+                raise errors.CommandExecutionFailure(
+                    target_executor, cmd, rc, err,
+                )
+            ssh_cmd = ['ssh', '-i', key, '-p', str(
+                getattr(target_host.executor_factory, 'port', 22)
+            )] + DIRECT_SSH_OPTIONS + [
+                '%s@%s' % (target_executor.user.name, target_host.ip),
+            ]
+            try:
+                # shell script, so the redirection is not quoted away
+                self._exec_command('%s < %s' % (
+                    ' '.join(six.moves.shlex_quote(w) for w in ssh_cmd),
+                    six.moves.shlex_quote(path_src),
+                ))
+            finally:
+                try:
+                    target_executor.run_cmd(
+                        ['sed', '-i', '/ %s$/d' % tag, AUTHORIZED_KEYS]
+                    )
+                except Exception as ex:
+                    # do not hide error of the transfer
+                    self.logger.warning(
+                        "Can not remove transfer key %s from %s: %s",
+                        tag, target_host, ex,
+                    )
+        finally:
+            self.host.run_command(['rm', '-rf', tmpdir])
+
+    def _tree_compression(self, compression, method):
+        try:
+            mode, flags, cmd = TREE_COMPRESSIONS[compression]
+        except KeyError:
+            raise ValueError(
+                "Unknown compression %s, use one of %s" % (
+                    compression, [c for c in TREE_COMPRESSIONS if c],
+                )
+            )
+        if cmd is not None and shutil.which(cmd[0]) is None:
+            raise errors.UnsupportedOperation(
+                self.host, method, "%s is not installed on controller" % (
+                    cmd[0],
+                ),
+            )
+        return mode, flags, cmd
+
+    def _run_tar(self, cmd, handle):
+        """
+        Run tar on host and pass its streams to handle
+        """
+        executor = self.host.executor()
+        broken = None
+        errors_ = OutputBuffer(TAR_MAX_ERR)
+        with executor.session() as ss:
+            command = ss.command(cmd)
+            with command.execute() as (in_, out, err):
+                # drain stderr meanwhile, tar would stall on full pipe
+                # when it complains about many files
+                reader = threading.Thread(
+                    target=_copy_stream, args=(err, errors_),
+                )
+                reader.daemon = True
+                reader.start()
+                try:
+                    handle(in_, out)
+                except tarfile.TarError as ex:
+                    # most likely tar on host failed, it tells why
+                    broken = ex
+                reader.join()
+            rc = command.rc
+        err = normalize_string(errors_.getvalue())
+        if rc:
+            raise errors.CommandExecutionFailure(executor, cmd, rc, err)
+        if broken is not None:
+            raise broken
+
+    def put_tree(
+        self, path_src, path_dst, compression=None, include=None,
+        exclude=None, numeric_owner=False,
+    ):
+        """
+        Upload directory tree from local system to Host, it goes as tar
+        stream over single command, so number of files doesn't matter.
+
+        Modes are preserved, owners are preserved when the remote user is
+        root.
+
+        Args:
+            path_src (str): path to directory on local system
+            path_dst (str): path to directory on remote system, it is
+                created when missing
+            compression (str): None, 'gzip' or 'zstd', zstd has to be
+                installed on both sides
+            include (list): glob patterns of files to upload, all files
+                by default
+            exclude (list): glob patterns of files and directories to
+                skip, patterns match relative path or name
+            numeric_owner (bool): owners are identified by uid and gid
+                instead of names
+
+        Returns:
+            str: path to destination directory
+        """
+        mode, flags, filter_cmd = self._tree_compression(
+            compression, 'put_tree',
+        )
+        cmd = ['mkdir', '-p', path_dst, '&&', 'tar', '-x', '-p', '-f', '-',
+               '-C', path_dst] + flags
+        if numeric_owner:
+            cmd.append('--numeric-owner')
+
+        def write_tar(fh):
+            with tarfile.open(
+                fileobj=fh, mode='w|' + mode, bufsize=COPY_CHUNK_SIZE,
+            ) as tar:
+                for root, dirs, files in os.walk(path_src):
+                    rel_root = os.path.relpath(root, path_src)
+                    tar.add(root, arcname=rel_root, recursive=False)
+                    for name in sorted(dirs):
+                        rel = os.path.normpath(os.path.join(rel_root, name))
+                        path = os.path.join(root, name)
+                        if os.path.islink(path):
+                            # os.walk lists it, but doesn't descend into it
+                            dirs.remove(name)
+                            if _selected(rel, False, include, exclude):
+                                tar.add(path, arcname=rel, recursive=False)
+                        elif not _selected(rel, True, include, exclude):
+                            dirs.remove(name)
+                    for name in sorted(files):
+                        rel = os.path.normpath(os.path.join(rel_root, name))
+                        if _selected(rel, False, include, exclude):
+                            tar.add(
+                                os.path.join(root, name), arcname=rel,
+                                recursive=False,
+                            )
+
+        def handle(in_, out):
+            if filter_cmd is None:
+                write_tar(in_)
+            else:
+                with _local_filter(filter_cmd, in_, write=True) as fh:
+                    write_tar(fh)
+            in_.close()
+
+        self._run_tar(cmd, handle)
+        return path_dst
+
+    def get_tree(
+        self, path_src, path_dst, compression=None, include=None,
+        exclude=None, numeric_owner=False,
+    ):
+        """
+        Fetch directory tree from Host and store on local system, it goes
+        as tar stream over single command, so number of files doesn't
+        matter.
+
+        Modes are preserved, though tarfile of recent Python drops setuid,
+        setgid and group/other write bits; owners are preserved when this
+        process runs as root. Links pointing outside of path_dst are
+        skipped.
+
+        Args:
+            path_src (str): path to directory on remote system
+            path_dst (str): path to directory on local system, it is
+                created when missing
+            compression (str): None, 'gzip' or 'zstd', zstd has to be
+                installed on both sides
+            include (list): glob patterns of files to fetch, all files
+                by default
+            exclude (list): glob patterns of files and directories to
+                skip, patterns match relative path or name
+            numeric_owner (bool): owners are identified by uid and gid
+                instead of names
+
+        Returns:
+            str: path to destination directory
+        """
+        mode, flags, filter_cmd = self._tree_compression(
+            compression, 'get_tree',
+        )
+        # excluded files don't even leave the host, the same filters are
+        # applied on extraction, as tar patterns differ slightly
+        cmd = ['tar', '-c', '-f', '-', '-C', path_src] + flags + [
+            '--exclude=%s' % pattern for pattern in exclude or []
+        ] + ['.']
+        if not os.path.isdir(path_dst):
+            os.makedirs(path_dst)
+
+        def members(tar):
+            skipped = []
+            for member in tar:
+                rel = os.path.normpath(member.name)
+                if os.path.isabs(rel) or rel.split(os.sep)[0] == '..':
+                    self.logger.warning(
+                        "Skipping %s outside of %s", member.name, path_src,
+                    )
+                    continue
+                if any(rel.startswith(d + os.sep) for d in skipped):
+                    continue
+                if not _selected(rel, member.isdir(), include, exclude):
+                    if member.isdir():
+                        skipped.append(rel)
+                    continue
+                if member.issym() or member.islnk():
+                    target = member.linkname
+                    if member.issym():
+                        target = os.path.join(os.path.dirname(rel), target)
+                    target = os.path.normpath(target)
+                    if os.path.isabs(target) or (
+                        target.split(os.sep)[0] == '..'
+                    ):
+                        # later member could be written through the link
+                        self.logger.warning(
+                            "Skipping %s linking outside of %s",
+                            member.name, path_dst,
+                        )
+                        continue
+                yield member
+
+        def read_tar(fh):
+            with tarfile.open(
+                fileobj=fh, mode='r|' + mode, bufsize=COPY_CHUNK_SIZE,
+            ) as tar:
+                kwargs = dict(numeric_owner=numeric_owner)
+                if hasattr(tarfile, 'tar_filter'):
+                    # members checks paths and links already, the filter
+                    # guards against what it could miss
+                    kwargs['filter'] = 'tar'
+                tar.extractall(path_dst, members=members(tar), **kwargs)
+            # rest of the stream, like padding of last record
+            for _ in iter(lambda: fh.read(COPY_CHUNK_SIZE), b''):
+                pass
+
+        def handle(in_, out):
+            in_.close()
+            if filter_cmd is None:
+                read_tar(out)
+            else:
+                with _local_filter(
+                    filter_cmd + ['-d'], out, write=False,
+                ) as fh:
+                    read_tar(fh)
+
+        self._run_tar(cmd, handle)
         return path_dst
 
     def wget(self, url, output_file, progress_handler=None):
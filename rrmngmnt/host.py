@@ -10,10 +10,12 @@ import threading
 import warnings
 
 import netaddr
+from rrmngmnt import async_executor
 from rrmngmnt import errors
 from rrmngmnt import power_manager
 from rrmngmnt import ssh
-from rrmngmnt.common import fqdn2ip
+from rrmngmnt.common import copy_file, fqdn2ip
+from rrmngmnt.deadline import Deadline
 from rrmngmnt.filesystem import FileSystem
 from rrmngmnt.firewall import Firewall
 from rrmngmnt.network import Network
@@ -231,9 +233,23 @@ class Host(Resource):
             return ef(self.ip, user)
         return self.executor_factory.build(self, user)
 
+    def async_executor(self, user=None):
+        """
+        Gives you asyncio counterpart of executor, it wraps executor built
+        by executor_factory, so both of them run commands the same way.
+
+        Args:
+            user (User): the executed commands will be executed under this
+                user, the default executor user when it is None
+
+        Returns:
+            AsyncExecutor: executor with coroutine methods
+        """
+        return async_executor.AsyncExecutor(self.executor(user))
+
     def run_command(
         self, command, input_=None, tcp_timeout=None, io_timeout=None,
-        user=None, pkey=False,
+        user=None, pkey=False, deadline=None, max_memory=None,
     ):
         """
         Run command on host
@@ -243,18 +259,27 @@ class Host(Resource):
             input_ (str): input data
             tcp_timeout (float): tcp timeout
             `io_timeout (float): timeout for data operation (read/write)
+            deadline (Deadline): bounds whole execution, including connect
+            max_memory (int): spool outputs larger than max_memory bytes
+                to local temporary files
 
         Returns:
-            tuple: tuple of (rc, out, err)
+            tuple: tuple of (rc, out, err), out and err are instances of
+                common.SpooledOutput when max_memory is set
         """
         self.logger.info("Executing command %s", ' '.join(command))
-        rc, out, err = self.executor(user=user, pkey=pkey).run_cmd(
-            command, input_=input_, tcp_timeout=tcp_timeout,
-            io_timeout=io_timeout
-        )
+        kwargs = dict()
+        if max_memory is not None:
+            kwargs['max_memory'] = max_memory
+        with Deadline.use(deadline):
+            rc, out, err = self.executor(user=user, pkey=pkey).run_cmd(
+                command, input_=input_, tcp_timeout=tcp_timeout,
+                io_timeout=io_timeout, **kwargs
+            )
         if rc:
             self.logger.error(
-                "Failed to run command %s ERR: %s OUT: %s", command, err, out
+                "Failed to run command %s ERR: %s OUT: %s", command, err,
+                out if max_memory is None else "<%d bytes>" % len(out),
             )
         return rc, out, err
 
@@ -277,7 +302,7 @@ class Host(Resource):
             with self.executor().session() as host_session:
                 with resource_session.open_file(src, 'rb') as resource_file:
                     with host_session.open_file(dst, 'wb') as host_file:
-                        host_file.write(resource_file.read())
+                        copy_file(resource_file, host_file)
         if mode:
             self.fs.chmod(path=dst, mode=mode)
         if ownership:
@@ -0,0 +1,226 @@
+"""
+This module define resource HostGroup which allows to run operations on
+many hosts in parallel.
+"""
+import threading
+import time
+from concurrent import futures
+
+from rrmngmnt import errors
+from rrmngmnt.host import Host
+from rrmngmnt.probe import PROBE_TIMEOUT, probe_all, wait_all
+from rrmngmnt.resource import Resource
+from rrmngmnt.ssh import CONNECTIVITY_TIMEOUT
+
+
+class HostGroupResult(dict):
+    """
+    Results of operation keyed by host, hosts where operation raised
+    exception or timed out are kept in errors.
+    """
+    def __init__(self):
+        super(HostGroupResult, self).__init__()
+        self.errors = dict()
+
+    @property
+    def failed(self):
+        return list(self.errors)
+
+    @property
+    def succeeded(self):
+        return [h for h in self if h not in self.errors]
+
+    def check(self):
+        """
+        Raises:
+            HostGroupFailure: If operation failed on any host
+        """
+        if self.errors:
+            raise errors.HostGroupFailure(self.errors)
+
+
+class HostGroup(Resource):
+    """
+    Group of hosts, it runs commands or any callable on all members using
+    bounded pool of threads.
+
+    Example:
+        group = HostGroup()  # all hosts from Host.inventory
+        results = group.run_command(['uptime'], timeout=60)
+        for host, (rc, out, err) in results.items():
+            print(host, out)
+        results.check()
+    """
+    max_workers = 32
+
+    def __init__(self, hosts=None, max_workers=None):
+        """
+        Args:
+            hosts (list): List of Host instances, all hosts from
+                Host.inventory are used by default
+            max_workers (int): Max number of hosts processed at once
+        """
+        super(HostGroup, self).__init__()
+        if hosts is None:
+            with Host.lock:
+                hosts = list(Host.inventory)
+        self.hosts = list(hosts)
+        if max_workers is not None:
+            self.max_workers = max_workers
+
+    def __str__(self):
+        return "HostGroup(%s)" % ', '.join(h.ip for h in self.hosts)
+
+    def __iter__(self):
+        return iter(self.hosts)
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def call(self, func, timeout=None):
+        """
+        Call func(host) for all hosts in parallel
+
+        Args:
+            func (callable): Function taking Host as the only parameter
+            timeout (float): Max time func can take for one host, the host
+                is reported as failed with futures.TimeoutError when it
+                exceeds the timeout
+
+        Returns:
+            HostGroupResult: Return values of func keyed by host
+        """
+        results = HostGroupResult()
+        if not self.hosts:
+            return results
+        started = dict()
+        lock = threading.Lock()
+
+        def _call(host):
+            with lock:
+                started[host] = time.monotonic()
+            return func(host)
+
+        workers = futures.ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(self.hosts))
+        )
+        try:
+            pending = dict(
+                (workers.submit(_call, host), host) for host in self.hosts
+            )
+            while pending:
+                wait_for = timeout
+                if timeout is not None:
+                    with lock:
+                        starts = [
+                            started[h] for h in pending.values()
+                            if h in started
+                        ]
+                    if starts:
+                        wait_for = max(
+                            0, min(starts) + timeout - time.monotonic()
+                        )
+                done, _ = futures.wait(
+                    pending, timeout=wait_for,
+                    return_when=futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    host = pending.pop(future)
+                    try:
+                        results[host] = future.result()
+                    except Exception as ex:
+                        self.logger.error("%s failed: %s", host, ex)
+                        results.errors[host] = ex
+                if timeout is not None:
+                    now = time.monotonic()
+                    with lock:
+                        expired = [
+                            f for f, h in pending.items()
+                            if h in started and started[h] + timeout <= now
+                        ]
+                    for future in expired:
+                        host = pending.pop(future)
+                        self.logger.error(
+                            "%s did not finish in %s seconds", host, timeout
+                        )
+                        results.errors[host] = futures.TimeoutError(
+                            "%s: timeout(%s)" % (host, timeout)
+                        )
+        finally:
+            # do not wait for hosts which timed out
+            workers.shutdown(wait=False)
+        return results
+
+    def run_command(
+        self, command, input_=None, tcp_timeout=None, io_timeout=None,
+        timeout=None,
+    ):
+        """
+        Run command on all hosts in parallel
+
+        Args:
+            command (list): command
+            input_ (str): input data
+            tcp_timeout (float): tcp timeout
+            io_timeout (float): timeout for data operation (read/write),
+                it defaults to timeout
+            timeout (float): Max time of command execution on one host
+
+        Returns:
+            HostGroupResult: (rc, out, err) tuples keyed by host, hosts
+                where command failed are listed in errors
+        """
+        if io_timeout is None:
+            io_timeout = timeout
+        results = self.call(
+            lambda host: host.run_command(
+                command, input_=input_, tcp_timeout=tcp_timeout,
+                io_timeout=io_timeout,
+            ),
+            timeout=timeout,
+        )
+        for host, (rc, _, err) in results.items():
+            if rc:
+                results.errors[host] = errors.CommandExecutionFailure(
+                    host.executor(), command, rc, err
+                )
+        return results
+
+    def probe(self, method='tcp', timeout=PROBE_TIMEOUT):
+        """
+        Check reachability of all hosts at once, see probe_all
+
+        Args:
+            method (str): One of 'tcp', 'ssh', 'icmp'
+            timeout (float): Max time to wait for responses
+
+        Returns:
+            ProbeResults: ProbeResult keyed by host
+        """
+        return probe_all(self.hosts, method=method, timeout=timeout)
+
+    def wait_for_connectivity_state(
+        self, positive, timeout=CONNECTIVITY_TIMEOUT, method='ssh',
+    ):
+        """
+        Wait until all hosts are reachable or unreachable, see wait_all
+
+        Args:
+            positive (bool): Wait for reachable or unreachable state
+            timeout (float): Max time to wait
+            method (str): One of 'tcp', 'ssh', 'icmp'
+
+        Returns:
+            bool: True if all hosts reached the state in time
+        """
+        results = wait_all(
+            self.hosts, positive=positive, timeout=timeout, method=method,
+        )
+        failed = results.unreachable if positive else results.reachable
+        if failed:
+            self.logger.error(
+                "%s are still %s after %s seconds",
+                ', '.join(h.ip for h in failed),
+                "unreachable" if positive else "reachable", timeout,
+            )
+        return not failed
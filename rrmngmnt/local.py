@@ -0,0 +1,402 @@
+"""
+This module provides executor which runs commands on the controller
+itself, by subprocess instead of loopback ssh login.
+
+RemoteExecutorFactory picks LocalExecutor automatically when host address
+belongs to the controller, ssh port is 22 and the user is the one running
+this process, so there is no difference in privileges.
+"""
+import contextlib
+import errno
+import io
+import os
+import pty
+import pwd
+import selectors
+import six
+import socket
+import subprocess
+import threading
+
+from rrmngmnt.common import OutputBuffer, SpooledOutput, normalize_string
+from rrmngmnt.deadline import Deadline
+from rrmngmnt.executor import Executor, ExecutorFactory, STDERR, STDOUT
+
+
+CHUNK_SIZE = 32768
+
+_local_addresses = dict()
+_local_addresses_lock = threading.Lock()
+
+
+def is_local_address(address):
+    """
+    Check whether address belongs to this machine, it tries to bind to the
+    address, so no name resolution is involved.
+
+    Args:
+        address (str): Ip address
+
+    Returns:
+        bool: True if address is assigned to local interface
+    """
+    with _local_addresses_lock:
+        if address in _local_addresses:
+            return _local_addresses[address]
+    try:
+        infos = socket.getaddrinfo(
+            address, 0, 0, socket.SOCK_STREAM, 0, socket.AI_NUMERICHOST,
+        )
+        family, _, _, _, sockaddr = infos[0]
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.bind(sockaddr)
+        finally:
+            sock.close()
+        local = True
+    except (socket.error, IndexError):
+        local = False
+    with _local_addresses_lock:
+        _local_addresses[address] = local
+    return local
+
+
+def current_user_name():
+    """
+    Returns:
+        str: name of user running this process
+    """
+    return pwd.getpwuid(os.geteuid()).pw_name
+
+
+def current_user_home():
+    """
+    Returns:
+        str: home directory of user running this process, relative paths
+            are resolved against it, like over ssh
+    """
+    return pwd.getpwuid(os.geteuid()).pw_dir
+
+
+class LocalExecutor(Executor):
+    """
+    Runs commands on the controller by local shell.
+
+    It has the same interface as RemoteExecutor, so resources like
+    FileSystem or PlaybookRunner work with it the same way. Commands run
+    in home directory of the user and relative paths of files are resolved
+    against it, as they are over ssh and sftp.
+    """
+
+    class Session(Executor.Session):
+        """
+        There is no connection behind local session.
+        """
+        def __init__(self, executor, timeout=None, deadline=None):
+            """
+            Args:
+                executor (LocalExecutor): executor
+                timeout (float): Ignored, kept for compatibility with
+                    RemoteExecutor.Session
+                deadline (Deadline): Bounds all commands of the session,
+                    deadline active in current thread by default
+            """
+            super(LocalExecutor.Session, self).__init__(executor)
+            if deadline is None:
+                deadline = Deadline.current()
+            self.deadline = deadline
+
+        def open(self):
+            pass
+
+        def command(self, cmd):
+            return LocalExecutor.Command(cmd, self)
+
+        def run_cmd(self, cmd, input_=None, timeout=None, max_memory=None):
+            cmd = self.command(cmd)
+            return cmd.run(input_, timeout, max_memory=max_memory)
+
+        @staticmethod
+        def _path(path):
+            return os.path.join(current_user_home(), path)
+
+        @contextlib.contextmanager
+        def open_file(self, path, mode='r', bufsize=-1):
+            with io.open(self._path(path), mode, bufsize) as fh:
+                with self.file_hooks(path, mode):
+                    yield fh
+
+        def stat(self, path):
+            return os.stat(self._path(path))
+
+        def listdir(self, path='.'):
+            return os.listdir(self._path(path))
+
+        def rename(self, src, dst):
+            os.rename(self._path(src), self._path(dst))
+
+        def remove(self, path):
+            os.remove(self._path(path))
+
+    class Command(Executor.Command):
+        """
+        Command executed by local shell.
+        """
+        def __init__(self, cmd, session):
+            """
+            Args:
+                cmd (list): command, or string with shell script
+                session (LocalExecutor.Session): session
+            """
+            if not isinstance(cmd, six.string_types):
+                cmd = subprocess.list2cmdline(cmd)
+            super(LocalExecutor.Command, self).__init__(cmd, session)
+            self._process = None
+
+        def get_rc(self, wait=False):
+            if self._rc is None and self._process is not None:
+                if wait:
+                    self._rc = self._process.wait()
+                else:
+                    self._rc = self._process.poll()
+            return self._rc
+
+        @contextlib.contextmanager
+        def execute(self, bufsize=-1, timeout=None, get_pty=False):
+            """
+            with cmd.execute() as (in_, out, err):
+                # file-like objects of process pipes
+
+            With get_pty the process runs on pseudo-terminal, stderr is
+            merged into out and err is None, like over ssh.
+            """
+            self.logger.debug("Executing: %s", self.cmd)
+            self._command_started()
+            if get_pty:
+                master, slave = pty.openpty()
+                try:
+                    self._process = subprocess.Popen(
+                        self.cmd, shell=True, stdin=slave, stdout=slave,
+                        stderr=slave, start_new_session=True,
+                        cwd=current_user_home(),
+                    )
+                except Exception:
+                    os.close(master)
+                    raise
+                finally:
+                    os.close(slave)
+                pipes = (
+                    io.open(os.dup(master), 'wb', bufsize),
+                    io.open(master, 'rb', bufsize),
+                    None,
+                )
+            else:
+                self._process = subprocess.Popen(
+                    self.cmd, shell=True, bufsize=bufsize,
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE, cwd=current_user_home(),
+                )
+                pipes = (
+                    self._process.stdin, self._process.stdout,
+                    self._process.stderr,
+                )
+            process = self._process
+            try:
+                yield pipes
+                self.get_rc(True)
+            finally:
+                if self._rc is None:
+                    process.kill()
+                    self.get_rc(True)
+                for fh in pipes:
+                    if fh is not None:
+                        fh.close()
+                self._command_finished()
+                self.logger.debug("Results of command: %s", self.cmd)
+                self.logger.debug("  OUT: %s", self.out)
+                self.logger.debug("  ERR: %s", self.err)
+                self.logger.debug("  RC: %s", self.rc)
+
+        @staticmethod
+        def _write(in_, input_):
+            if isinstance(input_, six.text_type):
+                input_ = input_.encode('utf-8')
+            try:
+                in_.write(input_)
+                in_.close()
+            except (IOError, OSError) as ex:
+                # command does not read its input
+                if ex.errno != errno.EPIPE:
+                    raise
+            except ValueError:
+                # command finished and pipe was closed meanwhile
+                pass
+
+        def stream(
+            self, input_=None, timeout=None, get_pty=False,
+            chunk_size=CHUNK_SIZE,
+        ):
+            """
+            Generator yielding chunks of output as they come, stdout and
+            stderr are read concurrently.
+
+            Args:
+                input_ (str): input data
+                timeout (float): Max time to wait for next chunk
+                get_pty (bool): Run command on pseudo-terminal
+                chunk_size (int): Max size of one chunk
+
+            Yields:
+                tuple: (STDOUT or STDERR, chunk of bytes)
+
+            Raises:
+                socket.timeout: No data came in timeout seconds
+            """
+            deadline = self._ss.deadline
+            with self.execute(get_pty=get_pty) as (in_, out, err):
+                if input_:
+                    # feed input concurrently, so big input does not block
+                    # on full output pipes
+                    writer = threading.Thread(
+                        target=self._write, args=(in_, input_),
+                    )
+                    writer.daemon = True
+                    writer.start()
+                else:
+                    in_.close()
+                selector = selectors.DefaultSelector()
+                selector.register(out, selectors.EVENT_READ, STDOUT)
+                if err is not None:
+                    selector.register(err, selectors.EVENT_READ, STDERR)
+                try:
+                    while selector.get_map():
+                        wait = timeout
+                        if deadline is not None:
+                            wait = deadline.cap(timeout)
+                        ready = selector.select(wait)
+                        if not ready:
+                            raise socket.timeout(
+                                "%s: timeout(%s)" % (self.cmd, timeout)
+                            )
+                        for key, _ in ready:
+                            try:
+                                chunk = os.read(key.fd, chunk_size)
+                            except OSError as ex:
+                                # pty master reports closed slave by EIO
+                                if ex.errno != errno.EIO:
+                                    raise
+                                chunk = b''
+                            if not chunk:
+                                selector.unregister(key.fileobj)
+                                continue
+                            yield key.data, chunk
+                finally:
+                    selector.close()
+
+        def run(
+            self, input_, timeout=None, get_pty=False,
+            on_out=None, on_err=None, max_retained=None, max_memory=None,
+            decode=True,
+        ):
+            """
+            Args:
+                input_ (str): input data
+                timeout (float): Max time to wait for next output
+                get_pty (bool): Run command on pseudo-terminal
+                on_out (callable): Called with each chunk of stdout
+                on_err (callable): Called with each chunk of stderr
+                max_retained (int): Keep only last max_retained bytes of
+                    stdout and stderr
+                max_memory (int): Spool outputs larger than max_memory
+                    bytes to local temporary files, 0 spools them always
+                decode (bool): Decode out and err, they are bytes otherwise
+
+            Returns:
+                tuple (int, str, str): rc, out, err, the out and err are
+                    instances of SpooledOutput when max_memory is set
+            """
+            if max_memory is None:
+                buffers = {
+                    STDOUT: OutputBuffer(max_retained),
+                    STDERR: OutputBuffer(max_retained),
+                }
+            else:
+                buffers = {
+                    STDOUT: SpooledOutput(max_memory),
+                    STDERR: SpooledOutput(max_memory),
+                }
+            callbacks = {STDOUT: on_out, STDERR: on_err}
+            for source, chunk in self.stream(input_, timeout, get_pty):
+                buffers[source].write(chunk)
+                if callbacks[source] is not None:
+                    callbacks[source](chunk)
+            if max_memory is None:
+                self.out = buffers[STDOUT].getvalue()
+                self.err = buffers[STDERR].getvalue()
+                if decode:
+                    self.out = normalize_string(self.out)
+                    self.err = normalize_string(self.err)
+            else:
+                self.out, self.err = buffers[STDOUT], buffers[STDERR]
+            return self.rc, self.out, self.err
+
+    def __init__(self, user, address='127.0.0.1'):
+        """
+        Args:
+            user (User): User, it has to be the user running this process
+            address (str): Local address the host is known by
+        """
+        super(LocalExecutor, self).__init__(user)
+        self.address = address
+        self.port = None
+
+    def session(self, timeout=None, deadline=None):
+        """
+        Args:
+            timeout (float): Ignored, there is no connection
+            deadline (Deadline): Bounds whole session
+
+        Returns:
+            instance of LocalExecutor.Session: The session
+        """
+        return LocalExecutor.Session(self, timeout, deadline=deadline)
+
+    def run_cmd(
+        self, cmd, input_=None, tcp_timeout=None, io_timeout=None,
+        max_memory=None, deadline=None,
+    ):
+        """
+        Args:
+            cmd (list): Command
+            input_ (str): Input data
+            tcp_timeout (float): Ignored, there is no connection
+            io_timeout (float): Max time to wait for next output
+            max_memory (int): Spool outputs larger than max_memory bytes to
+                local temporary files, 0 spools them always
+            deadline (Deadline): Bounds whole execution
+
+        Returns:
+            tuple (int, str, str): Rc, out, err, the out and err are
+                instances of common.SpooledOutput when max_memory is set
+        """
+        with self.session(tcp_timeout, deadline) as session:
+            return session.run_cmd(
+                cmd, input_, io_timeout, max_memory=max_memory,
+            )
+
+    def is_connective(self, tcp_timeout=20.0):
+        return True
+
+    def wait_for_connectivity_state(self, positive, *args, **kwargs):
+        """
+        Controller is always reachable from itself.
+
+        Returns:
+            bool: positive
+        """
+        return positive
+
+
+class LocalExecutorFactory(ExecutorFactory):
+    def build(self, host, user):
+        return LocalExecutor(user, host.ip)
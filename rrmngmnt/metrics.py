@@ -0,0 +1,259 @@
+"""
+This module collects timing and traffic statistics of remote execution.
+
+RemoteExecutor records into process-wide METRICS:
+    histograms (seconds): connect (TCP), auth (ssh handshake and
+        authentication), exec (opening channel and starting command),
+        transfer (reading output of command), sftp (opening file)
+    counters: connects, commands, files, bytes_sent, bytes_received
+
+Each value is kept per host and per command name (first word of command).
+
+Example:
+    with METRICS.measure() as m:
+        host.network.get_info()
+    print(m)  # 1 connects, 2 commands, 5120 bytes received in 0.134s
+
+    print(METRICS.histogram('exec', host='10.0.0.1').mean)
+"""
+import bisect
+import collections
+import contextlib
+import os
+import threading
+import time
+
+import six
+
+
+# Upper bounds of histogram buckets in seconds
+HISTOGRAM_BUCKETS = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    60.0, float('inf'),
+)
+COUNTER_NAMES = (
+    'connects', 'commands', 'files', 'bytes_sent', 'bytes_received',
+)
+
+
+def command_name(cmd):
+    """
+    Args:
+        cmd (list): command, or string with shell script
+
+    Returns:
+        str: name of executed binary
+    """
+    if isinstance(cmd, six.string_types):
+        cmd = cmd.split()
+    if not cmd:
+        return ''
+    return os.path.basename(cmd[0])
+
+
+class Histogram(object):
+    """
+    Distribution of observed values.
+    """
+    def __init__(self):
+        super(Histogram, self).__init__()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * len(HISTOGRAM_BUCKETS)
+
+    def __repr__(self):
+        return "Histogram(count=%s, mean=%.4f, max=%s)" % (
+            self.count, self.mean, self.max,
+        )
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[bisect.bisect_left(HISTOGRAM_BUCKETS, value)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, percent):
+        """
+        Args:
+            percent (float): 0 - 100
+
+        Returns:
+            float: upper bound of bucket containing the percentile
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * percent / 100.0
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Measurement(object):
+    """
+    Counters accumulated during METRICS.measure() block.
+    """
+    def __init__(self):
+        super(Measurement, self).__init__()
+        self.elapsed = 0.0
+        self.counters = dict((name, 0) for name in COUNTER_NAMES)
+
+    def __getattr__(self, name):
+        if name in COUNTER_NAMES:
+            return self.counters[name]
+        raise AttributeError(name)
+
+    def __str__(self):
+        return (
+            "%(connects)s connects, %(commands)s commands, "
+            "%(files)s files, %(bytes_sent)s bytes sent, "
+            "%(bytes_received)s bytes received" % self.counters
+        ) + " in %.3fs" % self.elapsed
+
+
+class Metrics(object):
+    """
+    Thread-safe registry of histograms and counters keyed by
+    (host, name, command).
+    """
+    def __init__(self):
+        super(Metrics, self).__init__()
+        self.enabled = True
+        self._histograms = collections.defaultdict(Histogram)
+        self._counters = collections.Counter()
+        self._totals = collections.Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, host, name, value, command=None):
+        """
+        Record duration
+
+        Args:
+            host (str): address of host
+            name (str): name of histogram, like 'exec'
+            value (float): duration in seconds
+            command (str): name of command
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._histograms[(host, name, command)].observe(value)
+
+    def incr(self, host, name, value=1, command=None):
+        """
+        Increase counter
+
+        Args:
+            host (str): address of host
+            name (str): name of counter, like 'commands'
+            value (int): increment
+            command (str): name of command
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(host, name, command)] += value
+            self._totals[name] += value
+
+    @contextlib.contextmanager
+    def timer(self, host, name, command=None):
+        """
+        Record duration of the block into histogram
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(host, name, time.monotonic() - start, command)
+
+    def histogram(self, name, host=None, command=None):
+        """
+        Args:
+            name (str): name of histogram
+            host (str): only this host, all hosts by default
+            command (str): only this command, all commands by default
+
+        Returns:
+            Histogram: merged histogram of matching keys
+        """
+        result = Histogram()
+        with self._lock:
+            for (h, n, c), hist in self._histograms.items():
+                if n != name:
+                    continue
+                if host is not None and h != host:
+                    continue
+                if command is not None and c != command:
+                    continue
+                result.merge(hist)
+        return result
+
+    def counter(self, name, host=None, command=None):
+        """
+        Args:
+            name (str): name of counter
+            host (str): only this host, all hosts by default
+            command (str): only this command, all commands by default
+
+        Returns:
+            int: sum of matching counters
+        """
+        with self._lock:
+            return sum(
+                value for (h, n, c), value in self._counters.items()
+                if n == name and host in (None, h) and command in (None, c)
+            )
+
+    def hosts(self):
+        with self._lock:
+            return sorted(set(k[0] for k in self._histograms))
+
+    @contextlib.contextmanager
+    def measure(self):
+        """
+        Collect counters of the block, it counts operations of all threads
+        running meanwhile.
+
+        Yields:
+            Measurement: filled once the block is over
+        """
+        measurement = Measurement()
+        with self._lock:
+            before = self._totals.copy()
+        start = time.monotonic()
+        try:
+            yield measurement
+        finally:
+            measurement.elapsed = time.monotonic() - start
+            with self._lock:
+                for name in COUNTER_NAMES:
+                    measurement.counters[name] = (
+                        self._totals[name] - before[name]
+                    )
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._totals.clear()
+
+
+METRICS = Metrics()
@@ -32,6 +32,12 @@ class _session(object):
     def runCmd(self, cmd):
         return self._s.run_cmd(cmd)
 
+    def runMany(self, cmds):
+        return self._s.run_many(cmds)
+
+    def runBatch(self, cmds):
+        return self._s.run_batch(cmds)
+
     def __enter__(self):
         self._c += 1
         if self._s is None:
@@ -139,6 +145,13 @@ class HostnameCtlHandler(HostnameHandler):
 
 
 class Network(Service):
+    _list_bridges_cmd = [
+        'brctl', 'show', '|',
+        'sed', '-e', '/^bridge name/ d',  # remove header
+        # deal with multiple interfaces
+        '-e', "'s/^\\s\\s*\\(\\S\\S*\\)$/CONT:\\1/I'"
+    ]
+
     def __init__(self, host):
         super(Network, self).__init__(host)
         self._m = _session(host)
@@ -154,12 +167,21 @@ class Network(Service):
     @keep_session
     def _cmd(self, cmd):
         rc, out, err = self._m.runCmd(cmd)
+        return self._check(cmd, rc, out, err)
 
+    def _check(self, cmd, rc, out, err):
         if rc:
             raise CommandExecutionFailure(
                 self._m.executor, cmd, rc, "OUT: %s\nERR: %s" % (out, err))
         return out
 
+    @keep_session
+    def _cmds(self, cmds):
+        results = self._m.runMany(cmds)
+        return [
+            self._check(cmd, *result) for cmd, result in zip(cmds, results)
+        ]
+
     @keep_session
     def _get_hostname_handler(self):
         if self._hnh is None:
@@ -214,8 +236,11 @@ class Network(Service):
         Returns:
             str: Default gateway
         """
-        out = self._cmd(["ip", "route"]).splitlines()
-        for i in out:
+        return self._parse_default_gw(self._cmd(["ip", "route"]))
+
+    @staticmethod
+    def _parse_default_gw(out):
+        for i in out.splitlines():
             if re.search("default", i):
                 default_gw = re.findall(r'[0-9]+(?:\.[0-9]+){3}', i)
                 if netaddr.valid_ipv4(default_gw[0]):
@@ -249,10 +274,13 @@ class Network(Service):
             tuple(list of strings, list of strings): List of ips and list of
                 cird ips
         """
+        return self._parse_ips(self._cmd(["ip", "addr"]))
+
+    @staticmethod
+    def _parse_ips(out):
         ips = []
         ip_and_netmask = []
-        out = self._cmd(["ip", "addr"]).splitlines()
-        for i in out:
+        for i in out.splitlines():
             cidr = re.findall(r'[0-9]+(?:\.[0-9]+){3}[/]+[0-9]{2}', i)
             if cidr:
                 ip_and_netmask.append(cidr[0])
@@ -370,14 +398,13 @@ class Network(Service):
         Returns:
             list of strings: List of macs
         """
-        mac_list = list()
-        for interface in interfaces:
-            if interface not in self.all_interfaces():
-                return False
-            out = self._cmd(["ethtool", "-P", interface])
-            mac = out.split(": ")[1]
-            mac_list.append(mac.strip())
-        return mac_list
+        all_interfaces = self.all_interfaces()
+        if any(interface not in all_interfaces for interface in interfaces):
+            return False
+        outs = self._cmds(
+            [["ethtool", "-P", interface] for interface in interfaces]
+        )
+        return [out.split(": ")[1].strip() for out in outs]
 
     @keep_session
     def find_mgmt_interface(self):
@@ -402,14 +429,12 @@ class Network(Service):
         Returns:
             list of dict(name, id, stp, interfaces): List of bridges
         """
+        return self._parse_bridges(self._cmd(self._list_bridges_cmd))
+
+    @staticmethod
+    def _parse_bridges(out):
         bridges = []
-        cmd = [
-            'brctl', 'show', '|',
-            'sed', '-e', '/^bridge name/ d',  # remove header
-            # deal with multiple interfaces
-            '-e', "'s/^\\s\\s*\\(\\S\\S*\\)$/CONT:\\1/I'"
-        ]
-        out = self._cmd(cmd).strip()
+        out = out.strip()
         if not out:
             # Empty list
             return bridges
@@ -513,9 +538,11 @@ class Network(Service):
             dict: Network info
         """
         net_info = {}
-        gateway = self.find_default_gw()
+        cmds = [["ip", "route"], ["ip", "addr"], self._list_bridges_cmd]
+        route, addr, brctl = self._m.runBatch(cmds)
+        gateway = self._parse_default_gw(self._check(cmds[0], *route))
         net_info["gateway"] = gateway
-        ips, ips_and_mask = self.find_ips()
+        ips, ips_and_mask = self._parse_ips(self._check(cmds[1], *addr))
         if gateway is not None:
             ip = self.find_ip_by_default_gw(gateway, ips_and_mask)
             net_info["ip"] = ip
@@ -532,10 +559,12 @@ class Network(Service):
                     )
                 except IndexError:
                     pass
-                bridge = self.get_bridge(interface)
-                if bridge is not None:
+                bridges = self._parse_bridges(self._check(cmds[2], *brctl))
+                bridge = [b for b in bridges if b['name'] == interface]
+                if bridge:
+                    bridge = bridge[0]
                     net_info["bridge"] = bridge['name']
-                    interface = self.find_int_by_bridge(bridge['name'])
+                    interface = (bridge['interfaces'] or [None])[0]
                     net_info["interface"] = interface
                 else:
                     net_info["bridge"] = "N/A"
@@ -103,6 +103,35 @@ class NMCLI(Service):
 
         rc, out, err = self._executor.run_cmd(split)
 
+        return self._check_result(command, split, rc, out, err)
+
+    def _exec_commands(self, commands):
+        """
+        Executes commands in parallel over single session.
+
+        Args:
+            commands (list[str]): commands to run remotely.
+
+        Returns:
+            list[str]: commands execution outputs.
+
+        Raises:
+            CommandExecutionFailure: if the remote host returned a code
+                indicating a failure in execution.
+        """
+        splits = [shlex.split(command) for command in commands]
+
+        with self._executor.session() as session:
+            results = session.run_many(splits)
+
+        return [
+            self._check_result(command, split, rc, out, err)
+            for command, split, (rc, out, err) in zip(
+                commands, splits, results
+            )
+        ]
+
+    def _check_result(self, command, split, rc, out, err):
         if rc != 0:
             self.logger.error(
                 ERROR_MSG_FORMAT.format(
@@ -176,11 +205,9 @@ class NMCLI(Service):
             name for name in device_names.splitlines() if name != ""
         ]
 
-        devices = []
-
-        for name in device_names:
-            out = self._exec_command(
-                command=(
+        outs = self._exec_commands(
+            [
+                (
                     "nmcli -e no "
                     "-g {type},{mac},{mtu} "
                     "{obj} {operation} {device}"
@@ -192,7 +219,13 @@ class NMCLI(Service):
                     operation=Operations.SHOW,
                     device=name,
                 )
-            )
+                for name in device_names
+            ]
+        )
+
+        devices = []
+
+        for name, out in zip(device_names, outs):
             properties = out.splitlines()
             devices.append(
                 {
@@ -19,12 +19,11 @@ class PackageManager(Service):
     def is_available(cls, h):
         if not cls.binary:
             raise NotImplementedError("Name of binary file is not available.")
-        rc, _, _ = h.executor().run_cmd(
+        return not h.executor().run(
             [
                 'which', cls.binary,
             ]
-        )
-        return not rc
+        ).rc
 
     def _run_command_on_host(self, cmd):
         """
@@ -0,0 +1,298 @@
+"""
+This module checks reachability of many hosts at once.
+
+All probes run concurrently in single thread driven by selector, so
+checking hundreds of hosts takes about as long as the slowest of them.
+
+Methods:
+    tcp: TCP connect to ssh port
+    ssh: TCP connect and identification string of ssh server
+    icmp: ICMP echo, it needs unprivileged ICMP sockets
+        (net.ipv4.ping_group_range) or root, IPv4 only
+
+Example:
+    results = probe_all(Host.inventory, method='ssh', timeout=5)
+    for host in results.unreachable:
+        print(host, results[host].error)
+
+    results = wait_all(hosts, positive=True, timeout=600)
+    if results.unreachable:
+        raise RuntimeError("%s did not come up" % results.unreachable)
+"""
+import errno
+import os
+import selectors
+import socket
+import struct
+import time
+
+from rrmngmnt.deadline import Deadline
+from rrmngmnt.ssh import (
+    CONNECTIVITY_MIN_SAMPLE_TIME,
+    CONNECTIVITY_SAMPLE_TIME,
+    CONNECTIVITY_TIMEOUT,
+    SSH_BANNER_PREFIX,
+)
+
+
+PROBE_TIMEOUT = 5.0
+PROBE_METHODS = ('tcp', 'ssh', 'icmp')
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+class ProbeResult(object):
+    """
+    State of one host, it evaluates as True when the host is reachable.
+    """
+    def __init__(self, reachable, latency=None, error=None):
+        """
+        Args:
+            reachable (bool): host responded
+            latency (float): seconds until response came
+            error (str): reason why host is unreachable
+        """
+        super(ProbeResult, self).__init__()
+        self.reachable = reachable
+        self.latency = latency
+        self.error = error
+
+    def __bool__(self):
+        return self.reachable
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        if self.reachable:
+            return "ProbeResult(reachable, latency=%.3f)" % self.latency
+        return "ProbeResult(unreachable, error=%s)" % self.error
+
+
+class ProbeResults(dict):
+    """
+    ProbeResult instances keyed by host.
+    """
+    @property
+    def reachable(self):
+        return [h for h, r in self.items() if r]
+
+    @property
+    def unreachable(self):
+        return [h for h, r in self.items() if not r]
+
+
+def _port(host):
+    return getattr(host.executor_factory, 'port', 22)
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _icmp_socket():
+    try:
+        return socket.socket(
+            socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP
+        ), False
+    except socket.error:
+        return socket.socket(
+            socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP
+        ), True
+
+
+class _Probe(object):
+    """
+    Non-blocking probe of single host, the selector calls handle when
+    the socket is ready.
+    """
+    def __init__(self, host, method, started):
+        self.host = host
+        self.method = method
+        self.started = started
+        self.sock = None
+        self.raw = False
+        self.ident = None
+        self.data = b''
+
+    def start(self):
+        """
+        Returns:
+            int: selector event to wait for
+        """
+        if self.method == 'icmp':
+            self.sock, self.raw = _icmp_socket()
+            self.sock.setblocking(False)
+            self.ident = (os.getpid() + id(self)) & 0xffff
+            header = struct.pack(
+                '!BBHHH', ICMP_ECHO_REQUEST, 0, 0, self.ident, 1
+            )
+            payload = b'rrmngmnt'
+            header = struct.pack(
+                '!BBHHH', ICMP_ECHO_REQUEST, 0,
+                _checksum(header + payload), self.ident, 1,
+            )
+            self.sock.sendto(header + payload, (self.host.ip, 0))
+            return selectors.EVENT_READ
+        family, type_, proto, _, address = socket.getaddrinfo(
+            self.host.ip, _port(self.host), 0, socket.SOCK_STREAM,
+        )[0]
+        self.sock = socket.socket(family, type_, proto)
+        self.sock.setblocking(False)
+        err = self.sock.connect_ex(address)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            raise socket.error(err, os.strerror(err))
+        return selectors.EVENT_WRITE
+
+    def handle(self, events):
+        """
+        Returns:
+            ProbeResult: result, or None when probe is not finished yet
+
+        Raises:
+            socket.error: host is not reachable
+        """
+        if self.method == 'icmp':
+            packet = self.sock.recv(1024)
+            if self.raw:
+                # raw socket receives IP header and all ICMP traffic
+                packet = packet[(packet[0] & 0x0f) * 4:]
+                if struct.unpack('!H', packet[4:6])[0] != self.ident:
+                    return None
+            if packet[0] != ICMP_ECHO_REPLY:
+                return None
+            return self._done()
+        if events & selectors.EVENT_WRITE:
+            err = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                raise socket.error(err, os.strerror(err))
+            if self.method == 'tcp':
+                return self._done()
+            return None
+        chunk = self.sock.recv(256)
+        if not chunk:
+            raise socket.error("connection closed before ssh banner")
+        self.data += chunk
+        for line in self.data.split(b'\n')[:-1]:
+            if line.startswith(SSH_BANNER_PREFIX):
+                return self._done()
+        if len(self.data) > 8192:
+            raise socket.error("no ssh banner")
+        return None
+
+    def _done(self):
+        return ProbeResult(True, latency=time.monotonic() - self.started)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+
+
+def probe_all(hosts, method='tcp', timeout=PROBE_TIMEOUT):
+    """
+    Check reachability of hosts concurrently
+
+    Args:
+        hosts (list): Host instances, port of ssh is taken from their
+            executor factory
+        method (str): One of 'tcp', 'ssh', 'icmp'
+        timeout (float): Max time to wait for responses
+
+    Returns:
+        ProbeResults: ProbeResult keyed by host
+
+    Raises:
+        socket.error: This process is not allowed to open ICMP socket
+    """
+    if method not in PROBE_METHODS:
+        raise ValueError(
+            "Unknown method %s, use one of %s" % (method, PROBE_METHODS)
+        )
+    if method == 'icmp':
+        # failure on controller side would look like unreachable hosts
+        _icmp_socket()[0].close()
+    results = ProbeResults()
+    deadline = Deadline(timeout)
+    selector = selectors.DefaultSelector()
+    try:
+        for host in hosts:
+            probe = _Probe(host, method, time.monotonic())
+            try:
+                events = probe.start()
+            except (socket.error, ValueError) as ex:
+                probe.close()
+                results[host] = ProbeResult(False, error=str(ex))
+                continue
+            selector.register(probe.sock, events, probe)
+        while selector.get_map():
+            ready = selector.select(deadline.remaining())
+            if not ready:
+                break
+            for key, events in ready:
+                probe = key.data
+                try:
+                    result = probe.handle(events)
+                    if result is None:
+                        if events & selectors.EVENT_WRITE:
+                            selector.modify(
+                                probe.sock, selectors.EVENT_READ, probe
+                            )
+                        continue
+                except socket.error as ex:
+                    result = ProbeResult(False, error=str(ex))
+                results[probe.host] = result
+                selector.unregister(probe.sock)
+                probe.close()
+        for key in list(selector.get_map().values()):
+            results[key.data.host] = ProbeResult(
+                False, error="timeout(%s)" % timeout
+            )
+            selector.unregister(key.fileobj)
+            key.data.close()
+    finally:
+        selector.close()
+    return results
+
+
+def wait_all(
+    hosts, positive=True, timeout=CONNECTIVITY_TIMEOUT, method='ssh',
+    sample_time=CONNECTIVITY_SAMPLE_TIME, probe_timeout=PROBE_TIMEOUT,
+):
+    """
+    Wait until all hosts are reachable, or all are unreachable
+
+    Hosts are probed together; hosts that reach the state are dropped
+    from next rounds. The interval between rounds doubles from
+    CONNECTIVITY_MIN_SAMPLE_TIME up to sample_time.
+
+    Args:
+        hosts (list): Host instances
+        positive (bool): Wait for reachable or unreachable state
+        timeout (float): Max time to wait
+        method (str): One of 'tcp', 'ssh', 'icmp'
+        sample_time (float): Max interval between rounds
+        probe_timeout (float): Timeout of single round
+
+    Returns:
+        ProbeResults: Last ProbeResult of each host, hosts which did not
+            reach the state are listed in unreachable (positive) or
+            reachable (negative)
+
+    Raises:
+        socket.error: This process is not allowed to open ICMP socket
+    """
+    results = ProbeResults()
+    deadline = Deadline(timeout)
+    pending = list(hosts)
+    interval = min(CONNECTIVITY_MIN_SAMPLE_TIME, sample_time)
+    while pending:
+        results.update(probe_all(pending, method, probe_timeout))
+        pending = [h for h in pending if bool(results[h]) != positive]
+        if not pending or deadline.expired:
+            break
+        time.sleep(min(interval, deadline.remaining()))
+        interval = min(interval * 2, sample_time)
+    return results
@@ -1,11 +1,24 @@
 import os
+import re
 import time
+import uuid
 import socket
 import paramiko
+import select
 import contextlib
+import six
 import subprocess
-from rrmngmnt.common import normalize_string
-from rrmngmnt.executor import Executor, ExecutorFactory
+import threading
+from rrmngmnt import errors
+from rrmngmnt import local
+from rrmngmnt.common import OutputBuffer, SpooledOutput, normalize_string
+from rrmngmnt.connection_pool import CONNECTION_POOL
+from rrmngmnt.deadline import Deadline
+from rrmngmnt.executor import (
+    CommandResult, Executor, ExecutorFactory, STDERR, STDOUT,
+)
+from rrmngmnt.metrics import METRICS, command_name
+from rrmngmnt.ssh_keys import PRIVATE_KEY_CACHE, private_key_path
 
 
 AUTHORIZED_KEYS = os.path.join("%s", ".ssh/authorized_keys")
@@ -14,7 +27,79 @@ ID_RSA_PUB = os.path.join("%s", ".ssh/id_rsa.pub")
 ID_RSA_PRV = os.path.join("%s", ".ssh/id_rsa")
 CONNECTIVITY_TIMEOUT = 600
 CONNECTIVITY_SAMPLE_TIME = 20
+CONNECTIVITY_MIN_SAMPLE_TIME = 1
 TCP_CONNECTION_TIMEOUT = 20
+CHUNK_SIZE = 32768
+SSH_BANNER_PREFIX = b'SSH-'
+
+
+def read_ssh_banner(address, port=22, timeout=None):
+    """
+    Connect to ssh port and read identification string of ssh server,
+    it is much cheaper than ssh handshake and authentication.
+
+    Args:
+        address (str): Ip / hostname
+        port (int): Port of ssh server
+        timeout (float): Timeout of connect and read
+
+    Returns:
+        str: Banner of ssh server, like 'SSH-2.0-OpenSSH_8.0'
+
+    Raises:
+        socket.error: Connection failed, or the server did not send
+            ssh banner
+    """
+    sock = socket.create_connection((address, port), timeout)
+    try:
+        data = b''
+        # server can send other lines before the banner (RFC 4253)
+        while len(data) < 8192:
+            chunk = sock.recv(256)
+            if not chunk:
+                break
+            data += chunk
+            for line in data.split(b'\n')[:-1]:
+                if line.startswith(SSH_BANNER_PREFIX):
+                    return normalize_string(line.rstrip(b'\r'))
+        raise socket.error("%s:%s did not send ssh banner" % (address, port))
+    finally:
+        sock.close()
+
+
+class _SocketWatchdog(object):
+    """
+    Shuts socket down when deadline passes, it interrupts blocking steps
+    which can not be bounded by timeout from outside, like ssh handshake.
+    """
+    def __init__(self, sock, deadline):
+        self._sock = sock
+        self._fired = False
+        self._lock = threading.Lock()
+        self._timer = threading.Timer(deadline.remaining(), self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            if self._timer is None:
+                return
+            self._fired = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+    def stop(self):
+        """
+        Returns:
+            bool: True if the socket was shut down
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            return self._fired
 
 
 class RemoteExecutor(Executor):
@@ -31,6 +116,8 @@ class RemoteExecutor(Executor):
     """
 
     TCP_TIMEOUT = 10.0
+    # The pool is shared by all executors created with use_pool=True
+    connection_pool = CONNECTION_POOL
 
     class LoggerAdapter(Executor.LoggerAdapter):
         """
@@ -52,26 +139,53 @@ class RemoteExecutor(Executor):
         """
         Represents active ssh connection
         """
-        def __init__(self, executor, timeout=None):
+        def __init__(
+            self, executor, timeout=None, use_pool=None, deadline=None,
+        ):
+            """
+            Args:
+                executor (RemoteExecutor): executor
+                timeout (float): Tcp timeout
+                use_pool (bool): Borrow connection from the connection pool,
+                    by default it follows executor.use_pool
+                deadline (Deadline): Bounds connect and all commands of the
+                    session, deadline active in current thread by default
+            """
             super(RemoteExecutor.Session, self).__init__(executor)
             if timeout is None:
                 timeout = RemoteExecutor.TCP_TIMEOUT
+            if use_pool is None:
+                use_pool = self._executor.use_pool
+            if deadline is None:
+                deadline = Deadline.current()
             self._timeout = timeout
-            self._ssh = paramiko.SSHClient()
-            self._ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            self.deadline = deadline
+            self._pool = self._executor.connection_pool if use_pool else None
+            self._reused = False
+            self._reconnect_lock = threading.Lock()
+            self._ssh = None
+            self._sftp = None
+            self._sftp_ssh = None
+            self._sftp_lock = threading.Lock()
+            self.pkey = None
             if self._executor.use_pkey:
-                self.pkey = paramiko.RSAKey.from_private_key_file(
-                    os.getenv(
-                        "HOST_SSH_KEY", ID_RSA_PRV % os.path.expanduser('~')
+                path = private_key_path()
+                if path is not None:
+                    self.pkey = PRIVATE_KEY_CACHE.load(
+                        path, os.getenv("HOST_SSH_KEY_PASSPHRASE"),
                     )
-                )
+                # without key file the keys of ssh-agent are used
                 self._executor.user.password = None
-            else:
-                self.pkey = None
 
         def __exit__(self, type_, value, tb):
             if type_ is socket.timeout:
                 self._update_timeout_exception(value)
+            self._shutdown_workers()
+            if type_ is not None and issubclass(
+                type_, (socket.error, paramiko.SSHException, EOFError)
+            ):
+                # do not return possibly broken connection into the pool
+                self._pool = None
             try:
                 self.close()
             except Exception as ex:
@@ -81,18 +195,72 @@ class RemoteExecutor(Executor):
                     self._executor.logger.debug(
                         "Can not close ssh session %s", ex,
                     )
+            finally:
+                self._session_closed()
 
-        def open(self):
-            self._ssh.get_host_keys().clear()
+        def cap_timeout(self, timeout):
+            """
+            Args:
+                timeout (float): Timeout of single blocking operation
+
+            Returns:
+                float: timeout shortened to fit into deadline of the session
+
+            Raises:
+                socket.timeout: If deadline of the session already passed
+            """
+            if self.deadline is None:
+                return timeout
+            return self.deadline.cap(timeout)
+
+        def _connect(self):
+            ssh = paramiko.SSHClient()
+            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            address = self._executor.address
             try:
-                self._ssh.connect(
-                    self._executor.address,
-                    username=self._executor.user.name,
-                    password=self._executor.user.password,
-                    timeout=self._timeout,
-                    pkey=self.pkey,
-                    port=self._executor.port,
-                )
+                # TCP connect is done here to measure it apart from ssh
+                with METRICS.timer(address, 'connect'):
+                    sock = socket.create_connection(
+                        (address, self._executor.port),
+                        self.cap_timeout(self._timeout),
+                    )
+                # ssh packets are small and latency bound, do not let
+                # Nagle's algorithm hold them back
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                watchdog = None
+                timeouts = dict(timeout=self._timeout)
+                try:
+                    if self.deadline is not None:
+                        # banner, kex and authentication wait each with
+                        # its own timeout, so the socket is shut down once
+                        # the deadline passes, whatever stage it is in
+                        timeout = self.cap_timeout(self._timeout)
+                        timeouts = dict(
+                            timeout=timeout, banner_timeout=timeout,
+                            auth_timeout=timeout, channel_timeout=timeout,
+                        )
+                        watchdog = _SocketWatchdog(sock, self.deadline)
+                    with METRICS.timer(address, 'auth'):
+                        ssh.connect(
+                            address,
+                            username=self._executor.user.name,
+                            password=self._executor.user.password,
+                            pkey=self.pkey,
+                            port=self._executor.port,
+                            sock=sock,
+                            **timeouts
+                        )
+                    if watchdog is not None and watchdog.stop():
+                        raise socket.timeout()
+                except Exception as ex:
+                    if watchdog is not None and watchdog.stop():
+                        ssh.close()
+                        sock.close()
+                        if isinstance(ex, socket.timeout):
+                            raise
+                        raise socket.timeout() from ex
+                    sock.close()
+                    raise
             except (socket.gaierror, socket.herror) as ex:
                 args = list(ex.args)
                 message = "%s: %s" % (self._executor.address, args[1])
@@ -103,9 +271,104 @@ class RemoteExecutor(Executor):
             except socket.timeout as ex:
                 self._update_timeout_exception(ex)
                 raise
+            METRICS.incr(address, 'connects')
+            self._reused = False
+            return ssh
+
+        def open(self):
+            if self._pool is None:
+                self._ssh = self._connect()
+            else:
+                self._reused = True
+                self._ssh = self._pool.acquire(
+                    self._executor.pool_key, self._connect,
+                )
 
         def close(self):
-            self._ssh.close()
+            if self._ssh is None:
+                return
+            self._close_sftp()
+            ssh, self._ssh = self._ssh, None
+            if self._pool is None:
+                ssh.close()
+            else:
+                self._pool.release(self._executor.pool_key, ssh)
+
+        def _call(self, method, *args, **kwargs):
+            """
+            Calls method of underlying ssh client, in case the client was
+            taken from the pool and it turns out to be dead, it reconnects
+            and calls the method again.
+            """
+            ssh = self._ssh
+            try:
+                return getattr(ssh, method)(*args, **kwargs)
+            except (paramiko.SSHException, EOFError, socket.error) as ex:
+                if not self._reused:
+                    raise
+                with self._reconnect_lock:
+                    # other channel could already reconnect the session
+                    if self._ssh is ssh:
+                        self.logger.debug(
+                            "Pooled connection is not usable, "
+                            "reconnecting: %s", ex
+                        )
+                        ssh.close()
+                        self._ssh = self._connect()
+                return getattr(self._ssh, method)(*args, **kwargs)
+
+        @property
+        def sftp(self):
+            """
+            SFTP client of the session, it is opened on first use and
+            shared by all file operations until the session closes.
+
+            Returns:
+                paramiko.SFTPClient: sftp client
+            """
+            with self._sftp_lock:
+                sftp = self._sftp
+                if sftp is None or self._sftp_ssh is not self._ssh or (
+                    sftp.sock.closed
+                ):
+                    self._close_sftp()
+                    sftp = self._call('open_sftp')
+                    # connection could be replaced by _call
+                    self._sftp, self._sftp_ssh = sftp, self._ssh
+                return sftp
+
+        def _close_sftp(self):
+            sftp, self._sftp = self._sftp, None
+            self._sftp_ssh = None
+            if sftp is not None:
+                try:
+                    sftp.close()
+                except Exception as ex:
+                    self.logger.debug("Can not close sftp client %s", ex)
+
+        def stat(self, path):
+            """
+            Returns:
+                paramiko.SFTPAttributes: attributes of file, like st_size
+                    or st_mode
+            """
+            return self.sftp.stat(path)
+
+        def listdir(self, path='.'):
+            """
+            Returns:
+                list: names of entries in directory
+            """
+            return self.sftp.listdir(path)
+
+        def rename(self, src, dst):
+            """
+            Rename file, existing dst is replaced
+            """
+            self.sftp.posix_rename(src, dst)
+
+        def remove(self, path):
+            self.sftp.remove(path)
 
         def _update_timeout_exception(self, ex, timeout=None):
             if getattr(ex, '_updated', False):
@@ -115,26 +378,90 @@ class RemoteExecutor(Executor):
             message = "%s: timeout(%s)" % (
                 self._executor.address, timeout
             )
+            if self.deadline is not None and self.deadline.expired:
+                message = "%s: deadline(%s)" % (
+                    self._executor.address, self.deadline.timeout
+                )
             ex.args = (message,)
             ex._updated = True
 
         def command(self, cmd):
             return RemoteExecutor.Command(cmd, self)
 
-        def run_cmd(self, cmd, input_=None, timeout=None):
+        def run_cmd(self, cmd, input_=None, timeout=None, max_memory=None):
             cmd = self.command(cmd)
-            return cmd.run(input_, timeout)
+            return cmd.run(input_, timeout, max_memory=max_memory)
+
+        def run(self, cmd, input_=None, timeout=None, binary=False):
+            """
+            Args:
+                cmd (list): command
+                input_ (str): input data
+                timeout (float): Timeout for data operation (read/write)
+                binary (bool): Return output as bytes
+
+            Returns:
+                CommandResult: result of command, decoded on access
+            """
+            cmd = self.command(cmd)
+            return CommandResult(
+                *cmd.run(input_, timeout, decode=False), binary=binary
+            )
+
+        def run_batch(self, cmds, timeout=None):
+            """
+            Run commands one after another in single remote shell, so all
+            of them cost only one round trip. Each command runs in its own
+            subshell, outputs are separated by unique markers.
+
+            Args:
+                cmds (list): list of commands
+                timeout (float): Timeout for data operation (read/write)
+
+            Returns:
+                list: list of (rc, out, err) tuples in order of cmds
+
+            Raises:
+                CommandExecutionFailure: If the batch didn't finish
+            """
+            cmds = list(cmds)
+            if not cmds:
+                return []
+            marker = uuid.uuid4().hex
+            script = list()
+            for i, cmd in enumerate(cmds):
+                script.append("(%s\n)" % subprocess.list2cmdline(cmd))
+                script.append("printf '%s:%d:%%d\\n' $?" % (marker, i))
+                script.append("printf '%s:%d\\n' >&2" % (marker, i))
+            rc, out, err = self.command("\n".join(script)).run(
+                None, timeout,
+            )
+            outs = re.split(r'%s:\d+:(\d+)\n' % marker, out)
+            errs = re.split(r'%s:\d+\n' % marker, err)
+            if len(outs) != 2 * len(cmds) + 1 or len(errs) != len(cmds) + 1:
+                raise errors.CommandExecutionFailure(
+                    self._executor, cmds, rc,
+                    "Batch of commands didn't finish: %s" % errs[-1],
+                )
+            return [
+                (int(outs[2 * i + 1]), outs[2 * i], errs[i])
+                for i in range(len(cmds))
+            ]
 
         @contextlib.contextmanager
         def open_file(self, path, mode='r', bufsize=-1):
-            with contextlib.closing(self._ssh.open_sftp()) as sftp:
-                with contextlib.closing(
-                    sftp.file(
-                        path,
-                        mode,
-                        bufsize,
-                    )
-                ) as fh:
+            address = self._executor.address
+            start = time.monotonic()
+            with contextlib.closing(
+                self.sftp.file(
+                    path,
+                    mode,
+                    bufsize,
+                )
+            ) as fh:
+                METRICS.observe(address, 'sftp', time.monotonic() - start)
+                METRICS.incr(address, 'files')
+                with self.file_hooks(path, mode):
                     yield fh
 
     class Command(Executor.Command):
@@ -146,10 +473,15 @@ class RemoteExecutor(Executor):
          - returncode the exit status of command
         """
         def __init__(self, cmd, session):
-            super(RemoteExecutor.Command, self).__init__(
-                subprocess.list2cmdline(cmd),
-                session,
-            )
+            """
+            Args:
+                cmd (list): command, or string with shell script
+                session (RemoteExecutor.Session): session
+            """
+            self.name = command_name(cmd)
+            if not isinstance(cmd, six.string_types):
+                cmd = subprocess.list2cmdline(cmd)
+            super(RemoteExecutor.Command, self).__init__(cmd, session)
             self._in = None
             self._out = None
             self._err = None
@@ -172,12 +504,18 @@ class RemoteExecutor(Executor):
             """
             try:
                 self.logger.debug("Executing: %s", self.cmd)
-                self._in, self._out, self._err = self._ss._ssh.exec_command(
-                    self.cmd,
-                    bufsize=bufsize,
-                    timeout=timeout,
-                    get_pty=get_pty,
-                )
+                timeout = self._ss.cap_timeout(timeout)
+                address = self._ss._executor.address
+                self._command_started()
+                with METRICS.timer(address, 'exec', self.name):
+                    self._in, self._out, self._err = self._ss._call(
+                        'exec_command',
+                        self.cmd,
+                        bufsize=bufsize,
+                        timeout=timeout,
+                        get_pty=get_pty,
+                    )
+                METRICS.incr(address, 'commands', command=self.name)
                 yield self._in, self._out, self._err
                 self.get_rc(True)
             except socket.timeout as ex:
@@ -190,58 +528,237 @@ class RemoteExecutor(Executor):
                     self._out.close()
                 if self._err is not None:
                     self._err.close()
+                if self._started is not None:
+                    self._command_finished()
                 self.logger.debug("Results of command: %s", self.cmd)
                 self.logger.debug("  OUT: %s", self.out)
                 self.logger.debug("  ERR: %s", self.err)
                 self.logger.debug("  RC: %s", self.rc)
 
-        def run(self, input_, timeout=None, get_pty=False):
+        @staticmethod
+        def _read(
+            channel, timeout=None, chunk_size=CHUNK_SIZE, deadline=None,
+        ):
+            """
+            Reads stdout and stderr of channel concurrently, so the remote
+            side never stalls on full stderr window while we wait for
+            stdout or vice versa.
+
+            Raises:
+                socket.timeout: No data came in timeout seconds, or the
+                    deadline passed
+            """
+            while True:
+                # all data preceding EOF are buffered once it is received
+                eof = channel.eof_received or channel.closed
+                ready = False
+                if channel.recv_ready():
+                    ready = True
+                    yield STDOUT, channel.recv(chunk_size)
+                if channel.recv_stderr_ready():
+                    ready = True
+                    yield STDERR, channel.recv_stderr(chunk_size)
+                if ready:
+                    continue
+                if eof:
+                    break
+                wait = timeout if deadline is None else deadline.cap(timeout)
+                if not select.select([channel], [], [], wait)[0]:
+                    raise socket.timeout()
+
+        def _send(self, in_, input_):
+            if isinstance(input_, six.text_type):
+                # count bytes which go over the channel, not characters
+                input_ = input_.encode('utf-8')
+            in_.write(input_)
+            in_.close()
+            METRICS.incr(
+                self._ss._executor.address, 'bytes_sent', len(input_),
+                self.name,
+            )
+
+        def _transfer(self, channel, timeout, chunk_size=CHUNK_SIZE):
+            """
+            Reads output of command like _read, and records metrics.
+            """
+            start = time.monotonic()
+            received = 0
+            try:
+                for source, chunk in self._read(
+                    channel, timeout, chunk_size, self._ss.deadline,
+                ):
+                    received += len(chunk)
+                    yield source, chunk
+            finally:
+                address = self._ss._executor.address
+                METRICS.observe(
+                    address, 'transfer', time.monotonic() - start, self.name,
+                )
+                METRICS.incr(address, 'bytes_received', received, self.name)
+
+        def stream(
+            self, input_=None, timeout=None, get_pty=False,
+            chunk_size=CHUNK_SIZE,
+        ):
+            """
+            Generator yielding chunks of output as they come, stdout and
+            stderr are read concurrently and nothing is retained.
+
+            for source, chunk in cmd.stream():
+                if source == STDERR:
+                    sys.stderr.write(chunk)
+
+            Args:
+                input_ (str): input data
+                timeout (float): Max time to wait for next chunk
+                get_pty (bool): Request pseudo-terminal
+                chunk_size (int): Max size of one chunk
+
+            Yields:
+                tuple: (STDOUT or STDERR, chunk of bytes)
+            """
+            with self.execute(
+                timeout=timeout, get_pty=get_pty
+            ) as (in_, out, _):
+                if input_:
+                    self._send(in_, input_)
+                for item in self._transfer(out.channel, timeout, chunk_size):
+                    yield item
+
+        def run(
+            self, input_, timeout=None, get_pty=False,
+            on_out=None, on_err=None, max_retained=None, max_memory=None,
+            decode=True,
+        ):
+            """
+            Args:
+                input_ (str): input data
+                timeout (float): Timeout for data operation (read/write)
+                get_pty (bool): Request pseudo-terminal
+                on_out (callable): Called with each chunk of stdout
+                on_err (callable): Called with each chunk of stderr
+                max_retained (int): Keep only last max_retained bytes of
+                    stdout and stderr
+                max_memory (int): Spool outputs larger than max_memory
+                    bytes to local temporary files, 0 spools them always
+                decode (bool): Decode out and err, they are bytes otherwise
+
+            Returns:
+                tuple (int, str, str): rc, out, err, the out and err are
+                    instances of SpooledOutput when max_memory is set
+            """
+            if max_memory is None:
+                buffers = {
+                    STDOUT: OutputBuffer(max_retained),
+                    STDERR: OutputBuffer(max_retained),
+                }
+            else:
+                buffers = {
+                    STDOUT: SpooledOutput(max_memory),
+                    STDERR: SpooledOutput(max_memory),
+                }
+            callbacks = {STDOUT: on_out, STDERR: on_err}
             with self.execute(
                 timeout=timeout, get_pty=get_pty
-            ) as (in_, out, err):
+            ) as (in_, out, _):
                 if input_:
-                    in_.write(input_)
-                    in_.close()
-                self.out = normalize_string(out.read())
-                self.err = normalize_string(err.read())
+                    self._send(in_, input_)
+                for source, chunk in self._transfer(out.channel, timeout):
+                    buffers[source].write(chunk)
+                    if callbacks[source] is not None:
+                        callbacks[source](chunk)
+                if max_memory is None:
+                    self.out = buffers[STDOUT].getvalue()
+                    self.err = buffers[STDERR].getvalue()
+                    if decode:
+                        self.out = normalize_string(self.out)
+                        self.err = normalize_string(self.err)
+                else:
+                    self.out, self.err = buffers[STDOUT], buffers[STDERR]
             return self.rc, self.out, self.err
 
-    def __init__(self, user, address, use_pkey=False, port=22):
+    def __init__(self, user, address, use_pkey=False, port=22, use_pool=False):
         """
         Args:
             use_pkey (bool): Use ssh private key in the connection
             user (instance of User): User
             address (str): Ip / hostname
             port (int): Port to connect
+            use_pool (bool): Reuse authenticated connections from
+                connection_pool instead of connecting for every session
         """
         super(RemoteExecutor, self).__init__(user)
         self.address = address
         self.use_pkey = use_pkey
         self.port = port
+        self.use_pool = use_pool
+
+    @property
+    def pool_key(self):
+        """
+        Identification of connection in connection_pool
+        """
+        if self.use_pkey:
+            auth = private_key_path()
+        else:
+            auth = self.user.password
+        return self.address, self.port, self.user.name, auth
 
-    def session(self, timeout=None):
+    def session(self, timeout=None, deadline=None):
         """
         Args:
             timeout (float): Tcp timeout
+            deadline (Deadline): Bounds whole session
 
         Returns:
             instance of RemoteExecutor.Session: The session
         """
-        return RemoteExecutor.Session(self, timeout)
+        return RemoteExecutor.Session(self, timeout, deadline=deadline)
 
-    def run_cmd(self, cmd, input_=None, tcp_timeout=None, io_timeout=None):
+    def run_cmd(
+        self, cmd, input_=None, tcp_timeout=None, io_timeout=None,
+        max_memory=None, deadline=None,
+    ):
         """
         Args:
             tcp_timeout (float): Tcp timeout
             cmd (list): Command
             input_ (str): Input data
             io_timeout (float): Timeout for data operation (read/write)
+            max_memory (int): Spool outputs larger than max_memory bytes to
+                local temporary files, 0 spools them always
+            deadline (Deadline): Bounds whole execution, from connect to
+                the last byte of output
 
         Returns:
-            tuple (int, str, str): Rc, out, err
+            tuple (int, str, str): Rc, out, err, the out and err are
+                instances of common.SpooledOutput when max_memory is set
+        """
+        with self.session(tcp_timeout, deadline) as session:
+            return session.run_cmd(
+                cmd, input_, io_timeout, max_memory=max_memory,
+            )
+
+    def run(
+        self, cmd, input_=None, tcp_timeout=None, io_timeout=None,
+        binary=False, deadline=None,
+    ):
         """
-        with self.session(tcp_timeout) as session:
-            return session.run_cmd(cmd, input_, io_timeout)
+        Same as run_cmd, but output is kept raw and decoded on first access
+
+        Args:
+            cmd (list): Command
+            input_ (str): Input data
+            tcp_timeout (float): Tcp timeout
+            io_timeout (float): Timeout for data operation (read/write)
+            binary (bool): Return output as bytes
+            deadline (Deadline): Bounds whole execution
+
+        Returns:
+            CommandResult: Result of command, it unpacks as (rc, out, err)
+        """
+        with self.session(tcp_timeout, deadline) as session:
+            return session.run(cmd, input_, io_timeout, binary=binary)
 
     def is_connective(self, tcp_timeout=20.0):
         """
@@ -258,7 +775,9 @@ class RemoteExecutor(Executor):
                 "Check if address is connective via ssh in given timeout %s",
                 tcp_timeout
             )
-            self.run_cmd(['true'], tcp_timeout=tcp_timeout)
+            # always do full login, pooled connection can outlive the host
+            with self.Session(self, tcp_timeout, use_pool=False) as session:
+                session.run_cmd(['true'])
             return True
         except (socket.timeout, socket.error) as e:
             self.logger.debug("Socket error: %s", e)
@@ -275,10 +794,18 @@ class RemoteExecutor(Executor):
         """
         Wait until address will be connective or not via ssh
 
+        The address is probed by reading ssh banner first, full login is
+        done only when waiting for positive state and the banner is there.
+        When the host looks close to the transition (connection refused,
+        banner without working login, or ssh still up when waiting for
+        negative state) it is sampled each CONNECTIVITY_MIN_SAMPLE_TIME
+        seconds, otherwise the interval grows exponentially up to
+        sample_time.
+
         Args:
             positive (bool): Wait for the positive or negative connective state
             timeout (int): Wait timeout
-            sample_time (int): Sample the ssh each sample_time seconds
+            sample_time (int): Max interval between samples
             tcp_connection_timeout (int): TCP connection timeout
 
         Returns:
@@ -286,26 +813,68 @@ class RemoteExecutor(Executor):
                 does not connective, otherwise false
         """
         reachable = "unreachable" if positive else "reachable"
-        timeout_counter = 0
-        while self.is_connective(
-            tcp_timeout=tcp_connection_timeout
-        ) != positive:
-            if timeout_counter > timeout:
+        deadline = Deadline(timeout)
+        interval = min(CONNECTIVITY_MIN_SAMPLE_TIME, sample_time)
+        while True:
+            near = True
+            try:
+                read_ssh_banner(
+                    self.address, self.port, tcp_connection_timeout,
+                )
+            except socket.timeout:
+                connective, near = False, False
+            except (ConnectionRefusedError, ConnectionResetError) as ex:
+                # host is up, ssh server is not listening yet
+                self.logger.debug("%s: %s", self.address, ex)
+                connective = False
+            except socket.error as ex:
+                self.logger.debug("%s: %s", self.address, ex)
+                connective, near = False, False
+            else:
+                connective = not positive or self.is_connective(
+                    tcp_timeout=tcp_connection_timeout
+                )
+            if connective == positive:
+                return True
+            if deadline.expired:
                 self.logger.error(
                     "Address %s is still %s via ssh, after %s seconds",
                     self.address, reachable, timeout
                 )
                 return False
-            time.sleep(sample_time)
-            timeout_counter += sample_time
-        return True
+            if near:
+                interval = min(CONNECTIVITY_MIN_SAMPLE_TIME, sample_time)
+            else:
+                interval = min(interval * 2, sample_time)
+            time.sleep(min(interval, deadline.remaining()))
 
 
 class RemoteExecutorFactory(ExecutorFactory):
-    def __init__(self, use_pkey=False, port=22):
+    def __init__(
+        self, use_pkey=False, port=22, use_pool=False, use_local=True,
+    ):
+        """
+        Args:
+            use_pkey (bool): Use ssh private key in the connection
+            port (int): Port to connect
+            use_pool (bool): Reuse authenticated connections
+            use_local (bool): Run commands by local shell instead of ssh,
+                when the host is the controller itself, port is 22 and
+                the user is the one running this process
+        """
         self.use_pkey = use_pkey
         self.port = port
+        self.use_pool = use_pool
+        self.use_local = use_local
 
     def build(self, host, user):
+        if (
+            self.use_local and self.port == 22 and
+            user.name == local.current_user_name() and
+            local.is_local_address(host.ip)
+        ):
+            return local.LocalExecutor(user, host.ip)
         return RemoteExecutor(
-            user, host.ip, use_pkey=self.use_pkey, port=self.port)
+            user, host.ip, use_pkey=self.use_pkey, port=self.port,
+            use_pool=self.use_pool,
+        )
@@ -0,0 +1,99 @@
+"""
+This module loads private ssh keys used by RemoteExecutor.
+Each key file is parsed only once per process and shared by all executors,
+the cached key is reloaded when modification time of the file changes.
+When there is no key file, paramiko falls back to keys of ssh-agent.
+"""
+import os
+import threading
+
+import paramiko
+import six
+
+
+ID_PRV_NAMES = ('id_rsa', 'id_ecdsa', 'id_ed25519')
+
+
+def private_key_path():
+    """
+    Path to private key, HOST_SSH_KEY environment variable takes precedence,
+    otherwise the first existing key of ~/.ssh/id_{rsa,ecdsa,ed25519}.
+
+    Returns:
+        str: path to private key, or None when there is no such key
+    """
+    path = os.getenv("HOST_SSH_KEY")
+    if path:
+        return path
+    for name in ID_PRV_NAMES:
+        path = os.path.join(os.path.expanduser('~'), '.ssh', name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class PrivateKeyCache(object):
+    """
+    Cache of parsed private keys, keyed by path of key file.
+    RSA, ECDSA and Ed25519 keys are supported.
+    """
+    key_classes = (
+        paramiko.RSAKey,
+        paramiko.ECDSAKey,
+        paramiko.Ed25519Key,
+    )
+
+    def __init__(self):
+        super(PrivateKeyCache, self).__init__()
+        self._keys = dict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _parse(self, path, password):
+        from_path = getattr(paramiko.PKey, 'from_path', None)
+        if from_path is not None:
+            if isinstance(password, six.text_type):
+                password = password.encode('utf-8')
+            try:
+                return from_path(path, password)
+            except TypeError as ex:
+                # cryptography complains this way about missing password
+                raise paramiko.PasswordRequiredException(str(ex))
+        for key_class in self.key_classes:
+            try:
+                return key_class.from_private_key_file(path, password)
+            except paramiko.PasswordRequiredException:
+                raise
+            except paramiko.SSHException:
+                continue
+        raise paramiko.SSHException("Unsupported type of key %s" % path)
+
+    def load(self, path, password=None):
+        """
+        Get parsed private key
+
+        Args:
+            path (str): path to key file
+            password (str): passphrase of encrypted key
+
+        Returns:
+            paramiko.PKey: private key
+        """
+        mtime = os.stat(path).st_mtime
+        with self._lock:
+            cached = self._keys.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        key = self._parse(path, password)
+        with self._lock:
+            self._keys[path] = (mtime, key)
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+
+PRIVATE_KEY_CACHE = PrivateKeyCache()
@@ -1,4 +1,6 @@
 import contextlib
+import threading
+import time
 from subprocess import list2cmdline
 from rrmngmnt.executor import Executor, ExecutorFactory
 import six
@@ -51,7 +53,8 @@ class FakeExecutor(Executor):
             pass
 
         def get_data(self, cmd):
-            cmd = list2cmdline(cmd)
+            if not isinstance(cmd, six.string_types):
+                cmd = list2cmdline(cmd)
             try:
                 return self._executor.cmd_to_data[cmd]
             except KeyError:
@@ -62,7 +65,7 @@ class FakeExecutor(Executor):
                 data = self._executor.files_content[name]
             except KeyError:
                 raise Exception("There is not such file %s" % name)
-            if isinstance(data, FakeFile):
+            if isinstance(data, (FakeFile, ByteFakeFile)):
                 data = data.data
             return data
 
@@ -73,22 +76,25 @@ class FakeExecutor(Executor):
             cmd = self.command(cmd)
             return cmd.run(input_, timeout)
 
-        def open_file(self, name, mode):
-            try:
-                data = self.get_file_data(name)
-            except Exception:
-                if mode[0] not in ('w', 'a'):
-                    raise
+        @contextlib.contextmanager
+        def open_file(self, name, mode='r', bufsize=-1):
+            with self.file_hooks(name, mode):
+                try:
+                    data = self.get_file_data(name)
+                except Exception:
+                    if mode[0] not in ('w', 'a'):
+                        raise
+                    else:
+                        data = ''
+                if len(mode) == 2 and mode[1] == 'b':
+                    data = ByteFakeFile(data)
                 else:
-                    data = ''
-            if len(mode) == 2 and mode[1] == 'b':
-                data = ByteFakeFile(data)
-            else:
-                data = FakeFile(data)
-            if mode[0] == 'w':
-                data.seek(0)
-            self._executor.files_content[name] = data
-            return data
+                    data = FakeFile(data)
+                if mode[0] == 'w':
+                    data.seek(0)
+                self._executor.files_content[name] = data
+                with data:
+                    yield data
 
     class Command(Executor.Command):
 
@@ -105,9 +111,13 @@ class FakeExecutor(Executor):
 
         @contextlib.contextmanager
         def execute(self, bufsize=-1, timeout=None):
+            self._command_started()
             rc, out, err = self._ss.get_data(self.cmd)
             self._rc = rc
-            yield six.StringIO(), six.StringIO(out), six.StringIO(err)
+            try:
+                yield six.StringIO(), six.StringIO(out), six.StringIO(err)
+            finally:
+                self._command_finished()
 
     def __init__(self, user, address):
         super(FakeExecutor, self).__init__(user)
@@ -131,3 +141,96 @@ class FakeExecutorFactory(ExecutorFactory):
         fe.cmd_to_data = self.cmd_to_data.copy()
         fe.files_content = self.files_content
         return fe
+
+
+class LatencyExecutor(FakeExecutor):
+    """
+    FakeExecutor which sleeps like a remote host would, and counts round
+    trips into its factory.
+    """
+    class Session(FakeExecutor.Session):
+        def __init__(self, executor, timeout=None, use_pkey=False):
+            super(LatencyExecutor.Session, self).__init__(
+                executor, timeout, use_pkey,
+            )
+            self.batching = False
+
+        def open(self):
+            self._executor.factory.connect()
+
+        def command(self, cmd):
+            return LatencyExecutor.Command(cmd, self)
+
+        def run_batch(self, cmds):
+            # all commands go in single script, so single round trip
+            self._executor.factory.round_trip()
+            self.batching = True
+            try:
+                return super(LatencyExecutor.Session, self).run_batch(cmds)
+            finally:
+                self.batching = False
+
+    class Command(FakeExecutor.Command):
+        @contextlib.contextmanager
+        def execute(self, bufsize=-1, timeout=None):
+            if not self._ss.batching:
+                self._ss._executor.factory.round_trip()
+            with super(LatencyExecutor.Command, self).execute(
+                bufsize, timeout,
+            ) as streams:
+                yield streams
+
+    def __init__(self, user, address, factory):
+        super(LatencyExecutor, self).__init__(user, address)
+        self.factory = factory
+
+    def session(self, timeout=None):
+        return LatencyExecutor.Session(self, timeout)
+
+
+class LatencyExecutorFactory(FakeExecutorFactory):
+    """
+    Builds LatencyExecutor instances, it lets tests put a budget on number
+    of round trips of an API:
+
+        factory = LatencyExecutorFactory(data, files, command_latency=0.01)
+        host.network.get_info()
+        assert factory.round_trips <= 2
+    """
+    def __init__(
+        self, cmd_to_data, files_content, connect_latency=0.0,
+        command_latency=0.0,
+    ):
+        """
+        Args:
+            connect_latency (float): seconds spent by opening session
+            command_latency (float): seconds spent by each round trip
+        """
+        super(LatencyExecutorFactory, self).__init__(
+            cmd_to_data, files_content,
+        )
+        self.connect_latency = connect_latency
+        self.command_latency = command_latency
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.round_trips = 0
+
+    def connect(self):
+        with self._lock:
+            self.connects += 1
+        time.sleep(self.connect_latency)
+
+    def round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        time.sleep(self.command_latency)
+
+    def build(self, host, user):
+        le = LatencyExecutor(user, host.ip, self)
+        le.cmd_to_data = self.cmd_to_data.copy()
+        le.files_content = self.files_content
+        return le
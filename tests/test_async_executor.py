@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from concurrent import futures
+
+import pytest
+
+from rrmngmnt import Host, User
+from rrmngmnt.async_executor import AsyncCommandReader, AsyncExecutor
+from rrmngmnt.local import LocalExecutor, current_user_name
+from .common import FakeExecutorFactory
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestAsyncExecutor(object):
+
+    data = {
+        'echo hello': (0, 'hello\n', ''),
+        'cat shopping_list.txt': (0, 'bananas\nmilk\nhuge blender', ''),
+    }
+    files = {
+        '/tmp/file': 'data',
+    }
+
+    @classmethod
+    @pytest.fixture(scope='class')
+    def fake_host(cls):
+        fh = Host('1.1.1.1')
+        fh.add_user(User('root', '11111'))
+        fh.executor_factory = FakeExecutorFactory(cls.data, cls.files)
+        return fh
+
+    def test_run_cmd(self, fake_host):
+        result = run(fake_host.async_executor().run_cmd(['echo', 'hello']))
+        assert result == (0, 'hello\n', '')
+
+    def test_run_cmd_concurrently(self, fake_host):
+        async def many():
+            return await asyncio.gather(
+                *[fake_host.async_executor().run_cmd(['echo', 'hello'])] * 5
+            )
+        assert run(many()) == [(0, 'hello\n', '')] * 5
+
+    def test_session(self, fake_host):
+        async def session():
+            async with fake_host.async_executor().session() as ss:
+                return await ss.run_cmd(['echo', 'hello'])
+        assert run(session()) == (0, 'hello\n', '')
+
+    def test_open_file(self, fake_host):
+        async def read():
+            async with fake_host.async_executor().session() as ss:
+                async with ss.open_file('/tmp/file', 'r') as fh:
+                    return await fh.read()
+        assert run(read()) == 'data'
+
+    def test_command_reader(self, fake_host):
+        reader = AsyncCommandReader(
+            fake_host.async_executor(), ['cat', 'shopping_list.txt']
+        )
+
+        async def read():
+            return [line async for line in reader.read_lines()]
+        assert run(read()) == ['bananas', 'milk', 'huge blender']
+        assert reader.rc == 0
+
+    def test_sync_executor_kept(self, fake_host):
+        assert fake_host.async_executor().executor.address == '1.1.1.1'
+        assert fake_host.run_command(['echo', 'hello']) == (
+            0, 'hello\n', '',
+        )
+
+    def test_command_reader_own_thread(self, monkeypatch):
+        monkeypatch.setattr(
+            AsyncExecutor, 'workers', futures.ThreadPoolExecutor(1),
+        )
+        executor = AsyncExecutor(
+            LocalExecutor(User(current_user_name(), ''))
+        )
+        reader = AsyncCommandReader(executor, 'sleep 1; echo done')
+        events = []
+
+        async def read():
+            async for line in reader.read_lines():
+                events.append(line)
+
+        async def echo():
+            await asyncio.sleep(0.1)
+            events.append((await executor.run_cmd(['echo', 'hi']))[1])
+
+        async def both():
+            await asyncio.gather(read(), echo())
+        run(both())
+        assert events == ['hi\n', 'done']
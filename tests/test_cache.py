@@ -0,0 +1,125 @@
+import pytest
+
+from rrmngmnt import Host, User
+from rrmngmnt.cache import (
+    CachingExecutorFactory,
+    CommandCache,
+    is_read_only,
+)
+from .common import FakeExecutorFactory
+
+
+@pytest.mark.parametrize(
+    ('cmd', 'expected'),
+    [
+        (['cat', '/etc/os-release'], True),
+        (['uname', '-r', ';', 'uname', '-v'], True),
+        (['systemctl', 'list-unit-files', '|', 'grep', 'sshd'], True),
+        (['ip', 'route'], True),
+        (['ip', 'route', 'add', 'default', 'via', '1.1.1.1'], False),
+        (['systemctl', 'restart', 'sshd'], False),
+        (['cat', 'x', '>', '/etc/motd'], False),
+        (['cat', 'x', '|', 'tee', '/etc/motd'], False),
+        (['rm', '-f', '/tmp/x'], False),
+        (['sort', '-o', '/etc/hosts', '/tmp/x'], False),
+        (['awk', '{print > "/etc/motd"}', '/tmp/x'], False),
+        (['uniq', '/tmp/x', '/etc/motd'], False),
+        (['hostname'], True),
+        (['hostname', '-f'], True),
+        (['hostname', 'newname'], False),
+        (['ip', '-6', 'addr', 'show', 'eth0'], True),
+        (['ip', '-o', 'link'], True),
+        (['ip', 'addr', 'a', '1.1.1.1/24', 'dev', 'eth0'], False),
+        (['ip', 'route', 'ad', 'default', 'via', '1.1.1.1'], False),
+        (['ip', 'link', 's', 'eth0', 'up'], False),
+        (['tail', '-n', '5', '/var/log/messages'], True),
+        (['tail', '-f', '/var/log/messages'], False),
+        (['tail', '-n5F', '/var/log/messages'], False),
+        (['tail', '--follow=name', '/var/log/messages'], False),
+        ('cat /etc/hosts', False),
+    ]
+)
+def test_is_read_only(cmd, expected):
+    assert is_read_only(cmd) == expected
+
+
+class TestCommandCache(object):
+
+    def test_ttl(self):
+        cache = CommandCache(ttl=-1)
+        cache.put('key', (0, '', ''))
+        assert cache.get('key') is None
+        assert len(cache) == 0
+
+    def test_lru(self):
+        cache = CommandCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        assert cache.get('a') == 1
+        cache.put('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.stats() == dict(
+            hits=2, misses=1, invalidations=0, size=2,
+        )
+
+
+class TestCachingExecutor(object):
+
+    data = {
+        'cat /etc/os-release': (0, 'NAME=Fedora\nVERSION_ID=23\n', ''),
+        'which yum': (0, '/usr/bin/yum', ''),
+        'rm -f /tmp/x': (0, '', ''),
+    }
+    files = {}
+
+    def get_host(self):
+        h = Host('1.1.1.1')
+        h.add_user(User('root', '11111'))
+        h.executor_factory = CachingExecutorFactory(
+            FakeExecutorFactory(self.data, self.files)
+        )
+        return h
+
+    def test_hit(self):
+        h = self.get_host()
+        cmd = ['cat', '/etc/os-release']
+        assert h.executor().run_cmd(cmd) == self.data['cat /etc/os-release']
+        assert h.executor().run_cmd(cmd) == self.data['cat /etc/os-release']
+        assert h.executor_factory.stats()['hits'] == 1
+        assert h.executor_factory.stats()['misses'] == 1
+
+    def test_keyed_by_user(self):
+        h = self.get_host()
+        h.executor().run_cmd(['which', 'yum'])
+        h.executor(user=User('other', 'x')).run_cmd(['which', 'yum'])
+        assert h.executor_factory.stats()['misses'] == 2
+
+    def test_mutating_invalidates(self):
+        h = self.get_host()
+        h.executor().run_cmd(['which', 'yum'])
+        assert h.fs.remove('/tmp/x')
+        h.executor().run_cmd(['which', 'yum'])
+        stats = h.executor_factory.stats()
+        assert stats['misses'] == 2
+        assert stats['invalidations'] == 1
+
+    def test_session(self):
+        h = self.get_host()
+        with h.executor().session() as ss:
+            ss.run_cmd(['which', 'yum'])
+            ss.run_cmd(['which', 'yum'])
+            with ss.open_file('/tmp/y', 'w') as fh:
+                fh.write('data')
+        stats = h.executor_factory.stats()
+        assert stats['hits'] == 1
+        assert stats['size'] == 0
+
+    def test_explicit_invalidate(self):
+        h = self.get_host()
+        h.executor().run_cmd(['which', 'yum'])
+        h.executor_factory.invalidate(h)
+        assert h.executor_factory.stats()['size'] == 0
+
+    def test_delegates_attributes(self):
+        assert self.get_host().executor().address == '1.1.1.1'
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import copy
+
+import pytest
+
+from rrmngmnt import Host, RootUser
+from rrmngmnt.cassette import (
+    Cassette,
+    RecordingExecutorFactory,
+    ReplayExecutorFactory,
+)
+from rrmngmnt.common import CommandReader
+from rrmngmnt.errors import ReplayFailure
+from .common import FakeExecutorFactory
+from . import test_network
+
+
+@pytest.fixture(scope='module')
+def host():
+    h = Host('1.1.1.1')
+    h.users.append(RootUser('123456'))
+    return h
+
+
+@pytest.fixture(params=['cassette.jsonl', 'cassette.jsonl.gz'])
+def path(request, tmpdir):
+    return str(tmpdir.join(request.param))
+
+
+def record(host, path, files=None):
+    host = copy.copy(host)
+    host.executor_factory = RecordingExecutorFactory(
+        FakeExecutorFactory(test_network.TestNetwork.data, files or {}),
+        path,
+    )
+    return host
+
+
+def replay(host, path):
+    host = copy.copy(host)
+    host.executor_factory = ReplayExecutorFactory(path)
+    return host
+
+
+def test_network_info(host, path):
+    recorded = record(host, path).network.get_info()
+    assert len(ReplayExecutorFactory(path).cassette) == 4
+    replayed = replay(host, path)
+    assert replayed.network.get_info() == recorded
+    # replay can be repeated
+    assert replayed.network.get_info() == recorded
+
+
+def test_run_cmd_input(host, path):
+    executor = record(host, path).executor()
+    assert executor.run_cmd(['ip', 'route'], 'data')[0] == 0
+    executor = replay(host, path).executor()
+    assert executor.run_cmd(['ip', 'route'], 'data')[0] == 0
+    with pytest.raises(ReplayFailure):
+        executor.run_cmd(['ip', 'route'])
+
+
+def test_stream(host, path):
+    reader = CommandReader(record(host, path).executor(), ['ip', 'route'])
+    lines = list(reader.read_lines())
+    reader = CommandReader(replay(host, path).executor(), ['ip', 'route'])
+    assert list(reader.read_lines()) == lines
+    assert reader.rc == 0
+
+
+def test_files(host, path):
+    files = {'/etc/hostname': 'local\n'}
+    recording = record(host, path, files)
+    with recording.executor().session() as ss:
+        with ss.open_file('/etc/hostname', 'r') as fh:
+            assert fh.read() == 'local\n'
+        with ss.open_file('/tmp/out', 'w') as fh:
+            fh.write('written')
+    with replay(host, path).executor().session() as ss:
+        with ss.open_file('/etc/hostname', 'r') as fh:
+            assert fh.read() == 'local\n'
+        with ss.open_file('/etc/hostname', 'rb') as fh:
+            assert fh.read() == b'local\n'
+        with ss.open_file('/tmp/out', 'w') as fh:
+            fh.write(u'again')
+        with pytest.raises(ReplayFailure):
+            with ss.open_file('/etc/passwd', 'r'):
+                pass
+
+
+def test_order(tmpdir):
+    cassette = Cassette(str(tmpdir.join('c.jsonl')))
+    cassette.create()
+    for rc in (0, 1):
+        cassette.record({
+            'type': 'command', 'host': 'h', 'user': 'u', 'cmd': ['x'],
+            'input': None, 'rc': rc, 'out': '', 'err': '',
+        })
+    cassette = Cassette(cassette.path)
+    cassette.load()
+    key = ('command', '["x"]', None)
+    rcs = [cassette.play('h', 'u', key)['rc'] for _ in range(3)]
+    assert rcs == [0, 1, 1]
+    assert cassette.play('other', 'u', key) is None
+
+
+@pytest.mark.parametrize('rc,content', [(0, 'data\n'), (1, '')])
+def test_read_file_max_memory(host, path, rc, content):
+    cassette = Cassette(path)
+    cassette.create()
+    cassette.record({
+        'type': 'command', 'host': host.ip, 'user': 'root',
+        'cmd': ['cat', '/tmp/file'], 'input': None, 'rc': rc,
+        'out': content, 'err': '',
+    })
+    out = replay(host, path).fs.read_file('/tmp/file', max_memory=0)
+    assert str(out) == content
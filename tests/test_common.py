@@ -4,6 +4,8 @@ import types
 import pytest
 import netaddr
 from rrmngmnt import common, Host, User
+from rrmngmnt.executor import STDERR
+from rrmngmnt.local import LocalExecutor, current_user_name
 from .common import FakeExecutorFactory
 import six
 
@@ -91,6 +93,45 @@ class TestCommandReader(object):
         assert cmd_reader.rc
         assert cmd_reader.err
 
+    def test_tagged_lines(self, fake_host):
+        """ Test that lines of both stdout and stderr are yielded """
+        cmd = 'cat milk_shake_recipe.txt'
+        cmd_reader = common.CommandReader(fake_host.executor(), cmd.split())
+
+        assert list(cmd_reader.read_tagged_lines()) == [
+            (STDERR, self.data[cmd][2]),
+        ]
+        assert cmd_reader.rc == 1
+
+    def test_not_retained(self, fake_host):
+        """ Test that output is not collected with retain=False """
+        cmd = 'cat shopping_list.txt'
+        cmd_reader = common.CommandReader(
+            fake_host.executor(), cmd.split(), retain=False
+        )
+
+        assert len(list(cmd_reader.read_lines())) == 3
+        assert cmd_reader.out == ''
+        assert cmd_reader.rc == 0
+
+    def test_out_retained(self, fake_host):
+        """ Test that whole stdout is collected """
+        cmd = 'cat shopping_list.txt'
+        cmd_reader = common.CommandReader(fake_host.executor(), cmd.split())
+
+        for line in cmd_reader.read_lines():
+            pass
+
+        assert cmd_reader.out == self.data[cmd][1]
+
+    def test_truncated_utf8_retained(self):
+        """ Test that decoder's final output is collected as yielded """
+        executor = LocalExecutor(User(current_user_name(), ''))
+        cmd_reader = common.CommandReader(executor, "printf 'a\\303'")
+
+        assert list(cmd_reader.read_lines()) == [u'a\ufffd']
+        assert cmd_reader.out == u'a\ufffd'
+
 
 def test_normalize_string_bytes_input():
     """
@@ -132,3 +173,135 @@ def test_normalize_string_unicode_input():
         assert type(
             common.normalize_string(data=unicode())  # noqa: F821
         ) == unicode  # noqa: F821
+
+
+class TestOutputBuffer(object):
+
+    def test_unlimited(self):
+        buf = common.OutputBuffer()
+        for chunk in (b'abc', b'def', b'g'):
+            buf.write(chunk)
+        assert buf.getvalue() == b'abcdefg'
+        assert not buf.truncated
+
+    def test_keeps_tail(self):
+        buf = common.OutputBuffer(max_size=4)
+        for chunk in (b'abc', b'def', b'g'):
+            buf.write(chunk)
+        assert buf.getvalue() == b'defg'
+        assert buf.truncated
+        assert buf.total == 7
+
+    def test_big_chunk(self):
+        buf = common.OutputBuffer(max_size=2)
+        buf.write(b'abcdef')
+        assert buf.getvalue() == b'ef'
+
+    def test_nothing_retained(self):
+        buf = common.OutputBuffer(max_size=0)
+        buf.write(b'abc')
+        assert buf.getvalue() == b''
+        assert buf.total == 3
+
+
+class TestSpooledOutput(object):
+
+    def test_in_memory(self):
+        out = common.SpooledOutput(max_memory=100)
+        out.write(b'first\nsecond\n')
+        assert not out.spooled
+        assert list(out) == ['first', 'second']
+        assert 'cond' in out
+        assert out.find('second') == 6
+
+    def test_spooled(self):
+        out = common.SpooledOutput(max_memory=4)
+        out.write(b'abc\n')
+        assert not out.spooled
+        out.write(b'def\nghi')
+        assert out.spooled
+        assert len(out) == 11
+        assert out.read() == b'abc\ndef\nghi'
+        assert list(out) == ['abc', 'def', 'ghi']
+        assert out.find('ghi') == 8
+        assert 'xyz' not in out
+        assert out.mmap()[:3] == b'abc'
+        out.close()
+
+    def test_always_spooled(self):
+        out = common.SpooledOutput()
+        assert out.find('a') == -1
+        out.write(b'\xc5\xa1a')
+        assert out.spooled
+        assert out.text == u'ša'
+        out.close()
+
+    def test_mmap_in_memory(self):
+        with pytest.raises(ValueError):
+            common.SpooledOutput(max_memory=10).mmap()
+
+
+class TestCopyFile(object):
+
+    class SFTPFile(six.BytesIO):
+        """
+        Read side mimics paramiko.SFTPFile, which reads ahead by readv.
+        """
+        def __init__(self, data=b''):
+            six.BytesIO.__init__(self, data)
+            self.windows = []
+            self.pipelined = False
+
+        def stat(self):
+            return types.SimpleNamespace(st_size=len(self.getvalue()))
+
+        def readv(self, chunks):
+            self.windows.append(chunks)
+            for offset, length in chunks:
+                self.seek(offset)
+                yield self.read(length)
+
+        def set_pipelined(self, pipelined=True):
+            self.pipelined = pipelined
+
+    def test_plain_files(self):
+        wh = six.BytesIO()
+        progress = []
+        copied = common.copy_file(
+            six.BytesIO(b'x' * 100), wh, chunk_size=7,
+            progress_handler=progress.append,
+        )
+        assert copied == 100
+        assert wh.getvalue() == b'x' * 100
+        assert len(progress) == 1
+        assert progress[0].transferred == 100
+        assert progress[0].total is None
+
+    def test_sftp_files(self):
+        data = bytes(bytearray(range(256))) * 4
+        rh, wh = self.SFTPFile(data), self.SFTPFile()
+        common.copy_file(rh, wh, chunk_size=100, prefetch=4)
+        assert wh.getvalue() == data
+        assert wh.pipelined
+        # windows of 4 chunks cover the file
+        assert [len(w) for w in rh.windows] == [4, 4, 3]
+        assert rh.windows[-1][-1] == (1000, 24)
+
+    def test_progress(self, monkeypatch):
+        monkeypatch.setattr(common, 'PROGRESS_INTERVAL', 0)
+        progress = []
+        common.copy_file(
+            six.BytesIO(b'x' * 10), six.BytesIO(), chunk_size=4,
+            progress_handler=lambda p: progress.append(p.transferred),
+        )
+        assert progress == [4, 8, 10, 10]
+
+
+@pytest.mark.parametrize('size,parts,expected', [
+    (0, 4, []),
+    (10, 1, [(0, 10)]),
+    (10, 4, [(0, 4), (4, 8), (8, 10)]),
+    (100, 3, [(0, 36), (36, 72), (72, 100)]),
+])
+def test_split_ranges(size, parts, expected):
+    assert common.split_ranges(size, parts, alignment=4) == expected
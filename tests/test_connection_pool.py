@@ -0,0 +1,96 @@
+import time
+
+from rrmngmnt.connection_pool import ConnectionPool
+
+
+class FakeTransport(object):
+    def __init__(self):
+        self.active = True
+        self.keepalive = None
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        self.keepalive = interval
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+KEY = ('1.1.1.1', 22, 'root', '11111')
+
+
+class TestConnectionPool(object):
+
+    def test_reuse_connection(self):
+        pool = ConnectionPool()
+        client = pool.acquire(KEY, FakeClient)
+        pool.release(KEY, client)
+        assert pool.acquire(KEY, FakeClient) is client
+
+    def test_keepalive(self):
+        pool = ConnectionPool(keepalive=15)
+        client = pool.acquire(KEY, FakeClient)
+        assert client.transport.keepalive == 15
+
+    def test_different_keys(self):
+        pool = ConnectionPool()
+        client = pool.acquire(KEY, FakeClient)
+        pool.release(KEY, client)
+        other = pool.acquire(KEY[:3] + ('other',), FakeClient)
+        assert other is not client
+
+    def test_dead_connection_replaced(self):
+        pool = ConnectionPool()
+        client = pool.acquire(KEY, FakeClient)
+        pool.release(KEY, client)
+        client.transport.active = False
+        new_client = pool.acquire(KEY, FakeClient)
+        assert new_client is not client
+        assert client.closed
+
+    def test_idle_eviction(self):
+        pool = ConnectionPool(max_idle=-1)
+        client = pool.acquire(KEY, FakeClient)
+        pool.release(KEY, client)
+        assert pool.acquire(KEY, FakeClient) is not client
+        assert client.closed
+
+    def test_max_per_host(self):
+        pool = ConnectionPool(max_per_host=1)
+        first = pool.acquire(KEY, FakeClient)
+        second = pool.acquire(KEY, FakeClient)
+        pool.release(KEY, first)
+        pool.release(KEY, second)
+        assert len(pool) == 1
+        assert second.closed
+        assert not first.closed
+
+    def test_clear(self):
+        pool = ConnectionPool()
+        client = pool.acquire(KEY, FakeClient)
+        pool.release(KEY, client)
+        pool.clear()
+        assert len(pool) == 0
+        assert client.closed
+
+    def test_idle_closed_in_background(self):
+        pool = ConnectionPool(max_idle=0.1)
+        client = pool.acquire(KEY, FakeClient)
+        pool.release(KEY, client)
+        assert not client.closed
+        time.sleep(0.5)
+        assert client.closed
+        assert len(pool) == 0
+        assert pool._reaper is None
@@ -0,0 +1,58 @@
+import socket
+import threading
+
+import pytest
+
+from rrmngmnt import Deadline
+
+
+class TestDeadline(object):
+
+    def test_remaining(self):
+        deadline = Deadline(10)
+        assert 9 < deadline.remaining() <= 10
+        assert not deadline.expired
+
+    def test_expired(self):
+        deadline = Deadline(-1)
+        assert deadline.expired
+        assert deadline.remaining() == 0
+        with pytest.raises(socket.timeout):
+            deadline.check()
+        with pytest.raises(socket.timeout):
+            deadline.cap(5)
+
+    def test_cap(self):
+        deadline = Deadline(10)
+        assert deadline.cap(1) == 1
+        assert 9 < deadline.cap(None) <= 10
+        assert 9 < deadline.cap(60) <= 10
+
+    def test_current(self):
+        assert Deadline.current() is None
+        with Deadline(10) as deadline:
+            assert Deadline.current() is deadline
+        assert Deadline.current() is None
+
+    def test_nested_can_not_extend(self):
+        with Deadline(10) as outer:
+            with Deadline(20):
+                assert Deadline.current() is outer
+            with Deadline(5) as inner:
+                assert Deadline.current() is inner
+            assert Deadline.current() is outer
+
+    def test_thread_local(self):
+        seen = []
+        with Deadline(10):
+            t = threading.Thread(
+                target=lambda: seen.append(Deadline.current())
+            )
+            t.start()
+            t.join()
+        assert seen == [None]
+
+    def test_use_none(self):
+        with Deadline(10) as deadline:
+            with Deadline.use(None) as current:
+                assert current is deadline
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+from rrmngmnt import Host, User
+import pytest
+import time
+
+from rrmngmnt.executor import CommandResult, Executor, STDERR, STDOUT
+from .common import (
+    FakeExecutor, FakeExecutorFactory, LatencyExecutorFactory,
+)
+
+
+@pytest.fixture
+def executor(request):
+    h = Host('1.1.1.1')
+    h.add_user(User('root', '11111'))
+    h.executor_factory = FakeExecutorFactory(
+        request.cls.data, request.cls.files,
+    )
+    return h.executor()
+
+
+class TestSessionParallel(object):
+
+    data = {
+        'echo 1': (0, '1\n', ''),
+        'echo 2': (0, '2\n', ''),
+        'echo 3': (0, '3\n', ''),
+        'false': (1, '', 'failed'),
+    }
+    files = {}
+
+    def test_run_many_keeps_order(self, executor):
+        cmds = [['echo', str(i)] for i in (3, 1, 2)] + [['false']]
+        with executor.session() as ss:
+            results = ss.run_many(cmds, max_channels=2)
+        assert results == [
+            (0, '3\n', ''), (0, '1\n', ''), (0, '2\n', ''),
+            (1, '', 'failed'),
+        ]
+
+    def test_run_many_single_channel(self, executor):
+        with executor.session() as ss:
+            results = ss.run_many([['echo', '1']], max_channels=1)
+        assert results == [(0, '1\n', '')]
+
+    def test_submit(self, executor):
+        with executor.session() as ss:
+            future = ss.submit(['echo', '2'])
+            assert future.result() == (0, '2\n', '')
+        assert ss._workers is None
+
+    def test_run_batch(self, executor):
+        with executor.session() as ss:
+            results = ss.run_batch([['echo', '1'], ['false']])
+        assert results == [(0, '1\n', ''), (1, '', 'failed')]
+
+
+class TestLatencyExecutor(object):
+
+    data = TestSessionParallel.data
+
+    def test_round_trips(self):
+        h = Host('1.1.1.1')
+        h.add_user(User('root', '11111'))
+        factory = LatencyExecutorFactory(
+            self.data, {}, connect_latency=0.01, command_latency=0.01,
+        )
+        h.executor_factory = factory
+        start = time.monotonic()
+        with h.executor().session() as ss:
+            ss.run_cmd(['echo', '1'])
+            ss.run_many([['echo', '2'], ['echo', '3']])
+            ss.run_batch([['echo', '1'], ['echo', '2'], ['false']])
+        assert factory.connects == 1
+        assert factory.round_trips == 4
+        assert time.monotonic() - start >= 0.04
+        factory.reset()
+        assert (factory.connects, factory.round_trips) == (0, 0)
+
+
+class TestCommandStream(object):
+
+    data = {
+        'echo 1': (0, '1\n', ''),
+        'false': (1, '', 'failed'),
+    }
+    files = {}
+
+    def test_stream_stdout(self, executor):
+        with executor.session() as ss:
+            chunks = list(ss.command(['echo', '1']).stream())
+        assert chunks == [(STDOUT, '1\n')]
+
+    def test_stream_stderr(self, executor):
+        with executor.session() as ss:
+            cmd = ss.command(['false'])
+            chunks = list(cmd.stream())
+            assert cmd.rc == 1
+        assert chunks == [(STDERR, 'failed')]
+
+
+class TestCommandResult(object):
+
+    def test_unpack(self):
+        rc, out, err = CommandResult(0, b'out', b'err')
+        assert (rc, out, err) == (0, 'out', 'err')
+
+    def test_lazy_decode(self):
+        result = CommandResult(1, b'\xc5\xa1', b'')
+        assert not result._decoded
+        assert result.rc == 1
+        assert not result._decoded
+        assert result.out == u'\u0161'
+        assert result[1] is result.out
+
+    def test_binary(self):
+        result = CommandResult(0, b'\xff\x00', u'\u0161', binary=True)
+        assert result.out == b'\xff\x00'
+        assert result.err == b'\xc5\xa1'
+
+    def test_compare(self):
+        result = CommandResult(0, b'out', b'')
+        assert result == (0, 'out', '')
+        assert result != (1, 'out', '')
+        assert result != None  # noqa: E711
+        assert result != 0
+        assert {result: 1}[CommandResult(0, b'out', b'')] == 1
+
+    def test_executor_run(self):
+        h = Host('1.1.1.1')
+        h.add_user(User('root', '11111'))
+        h.executor_factory = FakeExecutorFactory(
+            {'echo 1': (0, '1\n', '')}, {},
+        )
+        result = h.executor().run(['echo', '1'])
+        assert result == (0, '1\n', '')
+        assert h.executor().run(['echo', '1'], binary=True).out == b'1\n'
+
+
+class TestHooks(object):
+
+    data = {'echo 1': (0, '1\n', '')}
+    files = {}
+
+    @pytest.fixture
+    def events(self):
+        events = []
+
+        def hook(executor, event, info):
+            events.append((event, info))
+
+        for event in ('session_open', 'session_close', 'command_start',
+                      'command_finish', 'file_open', 'file_close'):
+            FakeExecutor.add_hook(event, hook)
+        yield events
+        for event in ('session_open', 'session_close', 'command_start',
+                      'command_finish', 'file_open', 'file_close'):
+            FakeExecutor.remove_hook(event, hook)
+        assert not Executor.hooks
+
+    def test_events(self, executor, events):
+        with executor.session() as ss:
+            ss.run_cmd(['echo', '1'])
+            with ss.open_file('/tmp/x', 'w') as fh:
+                fh.write('data')
+        assert [e for e, _ in events] == [
+            'session_open', 'command_start', 'command_finish', 'file_open',
+            'file_close', 'session_close',
+        ]
+        finish = events[2][1]
+        assert finish['cmd'] == ['echo', '1']
+        assert finish['rc'] == 0
+        assert finish['duration'] >= 0
+        assert events[3][1] == {'path': '/tmp/x', 'mode': 'w'}
+        assert events[4][1]['duration'] >= 0
+
+    def test_failing_hook_ignored(self, executor):
+        def hook(executor, event, info):
+            raise RuntimeError("broken profiler")
+
+        Executor.add_hook('command_start', hook)
+        try:
+            assert executor.run_cmd(['echo', '1'])[0] == 0
+        finally:
+            Executor.remove_hook('command_start', hook)
+
+    def test_unknown_event(self):
+        with pytest.raises(ValueError):
+            Executor.add_hook('unknown', lambda *args: None)
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
+import socket
+
 import pytest
 
 from rrmngmnt import Host, User
 from rrmngmnt import errors
-from .common import FakeExecutorFactory
+from .common import FakeExecutor, FakeExecutorFactory
 
 
 host_executor_factory = Host.executor_factory
@@ -212,6 +214,18 @@ class TestFSGetPutFile(object):
         assert self.files[
             '/path/to/put_dir/put_file'].data == "data of put_file"
 
+    def test_put_by_chunks(self, tmpdir):
+        p = tmpdir.join("put_file")
+        p.write("data of put_file")
+        progress = []
+        self.get_host().fs.put(
+            str(p), "/path/to/put_dir", chunk_size=3,
+            progress_handler=progress.append,
+        )
+        assert self.files[
+            '/path/to/put_dir/put_file'].data == "data of put_file"
+        assert progress[-1].transferred == progress[-1].total == 16
+
 
 class TestTransfer(object):
     data = {
@@ -237,3 +251,100 @@ class TestTransfer(object):
         )
         assert self.files[
             '/path/to/dest_dir/file_to_transfer'].data == "data to transfer"
+
+
+class TestDirectTransfer(object):
+    tag = 'rrmngmnt-transfer-' + '0' * 32
+    data = {
+        "[ -d /path/to/dest_dir ]": (0, "", ""),
+        "mktemp -d": (0, "/tmp/tmp.X\n", ""),
+        'ssh-keygen -q -t ed25519 -N "" -C %s -f /tmp/tmp.X/key' % tag: (
+            0, "", "",
+        ),
+        "cat /tmp/tmp.X/key.pub": (0, "ssh-ed25519 AAAA %s\n" % tag, ""),
+        'sh -c "umask 077; mkdir -p ~/.ssh && cat >> '
+        '~/.ssh/authorized_keys"': (0, "", ""),
+        'sed -i "/ %s$/d" ~/.ssh/authorized_keys' % tag: (0, "", ""),
+        "rm -rf /tmp/tmp.X": (0, "", ""),
+    }
+    ssh = (
+        "ssh -i /tmp/tmp.X/key -p 22 -o BatchMode=yes -o IdentitiesOnly=yes "
+        "-o StrictHostKeyChecking=no -o UserKnownHostsFile=/dev/null "
+        "-o ConnectTimeout=10 root@1.1.1.2 < /path/to/file_to_transfer"
+    )
+
+    @pytest.fixture
+    def files(self, monkeypatch):
+        monkeypatch.setattr(
+            'rrmngmnt.filesystem.uuid.uuid4',
+            lambda: type('uuid', (object,), {'hex': '0' * 32}),
+        )
+        return {"/path/to/file_to_transfer": "data to transfer"}
+
+    def get_host(self, ip='1.1.1.1'):
+        h = Host(ip)
+        h.add_user(User('root', '11111'))
+        return h
+
+    def transfer(self):
+        return self.get_host().fs.transfer(
+            "/path/to/file_to_transfer", self.get_host("1.1.1.2"),
+            "/path/to/dest_dir", direct=True,
+        )
+
+    def test_direct(self, files):
+        fake_cmd_data(dict(self.data, **{self.ssh: (0, "", "")}), files)
+        assert self.transfer() == "/path/to/dest_dir/file_to_transfer"
+        # nothing went through controller
+        assert "/path/to/dest_dir/file_to_transfer" not in files
+
+    def test_fallback(self, files):
+        fake_cmd_data(
+            dict(self.data, **{self.ssh: (255, "", "No route to host")}),
+            files,
+        )
+        assert self.transfer() == "/path/to/dest_dir/file_to_transfer"
+        assert files[
+            "/path/to/dest_dir/file_to_transfer"].data == "data to transfer"
+
+    def test_source_path_quoted(self, files):
+        src = "/path/to/$(reboot) file"
+        files[src] = "data to transfer"
+        ssh = self.ssh.replace(
+            "< /path/to/file_to_transfer", "< '/path/to/$(reboot) file'",
+        )
+        fake_cmd_data(dict(self.data, **{ssh: (0, "", "")}), files)
+        assert self.get_host().fs.transfer(
+            src, self.get_host("1.1.1.2"), "/path/to/dest_dir", direct=True,
+        ) == "/path/to/dest_dir/$(reboot) file"
+
+    def test_fallback_on_connection_error(self, files, monkeypatch):
+        run_cmd = FakeExecutor.run_cmd
+
+        def failing_run_cmd(executor, cmd, *args, **kwargs):
+            if executor.address == "1.1.1.2" and cmd[0] in ('sh', 'sed'):
+                raise socket.timeout("1.1.1.2: timeout(20)")
+            return run_cmd(executor, cmd, *args, **kwargs)
+        monkeypatch.setattr(FakeExecutor, 'run_cmd', failing_run_cmd)
+        fake_cmd_data(self.data, files)
+        assert self.transfer() == "/path/to/dest_dir/file_to_transfer"
+        assert files[
+            "/path/to/dest_dir/file_to_transfer"].data == "data to transfer"
+
+    def test_cleanup_does_not_hide_error(self, files, monkeypatch):
+        run_cmd = FakeExecutor.run_cmd
+
+        def failing_run_cmd(executor, cmd, *args, **kwargs):
+            if cmd[0] == 'sed':
+                raise socket.timeout("1.1.1.2: timeout(20)")
+            return run_cmd(executor, cmd, *args, **kwargs)
+        monkeypatch.setattr(FakeExecutor, 'run_cmd', failing_run_cmd)
+        fake_cmd_data(
+            dict(self.data, **{self.ssh: (255, "", "No route to host")}),
+            files,
+        )
+        with pytest.raises(errors.CommandExecutionFailure):
+            self.get_host().fs._transfer_direct(
+                "/path/to/file_to_transfer", self.get_host("1.1.1.2"),
+                "/path/to/dest_dir/file_to_transfer",
+            )
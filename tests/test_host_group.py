@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+from concurrent import futures
+
+from rrmngmnt import Host, HostGroup, User
+from rrmngmnt import errors
+from .common import FakeExecutorFactory
+
+
+host_executor_factory = Host.executor_factory
+
+
+def teardown_module():
+    Host.executor_factory = host_executor_factory
+
+
+class TestHostGroup(object):
+    data = {
+        'hostname': (0, 'host\n', ''),
+        'false': (1, '', 'failed'),
+    }
+    files = {}
+
+    @classmethod
+    def setup_class(cls):
+        Host.executor_factory = FakeExecutorFactory(cls.data, cls.files)
+
+    def get_group(self, count=3):
+        hosts = list()
+        for i in range(count):
+            h = Host('1.1.1.%d' % (i + 1))
+            h.add_user(User('root', '11111'))
+            hosts.append(h)
+        return HostGroup(hosts, max_workers=2)
+
+    def test_inventory_by_default(self):
+        group = self.get_group()
+        assert set(group) <= set(HostGroup())
+
+    def test_run_command(self):
+        group = self.get_group()
+        results = group.run_command(['hostname'])
+        assert set(results) == set(group)
+        assert all(r == (0, 'host\n', '') for r in results.values())
+        assert not results.failed
+        results.check()
+
+    def test_run_command_failure(self):
+        group = self.get_group()
+        results = group.run_command(['false'])
+        assert set(results.failed) == set(group)
+        assert isinstance(
+            results.errors[group.hosts[0]], errors.CommandExecutionFailure
+        )
+        with pytest.raises(errors.HostGroupFailure):
+            results.check()
+
+    def test_call_partial_failure(self):
+        group = self.get_group()
+        broken = group.hosts[1]
+
+        def func(host):
+            if host is broken:
+                raise Exception("broken host")
+            return host.ip
+
+        results = group.call(func)
+        assert results.failed == [broken]
+        assert set(results.succeeded) == set(group) - set([broken])
+        assert results[group.hosts[0]] == group.hosts[0].ip
+
+    def test_call_timeout(self):
+        group = self.get_group()
+        slow = group.hosts[0]
+
+        def func(host):
+            if host is slow:
+                time.sleep(1)
+            return True
+
+        start = time.monotonic()
+        results = group.call(func, timeout=0.2)
+        assert time.monotonic() - start < 1
+        assert results.failed == [slow]
+        assert isinstance(results.errors[slow], futures.TimeoutError)
+        assert all(results[h] for h in results.succeeded)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import socket
+
+import pytest
+
+from rrmngmnt import Deadline, Host, User, filesystem, local
+from rrmngmnt.errors import CommandExecutionFailure, FailToVerify
+from rrmngmnt.executor import STDERR, STDOUT
+from rrmngmnt.filesystem import FileSystem
+from rrmngmnt.local import (
+    LocalExecutor,
+    LocalExecutorFactory,
+    current_user_name,
+    is_local_address,
+)
+from rrmngmnt.ssh import RemoteExecutor, RemoteExecutorFactory
+
+
+def get_executor():
+    return LocalExecutor(User(current_user_name(), ''))
+
+
+@pytest.fixture
+def local_host():
+    h = Host('127.0.0.1')
+    h.executor_factory = LocalExecutorFactory()
+    h.add_user(User(current_user_name(), ''))
+    return h
+
+
+class TestLocalExecutor(object):
+
+    def test_run_cmd(self):
+        rc, out, err = get_executor().run_cmd(['echo', u'ša'])
+        assert (rc, out, err) == (0, u'ša\n', '')
+
+    def test_failure(self):
+        rc, out, err = get_executor().run_cmd(
+            'echo out; echo err >&2; exit 3'
+        )
+        assert (rc, out, err) == (3, 'out\n', 'err\n')
+
+    def test_input(self):
+        data = 'x' * 300000
+        rc, out, _ = get_executor().run_cmd(['cat'], input_=data)
+        assert out == data
+
+    def test_stream(self):
+        with get_executor().session() as ss:
+            cmd = ss.command('echo a; echo b >&2')
+            chunks = list(cmd.stream())
+        assert (STDOUT, b'a\n') in chunks
+        assert (STDERR, b'b\n') in chunks
+        assert cmd.rc == 0
+
+    def test_io_timeout(self):
+        with pytest.raises(socket.timeout):
+            get_executor().run_cmd(['sleep', '5'], io_timeout=0.1)
+
+    def test_deadline(self):
+        with pytest.raises(socket.timeout):
+            get_executor().run_cmd(['sleep', '5'], deadline=Deadline(0.1))
+
+    def test_open_file(self, tmp_path):
+        path = str(tmp_path / 'file')
+        with get_executor().session() as ss:
+            with ss.open_file(path, 'wb') as fh:
+                fh.write(b'data')
+            with ss.open_file(path, 'rb') as fh:
+                assert fh.read() == b'data'
+
+    def test_file_operations(self, tmp_path):
+        path = str(tmp_path / 'file')
+        with get_executor().session() as ss:
+            with ss.open_file(path, 'wb') as fh:
+                fh.write(b'data')
+            assert ss.stat(path).st_size == 4
+            ss.rename(path, path + '.new')
+            assert ss.listdir(str(tmp_path)) == ['file.new']
+            ss.remove(path + '.new')
+            assert ss.listdir(str(tmp_path)) == []
+
+    def test_relative_to_home(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(local, 'current_user_home', lambda: str(tmp_path))
+        assert get_executor().run_cmd(['pwd'])[1] == str(tmp_path) + '\n'
+        with get_executor().session() as ss:
+            with ss.open_file('file', 'w') as fh:
+                fh.write(u'data')
+            assert ss.listdir() == ['file']
+            assert ss.stat('file').st_size == 4
+        assert (tmp_path / 'file').read_text() == u'data'
+
+    def test_filesystem(self, local_host, tmp_path):
+        path = str(tmp_path / 'script')
+        local_host.fs.create_script('echo hi', path)
+        assert local_host.fs.isexec(path)
+        assert local_host.run_command([path]) == (0, 'hi\n', '')
+
+    def test_read_file_max_memory(self, local_host, tmp_path):
+        path = str(tmp_path / 'file')
+        with open(path, 'w') as fh:
+            fh.write('a\nb\n')
+        out = local_host.fs.read_file(path, max_memory=0)
+        try:
+            assert out.spooled
+            assert list(out) == ['a', 'b']
+        finally:
+            out.close()
+        missing = str(tmp_path / 'missing')
+        assert local_host.fs.read_file(missing, max_memory=0) == ''
+
+    def test_run_options(self):
+        chunks = []
+        rc, out, err = get_executor().session().run_cmd(
+            'echo out; echo err >&2', max_memory=2,
+        )
+        assert (out.text, err.text) == ('out\n', 'err\n')
+        with get_executor().session() as ss:
+            rc, out, err = ss.command('echo out').run(
+                None, on_out=chunks.append, decode=False,
+            )
+        assert (out, chunks) == (b'out\n', [b'out\n'])
+        with get_executor().session() as ss:
+            rc, out, err = ss.command('test -t 1 && echo tty').run(
+                None, get_pty=True,
+            )
+        assert (rc, out, err) == (0, 'tty\r\n', '')
+
+    @pytest.mark.parametrize('method', ['put', 'get'])
+    def test_multi_stream(self, local_host, tmp_path, method):
+        data = os.urandom(100000)
+        src, dst = str(tmp_path / 'src'), str(tmp_path / 'dst')
+        with open(src, 'wb') as fh:
+            fh.write(data)
+        progress = []
+        getattr(local_host.fs, method)(
+            src, dst, chunk_size=4096, streams=3,
+            progress_handler=progress.append,
+        )
+        with open(dst, 'rb') as fh:
+            assert fh.read() == data
+        assert progress[-1].transferred == len(data)
+
+    def test_multi_stream_verify(self, local_host, tmp_path, monkeypatch):
+        src = str(tmp_path / 'src')
+        with open(src, 'wb') as fh:
+            fh.write(b'data')
+        monkeypatch.setattr(
+            FileSystem, '_local_checksum', staticmethod(lambda path: 'x'),
+        )
+        with pytest.raises(FailToVerify):
+            local_host.fs.put(src, str(tmp_path / 'dst'), streams=2)
+
+
+class TestTree(object):
+
+    @pytest.fixture
+    def src(self, tmp_path):
+        src = tmp_path / 'src'
+        (src / 'sub' / 'logs').mkdir(parents=True)
+        (src / 'a.txt').write_text(u'a')
+        (src / 'sub' / 'b.txt').write_text(u'b')
+        (src / 'sub' / 'run.sh').write_text(u'echo')
+        (src / 'sub' / 'logs' / 'c.log').write_text(u'c')
+        os.chmod(str(src / 'sub' / 'run.sh'), 0o751)
+        return src
+
+    @staticmethod
+    def listing(path):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), str(path))
+            for root, dirs, files in os.walk(str(path)) for name in files
+        )
+
+    @pytest.mark.parametrize('compression', [
+        None, 'gzip', pytest.param('zstd', marks=pytest.mark.skipif(
+            shutil.which('zstd') is None, reason="zstd is not installed",
+        )),
+    ])
+    @pytest.mark.parametrize('method', ['put_tree', 'get_tree'])
+    def test_copy(self, local_host, src, tmp_path, method, compression):
+        dst = tmp_path / 'dst' / 'tree'
+        getattr(local_host.fs, method)(str(src), str(dst), compression)
+        assert self.listing(dst) == self.listing(src)
+        assert (dst / 'sub' / 'b.txt').read_text() == u'b'
+        assert os.stat(str(dst / 'sub' / 'run.sh')).st_mode & 0o777 == 0o751
+
+    @pytest.mark.parametrize('method', ['put_tree', 'get_tree'])
+    def test_filters(self, local_host, src, tmp_path, method):
+        dst = tmp_path / 'dst'
+        getattr(local_host.fs, method)(
+            str(src), str(dst), include=['*.txt', '*.log'],
+            exclude=['logs', 'a.*'],
+        )
+        assert self.listing(dst) == ['sub/b.txt']
+
+    @pytest.mark.parametrize('method', ['put_tree', 'get_tree'])
+    def test_dir_symlink(self, local_host, src, tmp_path, method):
+        os.symlink('sub', str(src / 'link'))
+        dst = tmp_path / 'dst'
+        getattr(local_host.fs, method)(str(src), str(dst))
+        assert os.readlink(str(dst / 'link')) == 'sub'
+
+    @pytest.mark.parametrize('target', ['/etc', '../../outside'])
+    def test_get_outside_link(self, local_host, src, tmp_path, target):
+        os.symlink(target, str(src / 'sub' / 'link'))
+        dst = tmp_path / 'dst'
+        local_host.fs.get_tree(str(src), str(dst))
+        assert not os.path.lexists(str(dst / 'sub' / 'link'))
+        assert (dst / 'sub' / 'b.txt').read_text() == u'b'
+
+    def test_unknown_compression(self, local_host, src, tmp_path):
+        with pytest.raises(ValueError):
+            local_host.fs.put_tree(str(src), str(tmp_path / 'dst'), 'rar')
+
+    def test_failure(self, local_host, tmp_path):
+        with pytest.raises(CommandExecutionFailure):
+            local_host.fs.get_tree(
+                str(tmp_path / 'missing'), str(tmp_path / 'd'),
+            )
+
+    def test_large_errors(self, local_host):
+        # more than fits into pipe, stdout is read only after it
+        cmd = "head -c 300000 /dev/zero | tr '\\0' e >&2; echo out; exit 2"
+        outs = []
+        with pytest.raises(CommandExecutionFailure) as ex:
+            local_host.fs._run_tar(
+                cmd, lambda in_, out: outs.append(out.read()),
+            )
+        assert outs == [b'out\n']
+        assert str(ex.value).count('e') >= filesystem.TAR_MAX_ERR
+
+
+class TestAutoSelect(object):
+
+    def test_is_local_address(self):
+        assert is_local_address('127.0.0.1')
+        assert not is_local_address('192.0.2.1')
+        assert not is_local_address('localhost')
+
+    @pytest.mark.parametrize(
+        ('address', 'user', 'kwargs', 'expected'),
+        [
+            ('127.0.0.1', None, {}, LocalExecutor),
+            ('127.0.0.1', None, {'use_local': False}, RemoteExecutor),
+            ('127.0.0.1', None, {'port': 2222}, RemoteExecutor),
+            ('127.0.0.1', 'nobody-else', {}, RemoteExecutor),
+            ('192.0.2.1', None, {}, RemoteExecutor),
+        ]
+    )
+    def test_factory(self, address, user, kwargs, expected):
+        user = User(user or current_user_name(), '')
+        h = Host(address)
+        executor = RemoteExecutorFactory(**kwargs).build(h, user)
+        assert type(executor) is expected
@@ -0,0 +1,64 @@
+from rrmngmnt.metrics import Histogram, Metrics, command_name
+
+
+def test_command_name():
+    assert command_name(['/usr/bin/ip', 'route']) == 'ip'
+    assert command_name('systemctl restart sshd') == 'systemctl'
+    assert command_name([]) == ''
+
+
+class TestHistogram(object):
+
+    def test_observe(self):
+        hist = Histogram()
+        for value in (0.002, 0.004, 0.2, 3.0):
+            hist.observe(value)
+        assert hist.count == 4
+        assert hist.min == 0.002
+        assert hist.max == 3.0
+        assert abs(hist.mean - 0.8015) < 1e-9
+        assert hist.percentile(50) == 0.005
+        assert hist.percentile(100) == 3.0
+
+    def test_empty(self):
+        assert Histogram().mean == 0.0
+        assert Histogram().percentile(99) == 0.0
+
+
+class TestMetrics(object):
+
+    def test_histogram_filters(self):
+        metrics = Metrics()
+        metrics.observe('1.1.1.1', 'exec', 0.1, 'ip')
+        metrics.observe('1.1.1.1', 'exec', 0.3, 'cat')
+        metrics.observe('2.2.2.2', 'exec', 0.5, 'ip')
+        assert metrics.histogram('exec').count == 3
+        assert metrics.histogram('exec', host='1.1.1.1').count == 2
+        assert metrics.histogram('exec', command='ip').total == 0.6
+        assert metrics.hosts() == ['1.1.1.1', '2.2.2.2']
+
+    def test_counter(self):
+        metrics = Metrics()
+        metrics.incr('1.1.1.1', 'commands', command='ip')
+        metrics.incr('2.2.2.2', 'commands', 2, command='ip')
+        assert metrics.counter('commands') == 3
+        assert metrics.counter('commands', host='2.2.2.2') == 2
+
+    def test_measure(self):
+        metrics = Metrics()
+        metrics.incr('1.1.1.1', 'commands')
+        with metrics.measure() as m:
+            metrics.incr('1.1.1.1', 'connects')
+            metrics.incr('1.1.1.1', 'commands', 2)
+            metrics.incr('1.1.1.1', 'bytes_received', 100)
+        metrics.incr('1.1.1.1', 'commands')
+        assert (m.connects, m.commands, m.bytes_received) == (1, 2, 100)
+        assert '2 commands' in str(m)
+
+    def test_disabled(self):
+        metrics = Metrics()
+        metrics.enabled = False
+        with metrics.timer('1.1.1.1', 'exec'):
+            metrics.incr('1.1.1.1', 'commands')
+        assert metrics.histogram('exec').count == 0
+        assert metrics.counter('commands') == 0
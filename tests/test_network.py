@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from rrmngmnt import Host, RootUser
-from .common import FakeExecutorFactory
+from .common import FakeExecutorFactory, LatencyExecutorFactory
 
 
 host_executor_factory = Host.executor_factory
@@ -319,6 +319,54 @@ class TestNetwork(object):
         )
 
 
+class TestRoundTrips(object):
+    """
+    Budget of round trips of network APIs, an API exceeding it got slower
+    on high latency links.
+    """
+    data = dict(
+        TestNetwork.data, **{
+            "ethtool -P enp4s0f0": (
+                0, "Permanent address: 00:00:00:00:00:01", '',
+            ),
+            "ethtool -P enp4s0f1": (
+                0, "Permanent address: 00:00:00:00:00:02", '',
+            ),
+        }
+    )
+
+    @classmethod
+    def setup_class(cls):
+        cls.factory = LatencyExecutorFactory(
+            cls.data, {}, connect_latency=0.001, command_latency=0.001,
+        )
+        Host.executor_factory = cls.factory
+
+    def setup_method(self, method):
+        self.factory.reset()
+
+    def test_get_info(self):
+        get_host().network.get_info()
+        assert self.factory.connects == 1
+        assert self.factory.round_trips <= 2
+
+    def test_find_mac_by_int(self):
+        macs = get_host().network.find_mac_by_int(
+            ['enp4s0f0', 'enp4s0f1', 'enp5s0f0']
+        )
+        assert macs == [
+            '00:00:00:00:00:01', '00:00:00:00:00:02', '44:1e:a1:73:3c:98',
+        ]
+        assert self.factory.connects == 1
+        # listing of interfaces and one command per interface
+        assert self.factory.round_trips <= 1 + 3
+
+    def test_find_mgmt_interface(self):
+        get_host().network.find_mgmt_interface()
+        assert self.factory.connects == 1
+        assert self.factory.round_trips <= 3
+
+
 class TestHostNameCtl(object):
 
     data = {
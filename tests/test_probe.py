@@ -0,0 +1,117 @@
+import socket
+import threading
+
+import pytest
+
+from rrmngmnt import Host, probe
+from rrmngmnt.probe import probe_all, wait_all
+from rrmngmnt.ssh import RemoteExecutorFactory
+
+
+@pytest.fixture
+def listener():
+    """
+    Loopback server sending ssh banner to each client.
+    """
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(50)
+
+    def serve():
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            conn.sendall(b'SSH-2.0-OpenSSH_8.0\r\n')
+            conn.close()
+
+    t = threading.Thread(target=serve)
+    t.daemon = True
+    t.start()
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+def get_host(port, address='127.0.0.1'):
+    h = Host(address)
+    h.executor_factory = RemoteExecutorFactory(port=port)
+    return h
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestProbeAll(object):
+
+    @pytest.mark.parametrize('method', ['tcp', 'ssh'])
+    def test_reachable(self, listener, method):
+        hosts = [get_host(listener) for _ in range(20)]
+        results = probe_all(hosts, method=method, timeout=5)
+        assert len(results.reachable) == 20
+        assert all(r.latency >= 0 for r in results.values())
+
+    def test_unreachable(self, listener):
+        up, down = get_host(listener), get_host(closed_port())
+        results = probe_all([up, down], method='ssh', timeout=5)
+        assert results.reachable == [up]
+        assert results.unreachable == [down]
+        assert results[down].error
+
+    def test_no_banner_times_out(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(1)
+        try:
+            host = get_host(sock.getsockname()[1])
+            results = probe_all([host], method='ssh', timeout=0.2)
+            assert 'timeout' in results[host].error
+        finally:
+            sock.close()
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            probe_all([], method='udp')
+
+    def test_icmp_not_permitted(self, listener, monkeypatch):
+        def icmp_socket():
+            raise PermissionError(1, "Operation not permitted")
+        monkeypatch.setattr(probe, '_icmp_socket', icmp_socket)
+        with pytest.raises(socket.error):
+            probe_all([get_host(listener)], method='icmp')
+        with pytest.raises(socket.error):
+            wait_all([get_host(listener)], positive=False, method='icmp')
+
+
+class TestWaitAll(object):
+
+    def test_positive(self, listener):
+        hosts = [get_host(listener), get_host(listener)]
+        results = wait_all(hosts, positive=True, timeout=5)
+        assert not results.unreachable
+
+    def test_negative(self):
+        host = get_host(closed_port())
+        results = wait_all([host], positive=False, timeout=5)
+        assert results.unreachable == [host]
+
+    def test_timeout(self, listener):
+        host = get_host(listener)
+        results = wait_all(
+            [host], positive=False, timeout=0.3, sample_time=0.1,
+        )
+        assert results.reachable == [host]
+
+
+def test_host_group(listener):
+    from rrmngmnt import HostGroup
+    up, down = get_host(listener), get_host(closed_port())
+    group = HostGroup([up, down])
+    assert group.probe(method='ssh').unreachable == [down]
+    assert not group.wait_for_connectivity_state(True, timeout=0.1)
+    assert HostGroup([up]).wait_for_connectivity_state(True, timeout=1)
@@ -0,0 +1,221 @@
+import socket
+import threading
+import time
+
+import pytest
+import six
+
+from rrmngmnt import Deadline, User
+from rrmngmnt import ssh
+
+
+@pytest.fixture
+def server():
+    """
+    Loopback TCP server which sends given data to each client.
+    """
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(5)
+    data = {'send': b'SSH-2.0-OpenSSH_8.0\r\n'}
+
+    def serve():
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            conn.sendall(data['send'])
+            conn.close()
+
+    t = threading.Thread(target=serve)
+    t.daemon = True
+    t.start()
+    yield sock.getsockname()[1], data
+    sock.close()
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestReadSSHBanner(object):
+
+    def test_banner(self, server):
+        port, _ = server
+        assert ssh.read_ssh_banner(
+            '127.0.0.1', port, 5
+        ) == 'SSH-2.0-OpenSSH_8.0'
+
+    def test_banner_after_other_lines(self, server):
+        port, data = server
+        data['send'] = b'Welcome\r\nSSH-2.0-dropbear\r\n'
+        assert ssh.read_ssh_banner('127.0.0.1', port, 5) == 'SSH-2.0-dropbear'
+
+    def test_not_ssh(self, server):
+        port, data = server
+        data['send'] = b'HTTP/1.1 400 Bad Request\r\n'
+        with pytest.raises(socket.error):
+            ssh.read_ssh_banner('127.0.0.1', port, 5)
+
+    def test_refused(self):
+        with pytest.raises(socket.error):
+            ssh.read_ssh_banner('127.0.0.1', free_port(), 5)
+
+
+class TestWaitForConnectivityState(object):
+
+    def get_executor(self, port):
+        return ssh.RemoteExecutor(
+            User('root', '11111'), '127.0.0.1', port=port,
+        )
+
+    def test_negative_without_login(self):
+        executor = self.get_executor(free_port())
+        executor.is_connective = lambda **kwargs: pytest.fail("login")
+        assert executor.wait_for_connectivity_state(
+            False, timeout=5, sample_time=1,
+        )
+
+    def test_positive_needs_login(self, server):
+        port, _ = server
+        executor = self.get_executor(port)
+        calls = []
+
+        def is_connective(tcp_timeout):
+            calls.append(tcp_timeout)
+            return len(calls) > 1
+
+        executor.is_connective = is_connective
+        assert executor.wait_for_connectivity_state(
+            True, timeout=10, sample_time=0.1,
+        )
+        assert len(calls) == 2
+
+    def test_positive_timeout(self):
+        executor = self.get_executor(free_port())
+        executor.is_connective = lambda **kwargs: pytest.fail("login")
+        assert not executor.wait_for_connectivity_state(
+            True, timeout=0.3, sample_time=0.1,
+        )
+
+    def test_still_reachable(self, server):
+        port, _ = server
+        executor = self.get_executor(port)
+        assert not executor.wait_for_connectivity_state(
+            False, timeout=0.3, sample_time=0.1,
+        )
+
+
+class TestConnectDeadline(object):
+
+    @pytest.fixture
+    def slow_server(self):
+        """
+        Loopback TCP server which sends ssh banner late and then stalls,
+        so each stage of the handshake waits.
+        """
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(5)
+        conns = []
+
+        def serve():
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            conns.append(conn)
+            time.sleep(0.8)
+            conn.sendall(b'SSH-2.0-OpenSSH_8.0\r\n')
+
+        t = threading.Thread(target=serve)
+        t.daemon = True
+        t.start()
+        yield sock.getsockname()[1]
+        sock.close()
+        for conn in conns:
+            conn.close()
+
+    def test_handshake_bounded(self, slow_server):
+        executor = ssh.RemoteExecutor(
+            User('root', '11111'), '127.0.0.1', port=slow_server,
+        )
+        start = time.monotonic()
+        with pytest.raises(socket.timeout) as ex:
+            executor.run_cmd(['true'], deadline=Deadline(1))
+        assert time.monotonic() - start < 1.5
+        assert 'deadline(1)' in str(ex.value)
+
+
+class FakeSFTP(object):
+    class sock(object):
+        closed = False
+
+    def __init__(self):
+        self.closed = False
+        self.files = []
+
+    def file(self, path, mode, bufsize):
+        self.files.append(path)
+        return six.BytesIO()
+
+    def stat(self, path):
+        return path
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSSHClient(object):
+    def __init__(self):
+        self.clients = []
+
+    def open_sftp(self):
+        self.clients.append(FakeSFTP())
+        return self.clients[-1]
+
+    def close(self):
+        pass
+
+
+class TestSessionSFTP(object):
+
+    def get_session(self):
+        executor = ssh.RemoteExecutor(User('root', '11111'), '127.0.0.1')
+        session = executor.session()
+        session.open = lambda: setattr(session, '_ssh', FakeSSHClient())
+        return session
+
+    def test_shared_by_files(self):
+        with self.get_session() as ss:
+            client = ss._ssh
+            for path in ('/a', '/b'):
+                with ss.open_file(path, 'wb') as fh:
+                    fh.write(b'data')
+            assert ss.stat('/a') == '/a'
+        assert len(client.clients) == 1
+        assert client.clients[0].files == ['/a', '/b']
+        assert client.clients[0].closed
+
+    def test_reopened_when_closed(self):
+        with self.get_session() as ss:
+            first = ss.sftp
+            first.sock = type('sock', (object,), {'closed': True})
+            assert ss.sftp is not first
+            assert first.closed
+
+
+def test_bytes_sent_counts_encoded_input():
+    executor = ssh.RemoteExecutor(User('root', '11111'), '192.0.2.7')
+    cmd = executor.session().command(['cat'])
+    sent = six.BytesIO()
+    sent.close = lambda: None
+    before = ssh.METRICS.counter('bytes_sent', host='192.0.2.7')
+    cmd._send(sent, u'ša')
+    assert sent.getvalue() == b'\xc5\xa1a'
+    assert ssh.METRICS.counter('bytes_sent', host='192.0.2.7') - before == 3
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import os
+
+import paramiko
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from rrmngmnt import ssh_keys
+
+
+def write_ed25519(path):
+    key = ed25519.Ed25519PrivateKey.generate()
+    with open(path, 'wb') as fh:
+        fh.write(
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.OpenSSH,
+                serialization.NoEncryption(),
+            )
+        )
+
+
+@pytest.fixture
+def cache():
+    return ssh_keys.PrivateKeyCache()
+
+
+class TestPrivateKeyCache(object):
+
+    def test_rsa(self, cache, tmpdir):
+        path = str(tmpdir.join('id_rsa'))
+        paramiko.RSAKey.generate(1024).write_private_key_file(path)
+        assert isinstance(cache.load(path), paramiko.RSAKey)
+
+    def test_ecdsa(self, cache, tmpdir):
+        path = str(tmpdir.join('id_ecdsa'))
+        paramiko.ECDSAKey.generate().write_private_key_file(path)
+        assert isinstance(cache.load(path), paramiko.ECDSAKey)
+
+    def test_ed25519(self, cache, tmpdir):
+        path = str(tmpdir.join('id_ed25519'))
+        write_ed25519(path)
+        assert isinstance(cache.load(path), paramiko.Ed25519Key)
+
+    def test_encrypted(self, cache, tmpdir):
+        path = str(tmpdir.join('id_rsa'))
+        paramiko.RSAKey.generate(1024).write_private_key_file(
+            path, password='secret'
+        )
+        with pytest.raises(paramiko.PasswordRequiredException):
+            cache.load(path)
+        assert isinstance(cache.load(path, 'secret'), paramiko.RSAKey)
+
+    def test_parsed_once(self, cache, tmpdir):
+        path = str(tmpdir.join('id_ecdsa'))
+        paramiko.ECDSAKey.generate().write_private_key_file(path)
+        assert cache.load(path) is cache.load(path)
+        assert len(cache) == 1
+
+    def test_reload_on_change(self, cache, tmpdir):
+        path = str(tmpdir.join('id_ecdsa'))
+        paramiko.ECDSAKey.generate().write_private_key_file(path)
+        key = cache.load(path)
+        paramiko.ECDSAKey.generate().write_private_key_file(path)
+        os.utime(path, (0, 0))
+        assert cache.load(path) != key
+
+
+class TestPrivateKeyPath(object):
+
+    def test_env(self, monkeypatch):
+        monkeypatch.setenv('HOST_SSH_KEY', '/path/to/key')
+        assert ssh_keys.private_key_path() == '/path/to/key'
+
+    def test_default(self, monkeypatch, tmpdir):
+        monkeypatch.delenv('HOST_SSH_KEY', raising=False)
+        monkeypatch.setenv('HOME', str(tmpdir))
+        assert ssh_keys.private_key_path() is None
+        tmpdir.mkdir('.ssh').join('id_ed25519').write('')
+        assert ssh_keys.private_key_path() == str(
+            tmpdir.join('.ssh', 'id_ed25519')
+        )